@@ -0,0 +1,63 @@
+"""
+Benchmark Data
+Synthetic transactions shaped like the ones /upload stores
+"""
+
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator
+
+# Make `src` importable when scripts are run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.records import MATCHED_DETAILS  # noqa: E402
+
+VENDORS = [
+    "ABC Pvt Ltd", "ABC Private Limited", "XYZ Corporation", "Acme Supplies Inc",
+    "Global Traders LLP", "Sharma & Sons", "Tata Steel Ltd", "Infosys Limited",
+    "Reliance Industries", "Mahindra Logistics", "Zenith Office Supplies", "Apex Components",
+]
+
+
+def synthetic_transactions(count: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """
+    Generate transactions with a realistic mix of matches and mismatches
+
+    Args:
+        count: Number of transactions
+        seed: Random seed (same seed, same data)
+
+    Yields:
+        Transaction dictionaries
+    """
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+
+    for i in range(count):
+        vendor = rng.choice(VENDORS)
+        total = round(rng.uniform(100, 500000), 2)
+        po_total = total if rng.random() < 0.8 else round(total * rng.uniform(0.9, 1.1), 2)
+        invoice_day = start + timedelta(days=rng.randint(0, 365))
+        po_day = invoice_day - timedelta(days=rng.choice([0, 0, 1, 2, 5, 10]))
+
+        details = {}
+        if po_total != total:
+            details["total"] = {"invoice": total, "po": po_total, "reason": "Amount difference exceeds tolerance"}
+        if (invoice_day - po_day).days > 3:
+            details["date"] = {"reason": "Dates do not match"}
+
+        yield {
+            "invoice_vendor": vendor,
+            "po_vendor": vendor if rng.random() < 0.9 else rng.choice(VENDORS),
+            "invoice_total": total,
+            "po_total": po_total,
+            "invoice_date": invoice_day.strftime("%d/%m/%Y"),
+            "po_date": po_day.strftime("%d/%m/%Y"),
+            "invoice_number": f"INV-{i:07d}",
+            "po_number": f"PO-{i:07d}",
+            "status": "MISMATCH ⚠️" if details else "MATCHED ✅",
+            "timestamp": (start + timedelta(seconds=30 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+            "details": details or dict(MATCHED_DETAILS),
+        }
@@ -0,0 +1,123 @@
+"""
+Duplicate Detection Benchmark
+Per-upload duplicate check cost with the Bloom filter front against querying storage every time
+"""
+
+import argparse
+import logging
+import math
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+from datetime import date, timedelta
+
+from bench_data import VENDORS
+
+from src.core.duplicates import DUPLICATE_CHECKS, DuplicateDetector
+from src.core.query import TransactionQuery
+from src.core.records import ExtractionResult, to_date
+from src.core.storage import TransactionStorage
+
+
+def history(count, vendors, rng):
+    """
+    Stored invoices: a few suppliers send most of them (Zipf-like), totals
+    spread log-uniformly from 100 to 10 lakh, dates over two years
+    """
+    weights = [1 / (rank + 1) for rank in range(len(vendors))]
+    start = date(2024, 1, 1)
+    for i in range(count):
+        yield {
+            "invoice_vendor": rng.choices(vendors, weights)[0],
+            "invoice_total": round(math.exp(rng.uniform(math.log(100), math.log(1_000_000))), 2),
+            "invoice_date": start + timedelta(days=rng.randint(0, 730)),
+            "invoice_number": f"INV-{i:07d}",
+            "status": "MATCHED ✅",
+            "timestamp": "2025-01-01 00:00:00",
+        }
+
+
+def resubmitted(transaction, rng, renumber=False):
+    """A stored invoice sent again, the same or under a new number with a slightly different date"""
+    day = to_date(transaction["invoice_date"])
+    return ExtractionResult(
+        vendor=transaction["invoice_vendor"],
+        invoice_no=f"R-{rng.randint(0, 10 ** 6)}" if renumber else transaction["invoice_number"],
+        total=transaction["invoice_total"],
+        date=day + timedelta(days=rng.randint(-2, 2)) if renumber else day,
+    )
+
+
+def query_always(storage, invoice):
+    """What a check costs without the filter: both confirming queries on every upload"""
+    storage.query(TransactionQuery(invoice_number=invoice.invoice_no, limit=500))
+    storage.query(TransactionQuery(vendor=invoice.vendor, min_amount=invoice.total * 0.995,
+                                   max_amount=invoice.total * 1.005, limit=500))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--history", type=int, default=200_000, help="stored transactions")
+    parser.add_argument("--vendors", type=int, default=5_000, help="distinct suppliers")
+    parser.add_argument("--checks", type=int, default=5_000, help="new (non-duplicate) invoices checked")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # every detected duplicate logs a warning
+    rng = random.Random(5)
+    vendors = list(VENDORS) + [
+        f"{''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(4, 9))).title()} Pvt Ltd"
+        for _ in range(max(0, args.vendors - len(VENDORS)))
+    ]
+    storage = TransactionStorage(resident_limit=0, id_file=os.path.join(tempfile.mkdtemp(), "ids"))
+    stored = []
+    for transaction in history(args.history, vendors, rng):
+        stored.append(transaction)
+        storage.add_transaction(transaction)
+
+    detector = DuplicateDetector(storage)
+    start = time.perf_counter()
+    detector._ready()
+    build = time.perf_counter() - start
+    bloom = detector._bloom
+    print(f"{args.history:,} stored transactions from {len(vendors):,} suppliers: filter built in {build:.2f} s, "
+          f"{bloom.memory_bytes() / 1024:,.0f} KiB for {sum(len(f) for f in bloom.filters):,} keys\n")
+
+    fresh = [ExtractionResult(vendor=invoice["invoice_vendor"], invoice_no=f"NEW-{i}", total=invoice["invoice_total"],
+                              date=invoice["invoice_date"])
+             for i, invoice in enumerate(history(args.checks, vendors, rng))]
+    flagged = 0
+    with_filter = []
+    for invoice in fresh:
+        start = time.perf_counter()
+        flagged += bool(detector.check(invoice))
+        with_filter.append(time.perf_counter() - start)
+    without_filter = []
+    for invoice in fresh[:1000]:
+        start = time.perf_counter()
+        query_always(storage, invoice)
+        without_filter.append(time.perf_counter() - start)
+
+    def summary(times):
+        return f"median {statistics.median(times) * 1e6:6.1f} us, mean {statistics.fmean(times) * 1e6:6.1f} us"
+
+    clear = DUPLICATE_CHECKS.value(outcome="clear")
+    print(f"new invoices, with the filter:       {summary(with_filter)}")
+    print(f"new invoices, querying every time:   {summary(without_filter)}")
+    print(f"{clear / len(fresh):.1%} of checks ended at the filter; {flagged} invoices flagged "
+          "(same vendor, total and date as a stored one)\n")
+
+    for label, renumber in (("resubmitted", False), ("renumbered", True)):
+        originals = rng.sample(stored, 200)
+        found = sum(
+            any(duplicate["invoice_number"] == original["invoice_number"]
+                for duplicate in detector.check(resubmitted(original, rng, renumber)))
+            for original in originals
+        )
+        print(f"{label + ':':<14} {found}/{len(originals)} detected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+CSV Export Benchmark
+Compares the legacy pandas export path with the streaming CSV export
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from bench_data import synthetic_transactions
+
+from src.core.storage import TransactionStorage, iter_csv, mismatch_summary
+
+
+def legacy_export(transactions) -> bytes:
+    """The pre-streaming path: list of dicts -> DataFrame -> CSV"""
+    import pandas as pd
+
+    csv_data = []
+    for transaction in transactions:
+        csv_data.append({
+            "Invoice Vendor": transaction.get("invoice_vendor", "N/A"),
+            "PO Vendor": transaction.get("po_vendor", "N/A"),
+            "Invoice Total": transaction.get("invoice_total", 0),
+            "PO Total": transaction.get("po_total", 0),
+            "Invoice Date": transaction.get("invoice_date", "N/A"),
+            "PO Date": transaction.get("po_date", "N/A"),
+            "Invoice Number": transaction.get("invoice_number", "N/A"),
+            "PO Number": transaction.get("po_number", "N/A"),
+            "Status": transaction.get("status", "Unknown"),
+            "Mismatched Fields": mismatch_summary(transaction.get("details", {})),
+            "Timestamp": transaction.get("timestamp", "N/A")
+        })
+    return pd.DataFrame(csv_data).to_csv(index=False).encode("utf-8")
+
+
+def streaming_export(transactions):
+    """Consume the streaming exporter like an HTTP client would"""
+    first_byte = None
+    start = time.perf_counter()
+    size = 0
+    for chunk in iter_csv(transactions):
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    return first_byte, size
+
+
+def measure(label, function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<10} {elapsed:8.2f} s   peak {peak / 1024 / 1024:8.1f} MB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"Generating {args.rows:,} transactions...")
+    storage = TransactionStorage()
+    for transaction in synthetic_transactions(args.rows):
+        storage.add_transaction(transaction)
+
+    print("\nExport (time, peak traced memory above the stored history):")
+    measure("legacy", legacy_export, storage.iter_transactions())
+    first_byte, size = measure("streaming", streaming_export, storage.iter_transactions())
+    print(f"\n  streaming time to first byte: {first_byte * 1000:.2f} ms, {size / 1024 / 1024:.1f} MB written")
+
+
+if __name__ == "__main__":
+    main()
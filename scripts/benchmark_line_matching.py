@@ -0,0 +1,88 @@
+"""
+Line Matching Benchmark
+Times reconcile_line_items on invoices with hundreds of lines and checks the pairing
+"""
+
+import argparse
+import logging
+import os
+import random
+import string
+import sys
+import time
+
+# Make `src` importable when the script is run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.line_matching import reconcile_line_items  # noqa: E402
+from src.core.records import LineItem  # noqa: E402
+
+PRODUCTS = ["bolt", "nut", "washer", "bearing", "gasket", "valve", "pipe", "cable", "fuse", "relay",
+            "switch", "bracket", "hinge", "spring", "clamp", "filter", "belt", "pulley", "sensor", "motor"]
+SPECS = ["M6", "M8", "M10", "12mm", "25mm", "SS304", "brass", "zinc", "3/4 in", "heavy duty", "type A", "type B"]
+
+
+def garble(text, rng, edits=1):
+    """Simulate OCR errors by replacing characters"""
+    chars = list(text)
+    for _ in range(edits):
+        chars[rng.randrange(len(chars))] = rng.choice(string.ascii_lowercase)
+    return "".join(chars)
+
+
+def documents(lines, rng):
+    """
+    A PO and its invoice: the invoice lists the PO lines in another order with
+    OCR noise, a few changed quantities, a few PO lines left off and a few extras
+
+    Returns:
+        (invoice items, PO items, expected PO line per invoice line or None)
+    """
+    po = []
+    for _ in range(lines):
+        description = f"{rng.choice(PRODUCTS)} {rng.choice(SPECS)} {rng.choice(PRODUCTS)} {rng.randint(1, 999)}"
+        po.append(LineItem(description, rng.randint(1, 200), round(rng.uniform(1, 500), 2)))
+
+    invoice, expected = [], []
+    for number, item in enumerate(po):
+        roll = rng.random()
+        if roll < 0.03:
+            continue  # not invoiced
+        quantity = item.quantity + rng.randint(1, 5) if roll < 0.1 else item.quantity
+        invoice.append(LineItem(garble(item.description, rng), quantity, item.unit_price))
+        expected.append(number)
+    for _ in range(max(1, lines // 50)):
+        invoice.append(LineItem(f"freight charge {rng.randint(1, 99)}", 1, round(rng.uniform(50, 500), 2)))
+        expected.append(None)
+
+    order = list(range(len(invoice)))
+    rng.shuffle(order)
+    return [invoice[i] for i in order], po, [expected[i] for i in order]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, nargs="+", default=[50, 200, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    rng = random.Random(11)
+    reconcile_line_items([LineItem("warm up", 1, 1)], [LineItem("warm up", 1, 1)])  # imports NumPy
+
+    print(f"{'lines':>6} {'time':>10} {'pairs right':>12} {'lines flagged':>14}")
+    for lines in args.lines:
+        invoice, po, expected = documents(lines, rng)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            result = reconcile_line_items(invoice, po)
+        elapsed = (time.perf_counter() - start) / args.repeat
+
+        paired = {line["invoice_line"] - 1: line["po_line"] - 1 for line in result["lines"]}
+        right = sum(paired.get(number) == want for number, want in enumerate(expected))
+        flagged = sum(not line["matched"] for line in result["lines"]) + len(result["not_on_po"])
+        print(f"{lines:>6} {elapsed * 1000:>7.1f} ms {right / len(expected):>12.1%} {flagged:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Transaction Record Memory Benchmark
+Compares per-record memory of plain transaction dicts with slotted TransactionRecords
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from bench_data import synthetic_transactions
+
+from src.core.records import TransactionRecord
+from src.core.storage import TransactionStorage
+
+
+def measure(label, build, count):
+    gc.collect()
+    tracemalloc.start()
+    held = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<8} {current / count:8.0f} B/record   {current / 1024 / 1024:8.1f} MB")
+    del held
+    return current
+
+
+def scan(label, storage, repeat=3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows = sum(1 for _ in storage.iter_filtered("2025-01-10 00:00:00", "2025-01-20 23:59:59", matched=False))
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<8} filtered scan {elapsed * 1000:8.1f} ms ({rows:,} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    # Both sides decode the same JSON, so each owns its strings (as after an upload)
+    source = list(synthetic_transactions(args.rows))
+    encoded = [json.dumps(t) for t in source]
+
+    print(f"Resident memory for {args.rows:,} transactions:")
+    dicts = measure("dict", lambda: [dict(json.loads(t), id=i) for i, t in enumerate(encoded, 1)], args.rows)
+    records = measure(
+        "record", lambda: [TransactionRecord.from_dict(json.loads(t), id=i) for i, t in enumerate(encoded, 1)], args.rows
+    )
+    print(f"\n  reduction: {(1 - records / dicts) * 100:.0f}%")
+
+    print("\nScans (matched=False within a ten-day window):")
+    storage = TransactionStorage()
+    for transaction in source:
+        storage.add_transaction(transaction)
+    scan("record", storage)
+
+    legacy = TransactionStorage()
+    legacy.transactions = [dict(t, id=i) for i, t in enumerate(source, 1)]
+    scan("dict", _DictScan(legacy.transactions))
+
+
+class _DictScan(TransactionStorage):
+    """Generic dict-based filtering, as used before typed records"""
+
+    def __init__(self, transactions):
+        self.transactions = transactions
+
+    def iter_filtered(self, *args, **kwargs):
+        return super(TransactionStorage, self).iter_filtered(*args, **kwargs)
+
+    def _iter_after(self, since_id):
+        return iter(self.transactions)
+
+
+if __name__ == "__main__":
+    main()
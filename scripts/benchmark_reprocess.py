@@ -0,0 +1,88 @@
+"""
+Reprocessing Benchmark
+Stored OCR text size and offline reprocessing throughput by worker count, on synthetic OCR responses
+"""
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+from bench_data import VENDORS
+
+from src.core.comparison import compare_invoice_po
+from src.core.reprocess import reprocess
+from src.core.storage import TransactionStorage
+from src.core.text_store import RawTextStore
+from src.services.ocr_service import extract_fields
+
+PRODUCTS = ["bolt", "nut", "washer", "bearing", "gasket", "valve", "pipe", "cable", "fuse", "relay"]
+
+
+def ocr_response(vendor, number, po_number, day, lines, rng):
+    """A Shivaay AI response in the requested format, with a raw text section like a scanned page"""
+    items = []
+    total = 0.0
+    for _ in range(lines):
+        quantity, price = rng.randint(1, 50), round(rng.uniform(5, 900), 2)
+        total += quantity * price
+        items.append(f"{rng.choice(PRODUCTS)} {rng.randint(6, 40)}mm | {quantity} | {price:.2f} | {quantity * price:.2f}")
+    raw = "\n".join(f"{line.replace(' | ', '   ')}" for line in items)
+    return (
+        f"VENDOR: {vendor}\nINVOICE_NO: {number}\nPO_NO: {po_number}\nDATE: {day}\nTOTAL: {total:,.2f}\n\n"
+        "LINE_ITEMS:\n" + "\n".join(items) + "\n\n"
+        f"RAW_TEXT:\nTAX INVOICE\n{vendor}\nPlot 14, Industrial Area, Phase II\nGSTIN 27AABCU9603R1ZM\n"
+        f"Invoice No {number}   Date {day}\nBill To: Futurix Procurement\nPO Ref {po_number}\n"
+        f"Description   Qty   Rate   Amount\n{raw}\nGrand Total {total:,.2f}\n"
+        "Terms: payment within 30 days of receipt. Subject to local jurisdiction.\n"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transactions", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    rng = random.Random(11)
+    directory = tempfile.mkdtemp()
+    storage = TransactionStorage(resident_limit=0, id_file=os.path.join(directory, "ids"))
+    text_store = RawTextStore(os.path.join(directory, "raw_text"))
+
+    text_bytes = 0
+    for i in range(args.transactions):
+        vendor = rng.choice(VENDORS)
+        day = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025"
+        lines = rng.randint(1, 12)
+        invoice_text = ocr_response(vendor, f"INV-{i:07d}", f"PO-{i:07d}", day, lines, rng)
+        po_text = ocr_response(vendor, "N/A", f"PO-{i:07d}", day, lines, rng) if rng.random() < 0.2 else invoice_text
+        invoice, po = extract_fields(invoice_text), extract_fields(po_text)
+        comparison = compare_invoice_po(invoice, po)
+        transaction_id = storage.add_transaction({
+            "invoice_vendor": invoice.vendor, "po_vendor": po.vendor,
+            "invoice_total": invoice.total, "po_total": po.total,
+            "invoice_date": invoice.date, "po_date": po.date,
+            "invoice_number": invoice.invoice_no, "po_number": po.po_no,
+            "status": comparison["status"], "timestamp": "2025-06-01 12:00:00",
+            "details": comparison["details"],
+        })
+        text_store.add(transaction_id, invoice_text, po_text, f"{i:032d}")
+        text_bytes += len(invoice_text.encode()) + len(po_text.encode())
+
+    stored = text_store.stats()["bytes"]
+    print(f"{args.transactions:,} transactions: {text_bytes / 2 ** 20:,.1f} MiB of OCR text stored in "
+          f"{stored / 2 ** 20:,.1f} MiB ({text_bytes / stored:.1f}x)\n")
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        summary = reprocess(storage, text_store, workers=workers)
+        seconds = time.perf_counter() - start
+        print(f"{workers:>2} worker(s): {seconds:6.2f} s, {summary['processed'] / seconds:8,.0f} transactions/s, "
+              f"{summary['changed']} changed (extractors unchanged, so 0 expected)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Similarity Scorer Benchmark
+Per-pair cost of each scorer against the equivalent fuzzywuzzy call, on skewed vendor name pairs
+"""
+
+import argparse
+import random
+import string
+import time
+
+from bench_data import VENDORS
+
+from fuzzywuzzy import fuzz
+
+from src.core.config import settings
+from src.core.similarity import SCORERS
+
+# Spellings of one supplier seen across documents
+VARIANTS = [
+    lambda name: name,
+    lambda name: name.upper(),
+    lambda name: name.replace("Pvt Ltd", "Private Limited").replace("Ltd", "Limited"),
+    lambda name: name.replace(" ", "  ") + ".",
+    lambda name: "M/s " + name,
+]
+
+# The call each scorer replaces (fuzzy_match_vendor lowercased and called fuzz.ratio per pair)
+FUZZYWUZZY = {
+    "ratio": lambda pairs: [fuzz.ratio(a.lower(), b.lower()) for a, b in pairs],
+    "partial": lambda pairs: [fuzz.partial_ratio(a.lower(), b.lower()) for a, b in pairs],
+    "token_set": lambda pairs: [fuzz.token_set_ratio(a, b) for a, b in pairs],
+}
+
+
+def ocr_noise(name, rng):
+    chars = list(name)
+    chars[rng.randrange(len(chars))] = rng.choice(string.ascii_letters)
+    return "".join(chars)
+
+
+def vendor_pairs(count, vendors, rng):
+    """
+    (invoice vendor, PO vendor) pairs: a few suppliers account for most
+    documents (Zipf-like), most pairs name the same supplier in two
+    spellings and some carry an OCR error
+    """
+    weights = [1 / (rank + 1) for rank in range(len(vendors))]
+    pairs = []
+    for _ in range(count):
+        vendor = rng.choices(vendors, weights)[0]
+        other = vendor if rng.random() < 0.85 else rng.choices(vendors, weights)[0]
+        invoice = rng.choice(VARIANTS)(vendor)
+        po = rng.choice(VARIANTS)(other)
+        if rng.random() < 0.05:
+            invoice = ocr_noise(invoice, rng)
+        pairs.append((invoice, po))
+    return pairs
+
+
+def timed(score_all, pairs):
+    start = time.perf_counter()
+    results = score_all(pairs)
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pairs", type=int, default=100_000)
+    parser.add_argument("--vendors", type=int, default=2_000, help="distinct suppliers (bench_data names plus generated ones)")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    suffixes = ["Pvt Ltd", "Ltd", "Inc", "LLP", "Traders", "Industries", "& Co"]
+    vendors = list(VENDORS) + [
+        f"{''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(3, 8))).title()} {rng.choice(suffixes)}"
+        for _ in range(max(0, args.vendors - len(VENDORS)))
+    ]
+    pairs = vendor_pairs(args.pairs, vendors, rng)
+    threshold = settings.VENDOR_FUZZY_THRESHOLD
+    print(f"{args.pairs:,} vendor pairs over {len(vendors):,} suppliers, threshold {threshold}\n")
+    print(f"{'scorer':<10} {'fuzzywuzzy':>12} {'scorer':>10} {'+ cutoff':>10} {'speedup':>8}  same decisions")
+
+    for name, scorer in SCORERS.items():
+        reference, reference_time = timed(FUZZYWUZZY[name], pairs)
+        scores, plain_time = timed(lambda pairs: [scorer(a, b) for a, b in pairs], pairs)
+        cut, cutoff_time = timed(lambda pairs: [scorer(a, b, threshold) for a, b in pairs], pairs)
+        assert scores == reference, f"{name} scores differ from fuzzywuzzy"
+        same = all((r >= threshold) == (c >= threshold) for r, c in zip(reference, cut))
+        per_pair = lambda seconds: f"{seconds / args.pairs * 1e6:.2f} us"  # noqa: E731
+        print(f"{name:<10} {per_pair(reference_time):>12} {per_pair(plain_time):>10} {per_pair(cutoff_time):>10} "
+              f"{reference_time / cutoff_time:>7.1f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
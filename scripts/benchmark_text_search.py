@@ -0,0 +1,95 @@
+"""
+Text Search Benchmark
+Indexing rate, index size and query latency of the full-text index on synthetic OCR text
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+
+from bench_data import VENDORS
+
+from src.core.text_index import TextIndex
+
+PRODUCTS = ["bolt", "nut", "washer", "bearing", "gasket", "valve", "pipe", "cable", "fuse", "relay",
+            "switch", "bracket", "hinge", "spring", "clamp", "filter", "belt", "pulley", "sensor", "motor"]
+CITIES = ["Pune", "Mumbai", "Chennai", "Nagpur", "Indore", "Surat", "Kochi", "Jaipur", "Lucknow", "Bhopal"]
+
+
+def part_number(rng):
+    return f"{rng.choice(string.ascii_uppercase)}{rng.choice(string.ascii_uppercase)}-{rng.randint(1000, 99999)}"
+
+
+def document(number, parts, rng):
+    """One invoice page as OCR text: header, address, a few lines with part numbers, totals"""
+    vendor = rng.choice(VENDORS)
+    lines, total = [], 0.0
+    for _ in range(rng.randint(1, 6)):
+        quantity, price = rng.randint(1, 50), round(rng.uniform(5, 900), 2)
+        total += quantity * price
+        lines.append(f"{rng.choice(parts)} {rng.choice(PRODUCTS)} {rng.randint(6, 40)}mm {quantity} "
+                     f"{price:,.2f} {quantity * price:,.2f}")
+    return (
+        f"VENDOR: {vendor}\nINVOICE_NO: INV-{number:07d}\nPO_NO: PO-{rng.randint(1, 10 ** 6):07d}\n"
+        f"DATE: {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025\nTOTAL: {total:,.2f}\n"
+        f"RAW_TEXT:\nTAX INVOICE {vendor}\nPlot {rng.randint(1, 400)}, MIDC, {rng.choice(CITIES)}\n"
+        + "\n".join(lines) + f"\nGrand Total {total:,.2f}\n"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200, help="queries timed per kind")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    rng = random.Random(17)
+    parts = [part_number(rng) for _ in range(50_000)]
+    directory = os.path.join(tempfile.mkdtemp(), "index")
+    index = TextIndex(directory)
+
+    start = time.perf_counter()
+    for number in range(1, args.documents + 1):
+        index.add(number, (document(number, parts, rng),))
+    index.flush()
+    build = time.perf_counter() - start
+    stats = index.stats()
+    print(f"{args.documents:,} documents indexed in {build:.1f} s ({args.documents / build:,.0f}/s), "
+          f"{stats['segments']} segments, {stats['bytes'] / 2 ** 20:,.0f} MiB on disk")
+
+    # Reopen: segments are mapped, not read
+    index = TextIndex(directory)
+    start = time.perf_counter()
+    index.stats()
+    print(f"reopened in {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    kinds = {
+        "invoice id": lambda: f"INV-{rng.randint(1, args.documents):07d}",
+        "part number": lambda: rng.choice(parts),
+        "common word": lambda: rng.choice(PRODUCTS),
+        "two words": lambda: f"{rng.choice(PRODUCTS)} {rng.choice(CITIES)}",
+        "id prefix": lambda: f"INV-{rng.randint(1, args.documents):07d}"[:9] + "*",
+        "word prefix": lambda: rng.choice(PRODUCTS)[:3] + "*",
+    }
+    print(f"{'query':<14} {'median':>9} {'p99':>9} {'matches':>10}")
+    for kind, make in kinds.items():
+        times, totals = [], []
+        for _ in range(args.queries):
+            query = make()
+            start = time.perf_counter()
+            result = index.search(query, limit=10)
+            times.append(time.perf_counter() - start)
+            totals.append(result["total"])
+        times.sort()
+        print(f"{kind:<14} {statistics.median(times) * 1000:7.2f} ms {times[int(len(times) * 0.99)] * 1000:6.2f} ms "
+              f"{statistics.median(totals):>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Vendor Registry Benchmark
+Lookup latency and accuracy of the n-gram index against a brute-force scan
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+# Make `src` importable when the script is run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.similarity import ratio  # noqa: E402
+from src.core.vendor_registry import VendorRegistry, canonical_vendor_key  # noqa: E402
+
+SYLLABLES = ["ab", "tra", "ko", "ni", "sha", "ram", "in", "fo", "tech", "glo",
+             "bal", "zen", "ith", "max", "pro", "del", "ta", "vis", "mar", "kar"]
+SUFFIXES = ["Pvt Ltd", "Private Limited", "Inc", "LLP", "Corporation", "Ltd",
+            "& Sons", "Traders", "Supplies", "Industries"]
+
+
+def synthetic_vendors(count, rng):
+    """Names built from a small syllable set: many near-duplicates, a hard case for blocking"""
+    for _ in range(count):
+        words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+                 for _ in range(rng.randint(1, 3))]
+        yield " ".join(words) + " " + rng.choice(SUFFIXES)
+
+
+def garble(name, rng, edits=2):
+    """Simulate OCR errors by replacing characters"""
+    chars = list(name)
+    for _ in range(edits):
+        chars[rng.randrange(len(chars))] = rng.choice(string.ascii_letters)
+    return "".join(chars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vendors", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=2_000)
+    parser.add_argument("--brute-force", type=int, default=200, help="lookups also checked by full scan")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    registry = VendorRegistry()
+    names = list(synthetic_vendors(args.vendors, rng))
+
+    start = time.perf_counter()
+    for number, name in enumerate(names):
+        registry._ready().add(f"V{number:06d}", name)
+    registry._ready().freeze()
+    print(f"Indexed {args.vendors:,} vendors in {time.perf_counter() - start:.2f} s")
+
+    queries = [(number, garble(names[number], rng)) for number in rng.sample(range(args.vendors), args.lookups)]
+    start = time.perf_counter()
+    found = [registry.lookup(query, top=5) for _, query in queries]
+    elapsed = time.perf_counter() - start
+    correct = sum(bool(matches) and matches[0].vendor_id == f"V{number:06d}"
+                  for (number, _), matches in zip(queries, found))
+    print(f"  lookup (top 5)  {elapsed / args.lookups * 1000:.3f} ms   top-1 correct {correct / args.lookups:.1%}")
+
+    # The index should find the same best score as comparing against every entry
+    index = registry._ready()
+    agree = 0
+    for (_, query), matches in zip(queries[:args.brute_force], found):
+        key = canonical_vendor_key(query)
+        best = max(ratio(key, entry) for entry in index.keys)
+        agree += bool(matches) and matches[0].score == best
+    print(f"  best score equals brute-force scan: {agree / min(args.brute_force, len(queries)):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Offline Reprocessing
+Re-run field extraction and comparison over the stored OCR text and report what would change
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+# Make `src` importable when the script is run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.config import settings  # noqa: E402
+from src.core.reprocess import reprocess  # noqa: E402
+from src.core.rules import ComparisonRules  # noqa: E402
+from src.core.storage import create_storage  # noqa: E402
+from src.core.text_store import RawTextStore  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        epilog="Reads the configured storage backend (STORAGE_BACKEND); the memory backend only "
+               "holds what this process stores, so use the sqlite or log backend, or POST /reprocess "
+               "on the running server.",
+    )
+    parser.add_argument("--after-id", type=int, default=0, help="only transactions with a larger id")
+    parser.add_argument("--until-id", type=int, help="only transactions up to this id")
+    parser.add_argument("--workers", type=int, default=settings.REPROCESS_WORKERS, help="worker processes")
+    parser.add_argument("--sample", type=int, default=10, help="changed transactions to print")
+    parser.add_argument("--output", help="write every changed transaction to this JSON-lines file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    storage = create_storage()
+    text_store = RawTextStore(settings.RAW_TEXT_DIR)
+    rules = ComparisonRules(settings.COMPARISON_RULES_PATH)
+    try:
+        summary = reprocess(storage, text_store, rules.policy_for, workers=args.workers, after_id=args.after_id,
+                            until_id=args.until_id, sample=args.sample, output=args.output)
+    finally:
+        storage.close()
+        text_store.close()
+    print(json.dumps(summary, indent=2, ensure_ascii=False, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,18 +3,45 @@ Futurix AI - Main FastAPI Application
 API Routes and Server Configuration
 """
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Header, Query
+from fastapi.responses import Response, StreamingResponse, FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 import os
+import time
 import shutil
-from datetime import datetime
-from typing import Optional
+import logging
+import uuid
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+from typing import Optional, Dict, Any, List, Tuple
 
 from src.services.ocr_service import extract_data_from_file
 from src.core.comparison import compare_invoice_po
-from src.core.storage import TransactionStorage, export_to_csv
+from src.core.storage import create_storage, iter_csv, parse_time_bound
+from src.core.query import TransactionQuery, query_limit
+from src.core.export_cache import ExportCache
+from src.core.vendor_registry import VendorRegistry, canonical_vendor_key
+from src.core.po_pool import POPool, file_digest
+from src.core.line_matching import reconcile_line_items
+from src.core.records import ExtractionResult
+from src.core.rules import ComparisonRules
+from src.core.duplicates import DuplicateDetector
+from src.core.text_store import RawTextStore
+from src.core.text_index import TextIndex, snippet
+from src.core.reprocess import reprocess
+from src.core.columnar_export import (
+    iter_parquet, iter_arrow, export_schema, PARQUET_MEDIA_TYPE, ARROW_MEDIA_TYPE
+)
 from src.core.config import settings
+from src.core.admission import AdmissionController, AdmissionRejected, INTERACTIVE
+from src.utils.logging_utils import setup_logging, shutdown_logging, request_id_var, new_request_id
+from src.utils.metrics import (
+    track_stage, render_metrics, CONTENT_TYPE_LATEST,
+    REQUEST_COUNT, REQUEST_LATENCY, IN_FLIGHT
+)
+
+logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -34,12 +61,114 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+_ROUTE_PATHS = set()
+
+
+def _route_paths() -> set:
+    """Paths of all registered routes (computed once, after startup)"""
+    if not _ROUTE_PATHS:
+        _ROUTE_PATHS.update(getattr(route, "path", "") for route in app.routes)
+    return _ROUTE_PATHS
+
+
+@app.on_event("startup")
+async def configure_logging():
+    """Start the queue-backed log writer"""
+    setup_logging()
+
+
+@app.on_event("startup")
+async def drop_stale_text():
+    """Drop OCR text and its index left by earlier runs of a non-durable backend"""
+    if not storage.durable:
+        # Those transactions are gone and ids moved on, so the text would never line up again
+        text_index.clear()
+        text_store.clear()
+
+
+@app.on_event("shutdown")
+async def close_resources():
+    """Close the storage backend and flush pending log records"""
+    storage.close()
+    text_index.close()
+    text_store.close()
+    shutdown_logging()
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests, track in-flight requests and observe latency per route"""
+    # Only known route paths become label values, to keep cardinality bounded
+    path = request.url.path if request.url.path in _route_paths() else "other"
+    IN_FLIGHT.inc(path=path)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        label = getattr(route, "path", "unmatched")
+        IN_FLIGHT.dec(path=path)
+        REQUEST_LATENCY.observe(time.perf_counter() - start, method=request.method, path=label)
+        REQUEST_COUNT.inc(method=request.method, path=label, status=str(status))
+
+
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """Tag the request (and every log line it produces) with a request id"""
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        request_id_var.reset(token)
+
+
 # Create data directories
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 os.makedirs(settings.EXPORT_DIR, exist_ok=True)
 
-# Initialize storage
-storage = TransactionStorage()
+# Export formats: name -> (file extension, media type)
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "parquet": ("parquet", PARQUET_MEDIA_TYPE),
+    "arrow": ("arrow", ARROW_MEDIA_TYPE),
+}
+
+# Initialize storage (backend selected by settings.STORAGE_BACKEND)
+storage = create_storage()
+
+# Latest full export per format, reused until transactions change
+export_cache = ExportCache()
+
+# Bound concurrent upload processing; excess load is shed with 429
+admission = AdmissionController()
+
+# Canonical supplier list (read on first lookup)
+vendor_registry = VendorRegistry(settings.VENDOR_REGISTRY_PATH)
+
+# Open purchase orders for invoice-only uploads (replayed on first use)
+po_pool = POPool(settings.PO_POOL_PATH)
+
+# Per-vendor comparison policies (recompiled when the rules file changes)
+comparison_rules = ComparisonRules(settings.COMPARISON_RULES_PATH)
+
+# Flags invoices already seen in the stored history (filter built on first check)
+duplicate_detector = DuplicateDetector(storage)
+
+# Full OCR text of every transaction, for offline reprocessing (indexes read on first use)
+text_store = RawTextStore(settings.RAW_TEXT_DIR)
+
+# Full-text search over that text (segments memory-mapped on first use)
+text_index = TextIndex(settings.TEXT_INDEX_DIR, text_store)
+
+# Document formats accepted for upload
+ALLOWED_EXTENSIONS = {'.pdf', '.png', '.jpg', '.jpeg'}
 
 
 @app.get("/")
@@ -49,16 +178,239 @@ async def root():
         "message": "Futurix AI MVP Backend running 🚀",
         "version": "1.0.0",
         "ocr_engine": "Shivaay AI Vision",
-        "endpoints": ["/upload", "/export", "/history", "/stats"],
+        "endpoints": ["/upload", "/export", "/history", "/stats", "/metrics"],
         "setup_guide": "See docs/SHIVAAY_AI_SETUP.md for API key configuration",
         "status": "operational"
     }
 
 
+def _save_upload(upload: UploadFile, prefix: str, ext: str, suffix: str) -> str:
+    """Save an uploaded file under UPLOAD_DIR and return its path"""
+    # Timestamp for readability, random suffix so concurrent uploads in the
+    # same second never overwrite each other
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(settings.UPLOAD_DIR, f"{prefix}_{timestamp}_{suffix}{ext}")
+    with open(path, "wb") as f:
+        shutil.copyfileobj(upload.file, f)
+    return path
+
+
+def _extract_po(po_path: str, pool: bool = False) -> Tuple[ExtractionResult, str, bool]:
+    """
+    Extract a PO document, reusing the pooled extraction of identical content
+
+    Args:
+        po_path: Saved PO file
+        pool: Add a successfully extracted PO to the open-PO pool (POs
+            submitted through /pos); a PO paired with its invoice in /upload
+            is not left open
+
+    Returns:
+        (extraction, po_id, whether it was already pooled)
+    """
+    po_id = file_digest(po_path)
+    pooled = po_pool.get(po_id)
+    if pooled is not None:
+        logger.debug("PO %s already pooled, skipping OCR", po_id)
+        return pooled.extraction, po_id, True
+
+    po_data = extract_data_from_file(po_path)
+    if pool and po_data.error is None:
+        vendor = vendor_registry.resolve(po_data.vendor)
+        po_pool.add(po_id, po_data, vendor.vendor_id if vendor else None)
+        _store_text(text_store.add_document, po_id, po_data.raw_text)
+    return po_data, po_id, False
+
+
+def _store_text(store, *args) -> None:
+    """Write OCR text to the text store; a failure only costs reprocessing, not the upload"""
+    try:
+        with track_stage("raw_text"):
+            store(*args)
+    except OSError:
+        logger.exception("Could not store OCR text")
+
+
+def _store_comparison(invoice_data: ExtractionResult, po_data: ExtractionResult,
+                      comparison_result: Dict[str, Any], vendor, started: float, po_id: Optional[str] = None) -> int:
+    """
+    Store the transaction for a compared pair (and the OCR text it came from) and return its id
+
+    A pooled PO is closed once an invoice is stored against it, so it is not
+    offered to later invoices.
+    """
+    transaction = {
+        "invoice_vendor": invoice_data.vendor,
+        "po_vendor": po_data.vendor,
+        "invoice_total": invoice_data.total,
+        "po_total": po_data.total,
+        "invoice_date": invoice_data.date,
+        "po_date": po_data.date,
+        "invoice_number": invoice_data.invoice_no,
+        "po_number": po_data.po_no,
+        "status": comparison_result["status"],
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "details": comparison_result.get("details", {}),
+        "vendor_id": vendor.vendor_id if vendor else None
+    }
+
+    with track_stage("storage"):
+        transaction_id = storage.add_transaction(transaction, latency=time.perf_counter() - started)
+    duplicate_detector.add(transaction_id, transaction)
+    if po_id is not None and po_pool.close(po_id):
+        logger.info("PO closed after matching", extra={"po_id": po_id, "transaction_id": transaction_id})
+    _store_text(text_store.add, transaction_id, invoice_data.raw_text, po_data.raw_text or None, po_id)
+    _index_text(transaction_id, invoice_data, po_data)
+
+    logger.info("Processing complete", extra={"status": comparison_result["status"]})
+    return transaction_id
+
+
+def _index_text(transaction_id: int, invoice_data: ExtractionResult, po_data: ExtractionResult) -> None:
+    """Add a transaction's OCR text to the search index"""
+    texts = (invoice_data.raw_text, po_data.raw_text)
+    if not po_data.raw_text:
+        # A PO pooled before a restart no longer holds its text; the text store does
+        texts = text_store.texts(transaction_id) or texts
+    with track_stage("text_index"):
+        text_index.add(transaction_id, texts)
+
+
+def _reconcile_lines(invoice_data: ExtractionResult, po_data: ExtractionResult) -> Optional[Dict[str, Any]]:
+    """Line-level reconciliation, or None when neither document lists line items"""
+    if not invoice_data.line_items and not po_data.line_items:
+        return None
+    with track_stage("line_matching"):
+        return reconcile_line_items(invoice_data.line_items, po_data.line_items)
+
+
+def _find_duplicates(invoice_data: ExtractionResult, vendor) -> List[Dict[str, Any]]:
+    """Earlier transactions for the same invoice (checked before it is stored)"""
+    with track_stage("duplicate_check"):
+        return duplicate_detector.check(invoice_data, vendor.vendor_id if vendor else None)
+
+
+def _process_upload(invoice: UploadFile, po: UploadFile, invoice_ext: str, po_ext: str) -> Dict[str, Any]:
+    """
+    Save, extract, compare and store one invoice/PO pair
+
+    Runs in the thread pool: OCR and PDF conversion are blocking calls and
+    must not stall the event loop.
+    """
+    started = time.perf_counter()
+
+    # Save uploaded files
+    suffix = uuid.uuid4().hex[:12]
+    with track_stage("save"):
+        invoice_path = _save_upload(invoice, "invoice", invoice_ext, suffix)
+        po_path = _save_upload(po, "po", po_ext, suffix)
+
+    logger.debug("Files saved: %s, %s", invoice_path, po_path)
+
+    # Extract data from both files using OCR (a PO already in the pool is not re-OCR'd)
+    invoice_data = extract_data_from_file(invoice_path)
+
+    po_data, po_id, _ = _extract_po(po_path)
+
+    # Map the OCR'd vendor name onto the canonical supplier list
+    with track_stage("vendor_lookup"):
+        vendor = vendor_registry.resolve(invoice_data.vendor or po_data.vendor)
+
+    # Compare invoice and PO under the vendor's policy
+    with track_stage("comparison"):
+        policy = comparison_rules.policy_for(vendor.vendor_id if vendor else None,
+                                             invoice_data.vendor or po_data.vendor)
+        comparison_result = compare_invoice_po(invoice_data, po_data, policy)
+
+    line_items = _reconcile_lines(invoice_data, po_data)
+    duplicates = _find_duplicates(invoice_data, vendor)
+
+    transaction_id = _store_comparison(invoice_data, po_data, comparison_result, vendor, started, po_id)
+
+    return {
+        "status": "processed",
+        "invoice": invoice_data.to_dict(),
+        "po": po_data.to_dict(),
+        "result": comparison_result,
+        "line_items": line_items,
+        "duplicates": duplicates,
+        "transaction_id": transaction_id,
+        "vendor": vendor._asdict() if vendor else None
+    }
+
+
+def _process_invoice(invoice: UploadFile, invoice_ext: str) -> Dict[str, Any]:
+    """
+    Save and extract one invoice, find its PO in the pool, compare and store
+
+    Runs in the thread pool, like _process_upload.
+    """
+    started = time.perf_counter()
+
+    with track_stage("save"):
+        invoice_path = _save_upload(invoice, "invoice", invoice_ext, uuid.uuid4().hex[:12])
+
+    invoice_data = extract_data_from_file(invoice_path)
+
+    with track_stage("vendor_lookup"):
+        vendor = vendor_registry.resolve(invoice_data.vendor)
+
+    vendor_id = vendor.vendor_id if vendor else None
+    with track_stage("po_lookup"):
+        match = po_pool.find(invoice_data, vendor_id, comparison_rules.policy_for(vendor_id, invoice_data.vendor))
+
+    if match is None:
+        logger.info("No pooled PO found for invoice", extra={"invoice_no": invoice_data.invoice_no})
+        return {
+            "status": "no_matching_po",
+            "invoice": invoice_data.to_dict(),
+            "open_pos": len(po_pool),
+            "vendor": vendor._asdict() if vendor else None
+        }
+
+    po_data = match.po.extraction
+    vendor = vendor or vendor_registry.resolve(po_data.vendor)
+    duplicates = _find_duplicates(invoice_data, vendor)
+    transaction_id = _store_comparison(invoice_data, po_data, match.comparison, vendor, started, match.po.po_id)
+
+    return {
+        "status": "processed",
+        "invoice": invoice_data.to_dict(),
+        "po": po_data.to_dict(),
+        "result": match.comparison,
+        "line_items": _reconcile_lines(invoice_data, po_data),
+        "duplicates": duplicates,
+        "transaction_id": transaction_id,
+        "vendor": vendor._asdict() if vendor else None,
+        "po_match": {
+            "po_id": match.po.po_id,
+            "matched_by": match.matched_by,
+            "candidates": match.candidates
+        }
+    }
+
+
+def _ingest_pos(files: List[Tuple[UploadFile, str]]) -> List[Dict[str, Any]]:
+    """Save and extract PO documents into the pool (thread pool)"""
+    ingested = []
+    for po, po_ext in files:
+        with track_stage("save"):
+            po_path = _save_upload(po, "po", po_ext, uuid.uuid4().hex[:12])
+        po_data, po_id, pooled = _extract_po(po_path, pool=True)
+        ingested.append({
+            "filename": po.filename,
+            "po_id": po_id if po_data.error is None else None,
+            "status": "already_pooled" if pooled else ("pooled" if po_data.error is None else "failed"),
+            "po": po_data.to_dict()
+        })
+    return ingested
+
+
 @app.post("/upload")
 async def upload_and_process(
     invoice: UploadFile = File(...),
-    po: UploadFile = File(...)
+    po: UploadFile = File(...),
+    priority: Optional[str] = Header(INTERACTIVE, alias="X-Request-Priority")
 ):
     """
     Upload invoice and PO files, extract data, and compare
@@ -66,115 +418,226 @@ async def upload_and_process(
     Args:
         invoice: Invoice file (PDF/PNG/JPG)
         po: Purchase Order file (PDF/PNG/JPG)
+        priority: "interactive" (default) or "batch"; batch uploads cannot
+            use the capacity reserved for interactive ones
 
     Returns:
-        JSON with extracted data and comparison results
+        JSON with extracted data and comparison results (429 with
+        Retry-After when the server is overloaded)
     """
-    try:
-        # Validate file formats
-        allowed_extensions = {'.pdf', '.png', '.jpg', '.jpeg'}
-
-        invoice_ext = os.path.splitext(invoice.filename)[1].lower()
-        po_ext = os.path.splitext(po.filename)[1].lower()
-
-        if invoice_ext not in allowed_extensions or po_ext not in allowed_extensions:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Only {', '.join(allowed_extensions)} files are supported"
-            )
-
-        # Generate unique filenames with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        invoice_filename = f"invoice_{timestamp}{invoice_ext}"
-        po_filename = f"po_{timestamp}{po_ext}"
-
-        invoice_path = os.path.join(settings.UPLOAD_DIR, invoice_filename)
-        po_path = os.path.join(settings.UPLOAD_DIR, po_filename)
-
-        # Save uploaded files
-        with open(invoice_path, "wb") as f:
-            shutil.copyfileobj(invoice.file, f)
-
-        with open(po_path, "wb") as f:
-            shutil.copyfileobj(po.file, f)
-
-        print(f"📄 Files saved: {invoice_filename}, {po_filename}")
-
-        # Extract data from both files using OCR
-        print("🔍 Extracting invoice data...")
-        invoice_data = extract_data_from_file(invoice_path)
-
-        print("🔍 Extracting PO data...")
-        po_data = extract_data_from_file(po_path)
-
-        # Compare invoice and PO
-        print("⚖️  Comparing documents...")
-        comparison_result = compare_invoice_po(invoice_data, po_data)
-
-        # Store transaction
-        transaction = {
-            "invoice_vendor": invoice_data.get("vendor", "N/A"),
-            "po_vendor": po_data.get("vendor", "N/A"),
-            "invoice_total": invoice_data.get("total", 0),
-            "po_total": po_data.get("total", 0),
-            "invoice_date": invoice_data.get("date", "N/A"),
-            "po_date": po_data.get("date", "N/A"),
-            "invoice_number": invoice_data.get("invoice_no", "N/A"),
-            "po_number": po_data.get("po_no", "N/A"),
-            "status": comparison_result["status"],
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "details": comparison_result.get("details", {})
-        }
+    # Validate file formats
+    invoice_ext = _upload_extension(invoice)
+    po_ext = _upload_extension(po)
 
-        storage.add_transaction(transaction)
+    return await _admit_and_run(priority, _process_upload, invoice, po, invoice_ext, po_ext)
 
-        print(f"✅ Processing complete! Status: {comparison_result['status']}")
 
-        return {
-            "status": "processed",
-            "invoice": invoice_data,
-            "po": po_data,
-            "result": comparison_result,
-            "transaction_id": len(storage.transactions)
-        }
+def _upload_extension(upload: UploadFile) -> str:
+    """Lowercased file extension of an upload (400 if the format is not supported)"""
+    ext = os.path.splitext(upload.filename or "")[1].lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Only {', '.join(ALLOWED_EXTENSIONS)} files are supported"
+        )
+    return ext
+
 
+async def _admit_and_run(priority: Optional[str], func, *args) -> Any:
+    """Run blocking OCR work in the thread pool once admission control allows it"""
+    try:
+        async with admission.admit(priority):
+            return await run_in_threadpool(func, *args)
+
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error processing files: {str(e)}")
+        logger.exception("Error processing files")
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
 
 
+@app.post("/upload/invoice")
+async def upload_invoice(
+    invoice: UploadFile = File(...),
+    priority: Optional[str] = Header(INTERACTIVE, alias="X-Request-Priority")
+):
+    """
+    Upload an invoice alone and compare it with the best PO from the pool
+
+    The pool is searched by the invoice's PO number, then by canonical vendor
+    within an amount window, then by amount alone.
+
+    Args:
+        invoice: Invoice file (PDF/PNG/JPG)
+        priority: "interactive" (default) or "batch"
+
+    Returns:
+        Same shape as /upload plus `po_match` (which PO, which index found
+        it, how many candidates were compared), or status "no_matching_po"
+    """
+    invoice_ext = _upload_extension(invoice)
+    return await _admit_and_run(priority, _process_invoice, invoice, invoice_ext)
+
+
+@app.post("/pos")
+async def add_purchase_orders(
+    files: List[UploadFile] = File(...),
+    priority: Optional[str] = Header(INTERACTIVE, alias="X-Request-Priority")
+):
+    """
+    Add purchase orders to the pool used by /upload/invoice
+
+    Documents already in the pool (same content) are not OCR'd again.
+
+    Args:
+        files: One or more PO files (PDF/PNG/JPG)
+        priority: "interactive" (default) or "batch"
+
+    Returns:
+        Per file: po_id, status (pooled, already_pooled, failed) and extraction
+    """
+    uploads = [(po, _upload_extension(po)) for po in files]
+    ingested = await _admit_and_run(priority, _ingest_pos, uploads)
+    return {"pos": ingested, "open_pos": len(po_pool)}
+
+
+@app.delete("/pos/{po_id}")
+async def close_purchase_order(po_id: str):
+    """
+    Remove a PO from the pool (e.g. once it has been fully invoiced)
+
+    Returns:
+        Confirmation, or 404 if the PO is not open
+    """
+    if not po_pool.close(po_id):
+        raise HTTPException(status_code=404, detail=f"PO {po_id} is not in the pool")
+    return {"message": f"PO {po_id} closed", "open_pos": len(po_pool)}
+
+
+def _etag() -> str:
+    """Entity tag for the current stored transaction set"""
+    return f'"{storage.change_token()}"'
+
+
+def _validator_headers(etag: str) -> Dict[str, str]:
+    """ETag / Last-Modified headers; clients must revalidate before reuse"""
+    return {
+        "ETag": etag,
+        "Last-Modified": format_datetime(storage.last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+    """304 response if the client's If-None-Match matches the current ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    tags = (tag.strip() for tag in header.split(","))
+    candidates = {tag[2:] if tag.startswith("W/") else tag for tag in tags}
+    if "*" in candidates or etag in candidates:
+        return Response(status_code=304, headers=_validator_headers(etag))
+    return None
+
+
 @app.get("/export")
-async def export_transactions():
+async def export_transactions(
+    request: Request,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    status: Optional[str] = None,
+    since_id: Optional[int] = None,
+    since: Optional[str] = None,
+    export_format: str = Query("csv", alias="format")
+):
     """
-    Export all verified transactions to CSV
+    Export verified transactions as CSV, Parquet or Arrow
+
+    Rows are streamed from storage in chunks (row groups for columnar
+    formats), so memory use does not grow with history size. Full exports
+    are cached on disk until the next insert; every export carries an ETag
+    and honours If-None-Match. The X-Export-Watermark header holds the id
+    of the newest transaction covered, to pass as `since_id` next time.
+
+    Args:
+        start_date: Only include transactions on/after this date (YYYY-MM-DD)
+        end_date: Only include transactions on/before this date (YYYY-MM-DD)
+        status: "matched" or "mismatched"
+        since_id: Only include transactions with a larger id (delta export)
+        since: Only include transactions recorded after this timestamp
+        export_format: "csv" (default), "parquet" or "arrow"
 
     Returns:
-        CSV file download
+        File download (304 if unchanged)
     """
     try:
-        if not storage.transactions:
-            raise HTTPException(
-                status_code=404,
-                detail="No transactions found. Please upload and process files first."
-            )
-
-        # Generate CSV
-        csv_path = export_to_csv(storage.transactions, output_dir=settings.EXPORT_DIR)
-
-        return FileResponse(
-            path=csv_path,
-            filename=f"futurix_transactions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            media_type="text/csv"
+        start = parse_time_bound(start_date)
+        end = parse_time_bound(end_date, end=True)
+        if since:
+            after = datetime.strptime(parse_time_bound(since), "%Y-%m-%d %H:%M:%S") + timedelta(seconds=1)
+            start = max(start or "", after.strftime("%Y-%m-%d %H:%M:%S"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD or YYYY-MM-DD HH:MM:SS")
+
+    if status not in (None, "matched", "mismatched"):
+        raise HTTPException(status_code=400, detail="status must be 'matched' or 'mismatched'")
+    matched = None if status is None else status == "matched"
+
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+    if not storage.count():
+        raise HTTPException(
+            status_code=404,
+            detail="No transactions found. Please upload and process files first."
         )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Export error: {str(e)}")
+    # Pin the export to what is stored now, so the ETag/watermark describe the body
+    watermark, token = storage.watermark()
+    etag = f'"{token}"'
+
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
+    extension, media_type = EXPORT_FORMATS[export_format]
+    filename = f"futurix_transactions_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    headers = _validator_headers(etag)
+    headers["X-Export-Watermark"] = str(watermark)
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    full_export = not any((start, end, matched is not None, since_id))
+    if full_export:
+        cached_path = export_cache.get(extension, token)
+        if cached_path:
+            return FileResponse(cached_path, media_type=media_type, headers=headers)
+
+    transactions = storage.iter_filtered(start, end, matched, since_id=since_id, until_id=watermark)
+
+    if export_format == "csv":
+        body = iter_csv(transactions)
+    else:
+        try:
+            render = iter_parquet if export_format == "parquet" else iter_arrow
+            body = render(transactions)
+            export_schema()  # fail fast (501) if pyarrow is not installed
+        except RuntimeError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+
+    if full_export:
+        body = export_cache.tee(extension, token, body)
+
+    return StreamingResponse(body, media_type=media_type, headers=headers)
 
 
 @app.get("/history")
-async def get_history(limit: Optional[int] = 10):
+async def get_history(request: Request, limit: Optional[int] = 10):
     """
     Get last N processed transactions
 
@@ -182,22 +645,100 @@ async def get_history(limit: Optional[int] = 10):
         limit: Number of transactions to return (default: 10)
 
     Returns:
-        List of recent transactions
+        List of recent transactions (304 if unchanged since the client's ETag)
     """
     try:
-        transactions = storage.transactions[-limit:] if limit > 0 else storage.transactions
-        transactions.reverse()  # Show most recent first
-
-        return {
-            "total_transactions": len(storage.transactions),
-            "showing": len(transactions),
-            "transactions": transactions
-        }
+        etag = _etag()
+        not_modified = _not_modified(request, etag)
+        if not_modified:
+            return not_modified
+
+        transactions = storage.get_recent_transactions(limit)
+        transactions = transactions[::-1]  # Show most recent first
+
+        return JSONResponse(
+            content={
+                "total_transactions": storage.count(),
+                "showing": len(transactions),
+                "transactions": transactions
+            },
+            headers=_validator_headers(etag)
+        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"History error: {str(e)}")
 
 
+@app.get("/transactions")
+async def query_transactions(
+    vendor: Optional[str] = None,
+    fuzzy: bool = False,
+    status: Optional[str] = None,
+    invoice_number: Optional[str] = None,
+    po_number: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None
+):
+    """
+    Find transactions by vendor, status, document number, amount and date
+
+    Filters are combined with AND and served from secondary indexes, so
+    selective queries do not scan the whole history. Results are oldest
+    first; pass `next_after_id` back as `after_id` for the next page.
+
+    Args:
+        vendor: Invoice or PO vendor name (normalized exact match)
+        fuzzy: Match vendor by similarity (VENDOR_FUZZY_THRESHOLD) instead
+        status: "matched" or "mismatched"
+        invoice_number: Exact invoice number (case-insensitive)
+        po_number: Exact PO number (case-insensitive)
+        min_amount: Minimum invoice total
+        max_amount: Maximum invoice total
+        start_date: Processed on/after this date (YYYY-MM-DD or YYYY-MM-DD HH:MM:SS)
+        end_date: Processed on/before this date
+        after_id: Pagination cursor
+        limit: Page size (default QUERY_DEFAULT_LIMIT, max QUERY_MAX_LIMIT)
+
+    Returns:
+        Matching transactions and the cursor for the next page
+    """
+    try:
+        start = parse_time_bound(start_date)
+        end = parse_time_bound(end_date, end=True)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD or YYYY-MM-DD HH:MM:SS")
+
+    if status not in (None, "matched", "mismatched"):
+        raise HTTPException(status_code=400, detail="status must be 'matched' or 'mismatched'")
+
+    query = TransactionQuery(
+        vendor=vendor,
+        fuzzy=fuzzy,
+        matched=None if status is None else status == "matched",
+        invoice_number=invoice_number,
+        po_number=po_number,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        start=start,
+        end=end,
+        after_id=after_id,
+        limit=query_limit(limit),
+    )
+
+    with track_stage("query"):
+        transactions = await run_in_threadpool(storage.query, query)
+
+    return {
+        "count": len(transactions),
+        "transactions": transactions,
+        "next_after_id": transactions[-1]["id"] if len(transactions) == query.limit else None
+    }
+
+
 @app.delete("/reset")
 async def reset_storage():
     """
@@ -207,6 +748,9 @@ async def reset_storage():
         Confirmation message
     """
     storage.clear()
+    duplicate_detector.clear()
+    text_store.clear()
+    text_index.clear()
     return {
         "message": "All transactions cleared",
         "total_transactions": 0
@@ -214,25 +758,236 @@ async def reset_storage():
 
 
 @app.get("/stats")
-async def get_statistics():
+async def get_statistics(request: Request):
     """
     Get processing statistics
 
     Returns:
-        Statistics about processed transactions
+        Statistics about processed transactions (304 if unchanged since the client's ETag)
+    """
+    etag = _etag()
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
+    return JSONResponse(content=storage.get_statistics(), headers=_validator_headers(etag))
+
+
+@app.get("/stats/vendors")
+async def get_vendor_statistics(request: Request, top: Optional[int] = None):
+    """
+    Per-vendor and per-mismatch-field statistics across all history
+
+    Computed with NumPy over columnar arrays kept by storage and cached
+    until the next insert or reset.
+
+    Args:
+        top: Only return the N vendors with the most transactions
+
+    Returns:
+        Match rate, total amount, average amount deviation and date drift
+        per vendor, plus mismatch counts per field (304 if unchanged)
+    """
+    etag = _etag()
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
+    with track_stage("aggregation"):
+        result = await run_in_threadpool(storage.aggregate, top)
+
+    return JSONResponse(content=result, headers=_validator_headers(etag))
+
+
+@app.get("/stats/simulate")
+async def simulate_tolerances(vendor_threshold: Optional[float] = None, amount_tolerance: Optional[float] = None,
+                              date_tolerance_days: Optional[int] = None, top: int = 10):
+    """
+    What-if: how stored transactions would be decided under other tolerances
+
+    Args:
+        vendor_threshold: Proposed minimum vendor similarity (0-100)
+        amount_tolerance: Proposed amount tolerance in percent
+        date_tolerance_days: Proposed date tolerance in days
+        top: Number of vendors with the most flips to list (0-100)
+
+    Returns:
+        Flip matrix (stored status -> simulated status), per-field failure
+        counts now and under the proposal, and the vendors most affected
+    """
+    for name, value in (("vendor_threshold", vendor_threshold), ("amount_tolerance", amount_tolerance),
+                        ("date_tolerance_days", date_tolerance_days)):
+        if value is not None and value < 0:
+            raise HTTPException(status_code=400, detail=f"{name} must not be negative")
+    top = max(0, min(top, 100))
+    with track_stage("aggregation"):
+        return await run_in_threadpool(storage.simulate, vendor_threshold, amount_tolerance, date_tolerance_days, top,
+                                       comparison_rules.policy_for)
+
+
+def _search_documents(query: str, limit: int, prefix: bool) -> Dict[str, Any]:
+    """Run a text search and attach each hit's transaction and a snippet of the matching text"""
+    # Hits whose transaction is no longer stored are dropped; fetch more until the page is full
+    wanted = limit
+    while True:
+        result = text_index.search(query, wanted, prefix)
+        transactions = storage.get_transactions(hit["transaction_id"] for hit in result["results"])
+        hits = [hit for hit in result["results"] if hit["transaction_id"] in transactions]
+        if len(hits) >= limit or len(result["results"]) < wanted or wanted >= 10 * limit:
+            break
+        wanted *= 2
+    result["total"] -= len(result["results"]) - len(hits)
+    result["results"] = hits[:limit]
+
+    # Query words as typed first: index terms such as "inv2024001" need not appear verbatim
+    terms = [word.rstrip("*").lower() for word in query.split()] + [term.rstrip("*") for term in result["terms"]]
+    for hit in result["results"]:
+        invoice_text, po_text = text_store.texts(hit["transaction_id"]) or (None, None)
+        invoice_snippet = snippet(invoice_text, terms)
+        po_snippet = None if invoice_snippet else snippet(po_text, terms)
+        hit["document"] = "invoice" if invoice_snippet else "po" if po_snippet else None
+        hit["snippet"] = invoice_snippet or po_snippet
+        hit["transaction"] = transactions[hit["transaction_id"]]
+    return result
+
+
+@app.get("/search")
+async def search_documents(q: str, limit: int = 10, prefix: bool = False):
+    """
+    Find transactions whose invoice or PO text contains every query term
+
+    Args:
+        q: Words, part numbers, ids or amounts; end a word with "*" to match
+            it as a prefix
+        limit: Maximum number of results (1-100)
+        prefix: Match the last word as a prefix (search-as-you-type)
+
+    Returns:
+        Parsed terms, the number of matching transactions and the best
+        matches (BM25 score, matching document, snippet and transaction)
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="q must not be empty")
+    limit = max(1, min(limit, 100))
+    with track_stage("search"):
+        return await run_in_threadpool(_search_documents, q, limit, prefix)
+
+
+@app.post("/reprocess")
+async def reprocess_transactions(after_id: int = 0, until_id: Optional[int] = None,
+                                 workers: Optional[int] = None, sample: Optional[int] = None):
+    """
+    Re-run field extraction and comparison over the stored OCR text
+
+    No OCR calls are made and stored transactions are not changed; use it
+    to see what improved extractors or new rules would change.
+
+    Args:
+        after_id: Only transactions with a larger id
+        until_id: Only transactions up to this id
+        workers: Worker processes (default REPROCESS_WORKERS)
+        sample: Changed transactions to list (default REPROCESS_SAMPLE, max 1000)
+
+    Returns:
+        Counts, status matrix (stored -> reprocessed), changes per field and
+        a sample of changed transactions
+    """
+    if workers is not None and workers < 1:
+        raise HTTPException(status_code=400, detail="workers must be at least 1")
+    if sample is not None:
+        sample = max(0, min(sample, 1000))
+    with track_stage("reprocess"):
+        return await run_in_threadpool(reprocess, storage, text_store, comparison_rules.policy_for,
+                                       workers, after_id, until_id, sample)
+
+
+@app.get("/stats/throughput")
+async def get_throughput(resolution: str = "minute", buckets: Optional[int] = None):
+    """
+    Processed count, match rate and processing latency per minute or hour
+
+    Served from fixed-size ring buffers that storage updates on every insert,
+    so no stored transactions are read. Covers uploads processed by this
+    server process since it started (or since the last reset).
+
+    Args:
+        resolution: "minute" (default) or "hour"
+        buckets: Number of most recent buckets (default 60 minutes / 24 hours,
+            capped at the retained count)
+
+    Returns:
+        Evenly spaced buckets, oldest first, ending at the current time
     """
-    total = len(storage.transactions)
-    matched = sum(1 for t in storage.transactions if "MATCHED" in t["status"])
-    mismatched = total - matched
+    if buckets is None or buckets <= 0:
+        buckets = 24 if resolution == "hour" else 60
+    try:
+        return storage.throughput(resolution, buckets)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
+@app.get("/vendors/match")
+async def match_vendor(name: str, top: int = 5):
+    """
+    Look up the canonical vendors closest to a vendor name
+
+    Args:
+        name: Vendor name, e.g. as extracted by OCR
+        top: Maximum number of candidates (1-50)
+
+    Returns:
+        Normalized name and candidates (vendor_id, name, score), best first
+    """
+    top = max(1, min(top, 50))
+    with track_stage("vendor_lookup"):
+        matches = await run_in_threadpool(vendor_registry.lookup, name, top)
     return {
-        "total_processed": total,
-        "matched": matched,
-        "mismatched": mismatched,
-        "match_rate": f"{(matched/total*100):.2f}%" if total > 0 else "0%"
+        "query": name,
+        "normalized": canonical_vendor_key(name),
+        "matches": [match._asdict() for match in matches],
     }
 
 
+@app.get("/rules")
+async def get_rules(vendor: Optional[str] = None, vendor_id: Optional[str] = None):
+    """
+    Show the comparison rules in force
+
+    Args:
+        vendor: Optional vendor name to resolve a policy for
+        vendor_id: Optional canonical vendor id to resolve a policy for
+
+    Returns:
+        Rules file status, the default policy and, when a vendor is given,
+        the policy that vendor's comparisons use
+    """
+    compiled = comparison_rules.compiled()
+    response = {
+        "path": comparison_rules.path,
+        "loaded_at": datetime.fromtimestamp(compiled.loaded_at).isoformat() if compiled.loaded_at else None,
+        "rules": compiled.rules,
+        "groups": compiled.groups,
+        "vendors": len(compiled.table),
+        "last_error": comparison_rules.last_error,
+        "default": compiled.default._asdict(),
+    }
+    if vendor or vendor_id:
+        response["policy"] = comparison_rules.policy_for(vendor_id, vendor)._asdict()
+    return response
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Expose application metrics in Prometheus text format
+
+    Returns:
+        Per-stage latency histograms, request/error counters, in-flight
+        gauges, OCR payload sizes and cache hit ratios
+    """
+    return Response(content=render_metrics(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
 if __name__ == "__main__":
     import uvicorn
     print("🚀 Starting Futurix AI Backend...")
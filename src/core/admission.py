@@ -0,0 +1,191 @@
+"""
+Admission Control
+Bounds concurrency and queue depth on the upload path and sheds load early
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from src.core.config import settings
+from src.utils.metrics import registry
+
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+ADMISSION_ACTIVE = registry.gauge(
+    "futurix_admission_active",
+    "Uploads currently holding a processing slot",
+)
+ADMISSION_QUEUED = registry.gauge(
+    "futurix_admission_queued",
+    "Uploads waiting for a processing slot",
+    ("priority",),
+)
+ADMISSION_REJECTED = registry.counter(
+    "futurix_admission_rejected_total",
+    "Uploads shed with 429 by reason (queue_full, queue_timeout, no_batch_slots)",
+    ("priority", "reason"),
+)
+ADMISSION_WAIT = registry.histogram(
+    "futurix_admission_wait_seconds",
+    "Time admitted uploads spent waiting for a slot",
+    ("priority",),
+)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of being queued"""
+
+    def __init__(self, reason: str, retry_after: int, message: Optional[str] = None):
+        super().__init__(message or f"Server busy ({reason}), retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded FIFO queue per priority class
+
+    Batch requests may only use the slots and queue positions that are not
+    reserved for interactive requests, so a burst of batch work can never
+    starve interactive uploads. Anything beyond the queue limit, or waiting
+    longer than the queue timeout, is rejected with a Retry-After estimate.
+    The reserve always leaves batch work one slot when there are several; with
+    a single slot reserved for interactive use, batch requests are rejected
+    at once rather than queued until they time out.
+    """
+
+    def __init__(self, max_concurrent: int = None, max_queue: int = None,
+                 queue_timeout: float = None, reserved_share: float = None):
+        self.max_concurrent = max(1, max_concurrent if max_concurrent is not None else settings.MAX_CONCURRENT_UPLOADS)
+        self.max_queue = max(0, max_queue if max_queue is not None else settings.MAX_UPLOAD_QUEUE_DEPTH)
+        self.queue_timeout = queue_timeout if queue_timeout is not None else settings.UPLOAD_QUEUE_TIMEOUT
+        share = reserved_share if reserved_share is not None else settings.INTERACTIVE_RESERVED_SHARE
+
+        # Reserved capacity never exceeds the total; batch keeps a slot unless there is only one
+        self.reserved_slots = min(self.max_concurrent - 1 if self.max_concurrent > 1 else self.max_concurrent,
+                                  math.ceil(self.max_concurrent * share))
+        self.reserved_queue = min(self.max_queue, math.ceil(self.max_queue * share))
+
+        self.active = 0
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {p: deque() for p in PRIORITIES}
+
+        # Exponentially weighted average processing time, used for Retry-After
+        self._service_time = 5.0
+
+    def _slot_limit(self, priority: str) -> int:
+        if priority == INTERACTIVE:
+            return self.max_concurrent
+        return self.max_concurrent - self.reserved_slots
+
+    def _queue_limit(self, priority: str) -> int:
+        if priority == INTERACTIVE:
+            return self.max_queue
+        return self.max_queue - self.reserved_queue
+
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    def retry_after(self) -> int:
+        """Estimate seconds until a slot frees up for a new request"""
+        backlog = self.queued() + 1
+        return max(1, math.ceil(backlog * self._service_time / self.max_concurrent))
+
+    async def acquire(self, priority: str = INTERACTIVE) -> None:
+        """
+        Take a processing slot, waiting in the queue if necessary
+
+        Args:
+            priority: INTERACTIVE or BATCH
+
+        Raises:
+            AdmissionRejected: If the queue is full, the wait times out, or
+                the priority has no slots at all
+        """
+        if priority not in PRIORITIES:
+            priority = INTERACTIVE
+
+        if not self._slot_limit(priority):
+            ADMISSION_REJECTED.inc(priority=priority, reason="no_batch_slots")
+            raise AdmissionRejected(
+                "no_batch_slots", self.retry_after(),
+                "No processing slots are available to batch requests; send them as interactive",
+            )
+
+        # Fast path: free slot and nobody of equal or higher priority waiting
+        ahead = len(self._waiters[INTERACTIVE]) + (len(self._waiters[BATCH]) if priority == BATCH else 0)
+        if not ahead and self.active < self._slot_limit(priority):
+            self._take_slot()
+            ADMISSION_WAIT.observe(0.0, priority=priority)
+            return
+
+        if self.queued() >= self._queue_limit(priority):
+            ADMISSION_REJECTED.inc(priority=priority, reason="queue_full")
+            raise AdmissionRejected("queue_full", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        ADMISSION_QUEUED.inc(priority=priority)
+        start = time.perf_counter()
+
+        try:
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            ADMISSION_REJECTED.inc(priority=priority, reason="queue_timeout")
+            raise AdmissionRejected("queue_timeout", self.retry_after())
+        except asyncio.CancelledError:
+            # Client went away; give back a slot that was handed to us meanwhile
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters[priority]:
+                self._waiters[priority].remove(waiter)
+                ADMISSION_QUEUED.dec(priority=priority)
+
+        ADMISSION_WAIT.observe(time.perf_counter() - start, priority=priority)
+
+    def release(self, service_time: Optional[float] = None) -> None:
+        """
+        Return a processing slot and hand it to the next eligible waiter
+
+        Args:
+            service_time: How long the slot was held (feeds the Retry-After estimate)
+        """
+        if service_time is not None:
+            self._service_time = 0.8 * self._service_time + 0.2 * service_time
+
+        self.active -= 1
+        ADMISSION_ACTIVE.dec()
+        self._wake_waiters()
+
+    def _take_slot(self) -> None:
+        self.active += 1
+        ADMISSION_ACTIVE.inc()
+
+    def _wake_waiters(self) -> None:
+        for priority in PRIORITIES:
+            waiters = self._waiters[priority]
+            while waiters and self.active < self._slot_limit(priority):
+                waiter = waiters.popleft()
+                ADMISSION_QUEUED.dec(priority=priority)
+                if waiter.done():
+                    continue
+                self._take_slot()
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def admit(self, priority: str = INTERACTIVE) -> AsyncIterator[None]:
+        """Hold a processing slot for the duration of the block"""
+        await self.acquire(priority)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
@@ -0,0 +1,362 @@
+"""
+Aggregation Module
+Columnar transaction arrays and vectorized per-vendor / per-field statistics
+"""
+
+import math
+import threading
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.core.config import settings
+from src.core.query import normalize_vendor
+from src.core.records import TransactionRecord, date_value
+from src.core.similarity import get_scorer
+
+# Comparison fields that can fail, with their bit in the mismatch flags column
+MISMATCH_FIELDS = {"vendor": 1, "total": 2, "date": 4}
+
+_NAN = float("nan")
+
+
+class TransactionColumns:
+    """
+    Append-only columnar copy of the fields aggregations need
+
+    One typed array per column (about 35 bytes per transaction), appended
+    on insert. Vendors are dictionary-encoded by normalized name, registry
+    vendor ids (which select comparison policies) by value. NumPy reads
+    the arrays zero-copy via the buffer protocol, under the same lock that
+    guards appends (an exported buffer cannot be resized).
+
+    The comparison deltas (vendor score, amount difference %, date drift)
+    are computed once here, so simulate() can re-decide every transaction
+    under other tolerances with threshold tests alone.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        self.watermark = 0  # highest id included by the initial build
+        self.vendor_names: List[str] = []  # display name per vendor code
+        self._vendor_codes: Dict[str, int] = {}
+        self.vendor = array("i")
+        self.vendor_ids: List[Optional[str]] = [None]  # registry vendor id per code (0: none)
+        self._vendor_id_codes: Dict[Optional[str], int] = {None: 0}
+        self.vendor_id = array("i")
+        self.invoice_total = array("d")
+        self.po_total = array("d")
+        self.date_drift = array("f")  # invoice date - PO date, in days
+        self.amount_diff_percent = array("f")  # as compare_amounts computes it; NaN if a total is missing
+        self.vendor_score = array("b")  # invoice vs PO vendor similarity (0-100), -1 if a name is missing
+        self.matched = array("b")
+        self.mismatches = array("b")  # MISMATCH_FIELDS bit flags
+        # Vendor pairs recur across transactions: score each distinct pair once
+        self._vendor_scores: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.matched)
+
+    def _vendor_code(self, name: Any) -> int:
+        key = normalize_vendor(name)
+        code = self._vendor_codes.get(key)
+        if code is None:
+            code = self._vendor_codes[key] = len(self.vendor_names)
+            self.vendor_names.append(name if key else "Unknown")
+        return code
+
+    def _vendor_id_code(self, vendor_id: Optional[str]) -> int:
+        code = self._vendor_id_codes.get(vendor_id)
+        if code is None:
+            code = self._vendor_id_codes[vendor_id] = len(self.vendor_ids)
+            self.vendor_ids.append(vendor_id)
+        return code
+
+    def _vendor_score(self, invoice_vendor: Optional[str], po_vendor: Optional[str]) -> int:
+        if not invoice_vendor or not po_vendor:
+            return -1
+        pair = (invoice_vendor, po_vendor)
+        score = self._vendor_scores.get(pair)
+        if score is None:
+            score = self._vendor_scores[pair] = get_scorer()(invoice_vendor, po_vendor)
+        return score
+
+    def append(self, transaction: Any) -> None:
+        """
+        Add one stored transaction (record or dict)
+
+        Args:
+            transaction: Transaction to append
+        """
+        record = TransactionRecord.from_dict(transaction)
+
+        flags = 0
+        if isinstance(record.details, dict):
+            for field, info in record.details.items():
+                if isinstance(info, dict) and "reason" in info:
+                    flags |= MISMATCH_FIELDS.get(field, 0)
+
+        drift = _NAN
+        invoice_date, po_date = date_value(record.invoice_date), date_value(record.po_date)
+        if invoice_date and po_date:
+            drift = (invoice_date - po_date).days
+
+        difference_percent = _NAN
+        if record.invoice_total is not None and record.po_total is not None:
+            average = (record.invoice_total + record.po_total) / 2
+            difference = abs(record.invoice_total - record.po_total)
+            difference_percent = difference / average * 100 if average > 0 else 0.0
+
+        with self.lock:
+            self.vendor.append(self._vendor_code(record.invoice_vendor))
+            self.vendor_id.append(self._vendor_id_code(record.vendor_id or None))
+            self.invoice_total.append(_NAN if record.invoice_total is None else record.invoice_total)
+            self.po_total.append(_NAN if record.po_total is None else record.po_total)
+            self.date_drift.append(drift)
+            self.amount_diff_percent.append(difference_percent)
+            self.vendor_score.append(self._vendor_score(record.invoice_vendor, record.po_vendor))
+            self.mismatches.append(flags)
+            self.matched.append(record.matched)
+
+
+def _rate(part: float, whole: float) -> str:
+    return f"{(part / whole * 100):.2f}%" if whole > 0 else "0%"
+
+
+def _mean(values) -> float:
+    """Mean of the non-NaN entries of an ndarray (NaN if there are none)"""
+    values = values[values == values]
+    return float(values.mean()) if values.size else _NAN
+
+
+def _number(value: float, digits: int = 2):
+    """Round for JSON; NaN (no data) becomes None"""
+    return None if math.isnan(value) else round(float(value), digits)
+
+
+def aggregate(columns: TransactionColumns, top: int = None) -> Dict[str, Any]:
+    """
+    Compute per-vendor and per-mismatch-field statistics with NumPy
+
+    Every statistic is a weighted bincount over the vendor code column, so
+    cost is a handful of vectorized passes regardless of vendor count.
+
+    Args:
+        columns: Columnar transaction data
+        top: Only return the N vendors with the most transactions
+
+    Returns:
+        Dictionary with "total_transactions", "vendors" and "mismatch_fields"
+    """
+    import numpy as np
+
+    with columns.lock:
+        n = len(columns)
+        k = len(columns.vendor_names)
+        names = list(columns.vendor_names)
+
+        codes = np.frombuffer(columns.vendor, dtype=np.int32, count=n)
+        invoice = np.frombuffer(columns.invoice_total, dtype=np.float64, count=n)
+        po = np.frombuffer(columns.po_total, dtype=np.float64, count=n)
+        drift = np.abs(np.frombuffer(columns.date_drift, dtype=np.float32, count=n).astype(np.float64))
+        matched = np.frombuffer(columns.matched, dtype=np.int8, count=n)
+        flags = np.frombuffer(columns.mismatches, dtype=np.int8, count=n)
+
+        def grouped(values):
+            """Per-vendor (sum, count) of the non-NaN values"""
+            valid = ~np.isnan(values)
+            return (np.bincount(codes, weights=np.where(valid, values, 0.0), minlength=k),
+                    np.bincount(codes, weights=valid, minlength=k))
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            counts = np.bincount(codes, minlength=k)
+            matched_counts = np.bincount(codes, weights=matched, minlength=k)
+            amount_sum, _ = grouped(invoice)
+
+            deviation = np.abs(invoice - po)
+            deviation_percent = deviation / ((invoice + po) / 2) * 100
+            deviation_percent[~np.isfinite(deviation_percent)] = np.nan
+            deviation_sum, deviation_n = grouped(deviation)
+            percent_sum, percent_n = grouped(deviation_percent)
+            drift_sum, drift_n = grouped(drift)
+
+            avg_deviation = deviation_sum / deviation_n
+            avg_percent = percent_sum / percent_n
+            avg_drift = drift_sum / drift_n
+
+            fields = {}
+            for field, bit in MISMATCH_FIELDS.items():
+                hit = (flags & bit) != 0
+                entry = {"count": int(hit.sum()), "rate": _rate(int(hit.sum()), n)}
+                if field == "total":
+                    entry["avg_deviation"] = _number(_mean(deviation[hit]))
+                elif field == "date":
+                    entry["avg_drift_days"] = _number(_mean(drift[hit]))
+                fields[field] = entry
+
+        # Release the buffer views before appends may resume
+        del codes, invoice, po, drift, matched, flags, deviation, deviation_percent, hit
+
+    order = np.argsort(-counts, kind="stable")
+    if top:
+        order = order[:top]
+
+    vendors = [
+        {
+            "vendor": names[code],
+            "transactions": int(counts[code]),
+            "matched": int(matched_counts[code]),
+            "match_rate": _rate(matched_counts[code], counts[code]),
+            "total_amount": _number(amount_sum[code]),
+            "avg_amount_deviation": _number(avg_deviation[code]),
+            "avg_amount_deviation_percent": _number(avg_percent[code]),
+            "avg_date_drift_days": _number(avg_drift[code]),
+        }
+        for code in order if counts[code]
+    ]
+
+    return {
+        "total_transactions": n,
+        "vendors": vendors,
+        "mismatch_fields": fields,
+    }
+
+
+def _decisive(policy: Any) -> Tuple[Any, ...]:
+    """The parts of a ComparisonPolicy that decide a status (not reasons or labels)"""
+    return (policy.vendor_scorer, policy.vendor_threshold, policy.amount_comparator,
+            policy.amount_tolerance, policy.date_tolerance_days)
+
+
+def simulate(columns: TransactionColumns, vendor_threshold: float = None, amount_tolerance: float = None,
+             date_tolerance: float = None, top: int = 10,
+             policy_for: Optional[Callable[..., Any]] = None) -> Dict[str, Any]:
+    """
+    Re-decide every stored transaction under proposed tolerances
+
+    Each check is one vectorized comparison of a precomputed delta column
+    with its threshold (vendor score >= threshold, amount difference % <=
+    tolerance, |date drift| <= days), so a simulation over millions of
+    transactions takes milliseconds and never re-runs the comparison.
+
+    The proposal replaces the global settings. Transactions whose vendor is
+    compared under a different policy (per-vendor Comparison Rules) are not
+    re-decided; they are counted under "custom_policy" instead.
+
+    Args:
+        columns: Columnar transaction data
+        vendor_threshold: Proposed minimum vendor score (default: current setting)
+        amount_tolerance: Proposed amount tolerance in percent (default: current setting)
+        date_tolerance: Proposed date tolerance in days (default: current setting)
+        top: Number of vendors with the most flips to list
+        policy_for: policy_for(vendor_id, vendor) -> ComparisonPolicy (every
+            vendor is taken to use the global settings if None)
+
+    Returns:
+        Dictionary with the flip matrix (stored status -> simulated status),
+        per-field failure counts under the current and proposed tolerances,
+        the vendors with the most flips and the transactions left out
+    """
+    import numpy as np
+
+    from src.core.rules import default_policy
+
+    current = {
+        "vendor_threshold": settings.VENDOR_FUZZY_THRESHOLD,
+        "amount_tolerance_percent": settings.AMOUNT_TOLERANCE_PERCENT,
+        "date_tolerance_days": settings.DATE_TOLERANCE_DAYS,
+    }
+    proposed = {
+        "vendor_threshold": current["vendor_threshold"] if vendor_threshold is None else vendor_threshold,
+        "amount_tolerance_percent": current["amount_tolerance_percent"] if amount_tolerance is None else amount_tolerance,
+        "date_tolerance_days": current["date_tolerance_days"] if date_tolerance is None else date_tolerance,
+    }
+    settings_policy = _decisive(default_policy())
+
+    with columns.lock:
+        n = len(columns)
+        names = list(columns.vendor_names)
+        k = max(1, len(names))
+        unknown = columns._vendor_codes.get("")
+        codes = np.frombuffer(columns.vendor, dtype=np.int32, count=n)
+
+        # One policy lookup per distinct (vendor id, vendor) pair
+        custom = np.zeros(n, dtype=bool)
+        policy_sources: Dict[int, str] = {}
+        if policy_for is not None and n:
+            vendor_ids = np.frombuffer(columns.vendor_id, dtype=np.int32, count=n)
+            pairs, inverse = np.unique(vendor_ids.astype(np.int64) * k + codes, return_inverse=True)
+            differs = np.zeros(len(pairs), dtype=bool)
+            for position, pair in enumerate(pairs.tolist()):
+                id_code, code = divmod(pair, k)
+                policy = policy_for(columns.vendor_ids[id_code], None if code == unknown else names[code])
+                if _decisive(policy) != settings_policy:
+                    differs[position] = True
+                    policy_sources.setdefault(code, policy.source)
+            custom = differs[inverse]
+            del vendor_ids
+        included = ~custom
+        m = int(np.count_nonzero(included))
+
+        # NaN deltas (missing data) compare False, so they fail as in compare_invoice_po
+        scores = np.frombuffer(columns.vendor_score, dtype=np.int8, count=n)[included]
+        percents = np.frombuffer(columns.amount_diff_percent, dtype=np.float32, count=n)[included]
+        drift = np.abs(np.frombuffer(columns.date_drift, dtype=np.float32, count=n)[included])
+        stored = np.frombuffer(columns.matched, dtype=np.int8, count=n)[included].astype(bool)
+
+        def passes(tolerances):
+            # float32 deltas against float64 thresholds: the boundary value itself passes
+            return (scores >= tolerances["vendor_threshold"],
+                    percents <= np.float32(tolerances["amount_tolerance_percent"]),
+                    drift <= np.float32(tolerances["date_tolerance_days"]))
+
+        with np.errstate(invalid="ignore"):
+            now = passes(current)
+            then = passes(proposed)
+        simulated = then[0] & then[1] & then[2]
+        inconsistent = int(np.count_nonzero(stored != (now[0] & now[1] & now[2])))
+
+        # stored * 2 + simulated: 0 mismatch->mismatch, 1 mismatch->matched, 2 matched->mismatch, 3 matched->matched
+        cells = np.bincount(stored.astype(np.int8) * 2 + simulated, minlength=4).tolist()
+        flipped = stored != simulated
+        flips_by_vendor = np.bincount(codes[included][flipped], minlength=len(names))
+        custom_by_vendor = np.bincount(codes[custom], minlength=len(names))
+        fields = {
+            field: {"failing_now": int(m - np.count_nonzero(ok_now)), "failing_proposed": int(m - np.count_nonzero(ok))}
+            for field, ok_now, ok in zip(("vendor", "total", "date"), now, then)
+        }
+        del codes, scores, percents, drift, stored, now, then, simulated, flipped
+
+    order = np.argsort(-flips_by_vendor, kind="stable")[:max(0, top)]
+    custom_order = np.argsort(-custom_by_vendor, kind="stable")[:max(0, top)]
+    stored_matched = cells[2] + cells[3]
+    simulated_matched = cells[1] + cells[3]
+
+    return {
+        "total_transactions": n,
+        "simulated_transactions": m,
+        "current": current,
+        "proposed": proposed,
+        "flip_matrix": {
+            "matched": {"matched": cells[3], "mismatch": cells[2]},
+            "mismatch": {"matched": cells[1], "mismatch": cells[0]},
+        },
+        "flipped": cells[1] + cells[2],
+        "flip_rate": _rate(cells[1] + cells[2], m),
+        "match_rate": {"stored": _rate(stored_matched, m), "proposed": _rate(simulated_matched, m)},
+        "fields": fields,
+        "inconsistent_with_current": inconsistent,
+        "vendors": [
+            {"vendor": names[code], "flipped": int(flips_by_vendor[code])}
+            for code in order.tolist() if flips_by_vendor[code]
+        ],
+        "custom_policy": {
+            "transactions": n - m,
+            "vendors": [
+                {"vendor": names[code], "transactions": int(custom_by_vendor[code]), "policy": policy_sources[code]}
+                for code in custom_order.tolist() if custom_by_vendor[code]
+            ],
+        },
+    }
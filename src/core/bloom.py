@@ -0,0 +1,67 @@
+"""
+Bloom Filters
+Compact set-membership filters over 64-bit key hashes
+"""
+
+import math
+
+_MASK64 = (1 << 64) - 1
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over 64-bit key hashes
+
+    Sized for `capacity` keys at `error_rate` false positives; bit positions
+    come from double hashing of the one hash (h1 + i * h2).
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.bit_count = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.bit_count / self.capacity * math.log(2))))
+        self.bits = bytearray((self.bit_count + 7) // 8)
+        self.count = 0
+
+    def add(self, key_hash: int) -> None:
+        key_hash &= _MASK64
+        h1, h2 = key_hash & 0xFFFFFFFF, (key_hash >> 32) | 1
+        bits, bit_count = self.bits, self.bit_count
+        for i in range(self.hash_count):
+            position = (h1 + i * h2) % bit_count
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key_hash: int) -> bool:
+        key_hash &= _MASK64
+        h1, h2 = key_hash & 0xFFFFFFFF, (key_hash >> 32) | 1
+        bits, bit_count = self.bits, self.bit_count
+        for i in range(self.hash_count):
+            position = (h1 + i * h2) % bit_count
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class ScalableBloomFilter:
+    """Bloom filters chained as they fill; each new one holds twice as many keys"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.error_rate = error_rate
+        self.filters = [BloomFilter(capacity, error_rate)]
+
+    def add(self, key_hash: int) -> None:
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            current = BloomFilter(current.capacity * 2, self.error_rate)
+            self.filters.append(current)
+        current.add(key_hash)
+
+    def __contains__(self, key_hash: int) -> bool:
+        return any(key_hash in bloom for bloom in self.filters)
+
+    def memory_bytes(self) -> int:
+        return sum(len(bloom.bits) for bloom in self.filters)
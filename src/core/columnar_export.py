@@ -0,0 +1,204 @@
+"""
+Columnar Export Module
+Typed Parquet and Arrow IPC exports written in bounded batches
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List
+
+from src.core.config import settings
+from src.core.records import to_amount, to_date
+from src.core.storage import EXPORT_COLUMNS, is_matched_status, mismatch_summary
+
+logger = logging.getLogger(__name__)
+
+
+# Categories of the "Status" dictionary column
+STATUS_CATEGORIES = ["MATCHED", "MISMATCH"]
+
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _require_pyarrow():
+    """Import pyarrow, raising a clear error when the optional dependency is missing"""
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401  (registers pyarrow.parquet)
+    except ImportError as e:
+        raise RuntimeError("pyarrow is required for Parquet/Arrow exports (pip install pyarrow)") from e
+    return pyarrow
+
+
+def export_schema():
+    """Arrow schema for the EXPORT_COLUMNS column set"""
+    pa = _require_pyarrow()
+    string_dict = pa.dictionary(pa.int32(), pa.string())
+    types = [
+        string_dict,                             # Invoice Vendor
+        string_dict,                             # PO Vendor
+        pa.float64(),                            # Invoice Total
+        pa.float64(),                            # PO Total
+        pa.date32(),                             # Invoice Date
+        pa.date32(),                             # PO Date
+        pa.string(),                             # Invoice Number
+        pa.string(),                             # PO Number
+        pa.dictionary(pa.int8(), pa.string()),   # Status
+        string_dict,                             # Mismatched Fields
+        pa.timestamp("s"),                       # Timestamp
+    ]
+    return pa.schema([pa.field(name, type_) for name, type_ in zip(EXPORT_COLUMNS, types)])
+
+
+def _to_timestamp(value: Any):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return None
+
+
+def _build_batch(rows: List[Dict[str, Any]], schema):
+    """Convert a list of transactions into one typed RecordBatch"""
+    pa = _require_pyarrow()
+
+    columns = [
+        [t.get("invoice_vendor") for t in rows],
+        [t.get("po_vendor") for t in rows],
+        [to_amount(t.get("invoice_total")) for t in rows],
+        [to_amount(t.get("po_total")) for t in rows],
+        [to_date(t.get("invoice_date")) for t in rows],
+        [to_date(t.get("po_date")) for t in rows],
+        [t.get("invoice_number") for t in rows],
+        [t.get("po_number") for t in rows],
+        None,
+        [mismatch_summary(t.get("details", {})) for t in rows],
+        [_to_timestamp(t.get("timestamp")) for t in rows],
+    ]
+
+    # Status as a fixed two-value category, independent of the emoji text
+    status_indices = pa.array([0 if is_matched_status(t.get("status")) else 1 for t in rows], pa.int8())
+    status = pa.DictionaryArray.from_arrays(status_indices, pa.array(STATUS_CATEGORIES))
+
+    arrays = []
+    for field, values in zip(schema, columns):
+        if values is None:
+            arrays.append(status)
+        elif pa.types.is_dictionary(field.type):
+            arrays.append(pa.array(values, pa.string()).dictionary_encode().cast(field.type))
+        else:
+            arrays.append(pa.array(values, field.type))
+
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _iter_batches(transactions: Iterable[Dict[str, Any]], batch_rows: int, schema):
+    rows: List[Dict[str, Any]] = []
+    for transaction in transactions:
+        rows.append(transaction)
+        if len(rows) >= batch_rows:
+            yield _build_batch(rows, schema)
+            rows = []
+    if rows:
+        yield _build_batch(rows, schema)
+
+
+class _ChunkSink:
+    """
+    Write-only file object that hands written bytes to a streaming response
+
+    tell() reports the total bytes written so far, which Parquet needs for
+    its column chunk offsets, even though the buffer is drained in between.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_parquet(transactions: Iterable[Dict[str, Any]], row_group_rows: int = None,
+                 compression: str = None) -> Iterator[bytes]:
+    """
+    Render transactions as a Parquet file, yielding bytes per row group
+
+    At most one row group of transactions is materialized at a time.
+
+    Args:
+        transactions: Iterable of transaction dictionaries
+        row_group_rows: Rows per row group (defaults to settings.PARQUET_ROW_GROUP_ROWS)
+        compression: Parquet codec (defaults to settings.PARQUET_COMPRESSION)
+
+    Yields:
+        Chunks of the Parquet file
+    """
+    pa = _require_pyarrow()
+    row_group_rows = row_group_rows or settings.PARQUET_ROW_GROUP_ROWS
+    compression = compression or settings.PARQUET_COMPRESSION
+
+    schema = export_schema()
+    sink = _ChunkSink()
+    writer = pa.parquet.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression=compression)
+
+    try:
+        for batch in _iter_batches(transactions, row_group_rows, schema):
+            writer.write_batch(batch, row_group_size=row_group_rows)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+
+    yield sink.drain()
+
+
+def iter_arrow(transactions: Iterable[Dict[str, Any]], batch_rows: int = None,
+               compression: str = None) -> Iterator[bytes]:
+    """
+    Render transactions as an Arrow IPC stream, yielding bytes per record batch
+
+    Args:
+        transactions: Iterable of transaction dictionaries
+        batch_rows: Rows per record batch (defaults to settings.PARQUET_ROW_GROUP_ROWS)
+        compression: IPC buffer compression, "zstd" or "lz4" (defaults to settings.ARROW_COMPRESSION)
+
+    Yields:
+        Chunks of the Arrow stream
+    """
+    pa = _require_pyarrow()
+    batch_rows = batch_rows or settings.PARQUET_ROW_GROUP_ROWS
+    compression = compression or settings.ARROW_COMPRESSION
+
+    schema = export_schema()
+    sink = _ChunkSink()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema, options=options)
+
+    try:
+        for batch in _iter_batches(transactions, batch_rows, schema):
+            writer.write_batch(batch)
+            yield sink.drain()
+    finally:
+        writer.close()
+
+    yield sink.drain()
@@ -29,6 +29,22 @@ class Settings:
     EXPORT_DIR = os.path.join(BASE_DIR, "data", "exports")
     SAMPLE_DIR = os.path.join(BASE_DIR, "data", "samples")
 
+    # Transaction Storage
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory")  # memory | sqlite | log
+    MEMORY_RESIDENT_TRANSACTIONS = int(os.getenv("MEMORY_RESIDENT_TRANSACTIONS", "100000"))  # Records kept in RAM (0 = unbounded)
+    MEMORY_SPILL_BATCH = 10000  # Transactions moved to disk per spill
+    MEMORY_SPILL_DIR = os.getenv("MEMORY_SPILL_DIR", os.path.join(BASE_DIR, "data", "spill"))
+    MEMORY_ID_FILE = os.getenv("MEMORY_ID_FILE", os.path.join(BASE_DIR, "data", "memory_ids"))  # Reserved id ceiling
+    SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(BASE_DIR, "data", "futurix.db"))
+    SQLITE_GROUP_COMMIT_MAX = 256  # Max inserts batched into one commit
+    SQLITE_GROUP_COMMIT_WAIT_MS = 2  # How long the writer waits to fill a batch
+    LOG_STORAGE_DIR = os.getenv("LOG_STORAGE_DIR", os.path.join(BASE_DIR, "data", "txlog"))
+    LOG_SEGMENT_BYTES = 64 * 1024 * 1024  # Roll to a new log segment after 64 MB
+    LOG_SNAPSHOT_INTERVAL = 10000  # Records between snapshots (bounds recovery replay)
+    LOG_INDEX_INTERVAL = 1000  # Records between sparse offset index entries
+    LOG_FSYNC_EVERY = int(os.getenv("LOG_FSYNC_EVERY", "100"))  # fsync after N appends (0 = time-based only)
+    LOG_FSYNC_INTERVAL_MS = 50  # Longest an append stays unsynced (a timer covers quiet periods)
+
     # File Settings
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
     ALLOWED_EXTENSIONS = {'.pdf', '.png', '.jpg', '.jpeg'}
@@ -38,15 +54,76 @@ class Settings:
     SHIVAAY_API_KEY = os.getenv("SHIVAAY_API_KEY", "")
     OCR_MODEL = "gpt-4o"  # Shivaay AI vision model
     OCR_DPI = 300  # For PDF to image conversion
+    OCR_MAX_TOKENS = 4000  # Response budget; long line-item tables need more than the header fields
+
+    # Admission Control (upload processing path)
+    MAX_CONCURRENT_UPLOADS = int(os.getenv("MAX_CONCURRENT_UPLOADS", "4"))  # Uploads processed at once
+    MAX_UPLOAD_QUEUE_DEPTH = int(os.getenv("MAX_UPLOAD_QUEUE_DEPTH", "16"))  # Uploads allowed to wait
+    UPLOAD_QUEUE_TIMEOUT = float(os.getenv("UPLOAD_QUEUE_TIMEOUT", "30"))  # Seconds before a queued upload is shed
+    INTERACTIVE_RESERVED_SHARE = 0.25  # Share of slots and queue reserved for interactive uploads
 
     # Comparison Tolerances
     VENDOR_FUZZY_THRESHOLD = 85  # Percentage (0-100)
     AMOUNT_TOLERANCE_PERCENT = 0.5  # Percentage
     DATE_TOLERANCE_DAYS = 3  # Days
+    VENDOR_SCORER = os.getenv("VENDOR_SCORER", "ratio")  # ratio | partial | token_set (see src/core/similarity.py)
+    SIMILARITY_CACHE_SIZE = 10000  # Normalized vendor strings memoized per normalization
+
+    # Comparison Rules Settings (per-vendor tolerances, see src/core/rules.py)
+    COMPARISON_RULES_PATH = os.getenv("COMPARISON_RULES_PATH", os.path.join(BASE_DIR, "data", "comparison_rules.json"))
+    COMPARISON_RULES_CHECK_SECONDS = 2  # How often the rules file is checked for changes
+
+    # Vendor Registry Settings (CSV with vendor_id, name, aliases columns)
+    VENDOR_REGISTRY_PATH = os.getenv("VENDOR_REGISTRY_PATH", os.path.join(BASE_DIR, "data", "vendors.csv"))
+
+    # Line Item Settings (line-level reconciliation)
+    LINE_ITEM_DESCRIPTION_WEIGHT = 0.7  # Share of a pairing's cost from description dissimilarity (rest: amount)
+    LINE_ITEM_MAX_COST = 0.5  # Invoice/PO lines costing more than this (0-1) are left unpaired
+
+    # PO Pool Settings (open POs matched against invoice-only uploads)
+    PO_POOL_PATH = os.getenv("PO_POOL_PATH", os.path.join(BASE_DIR, "data", "po_pool.jsonl"))
+    PO_POOL_AMOUNT_WINDOW_PERCENT = 10  # Invoice total +/- this share is searched when no PO number matches
+    PO_POOL_MAX_CANDIDATES = 50  # POs compared per invoice at most
+
+    # Duplicate Detection Settings (uploads are checked against all stored transactions)
+    DUPLICATE_AMOUNT_TOLERANCE_PERCENT = 0.5  # Same-vendor invoices this close in total...
+    DUPLICATE_DATE_WINDOW_DAYS = 3  # ...and this close in date are flagged even with different numbers
+    DUPLICATE_BLOOM_CAPACITY = 1_000_000  # Keys per Bloom filter before another (twice as large) is added
+    DUPLICATE_BLOOM_ERROR_RATE = 0.001  # Per key; a check probes up to 10 keys and a false hit costs a storage query
+    DUPLICATE_MAX_CANDIDATES = 500  # Stored transactions examined per confirming query
+
+    # Raw Text Settings (full OCR text kept per transaction for offline reprocessing)
+    RAW_TEXT_DIR = os.getenv("RAW_TEXT_DIR", os.path.join(BASE_DIR, "data", "raw_text"))
+    RAW_TEXT_COMPRESSION_LEVEL = 6  # zlib level for stored text
+    REPROCESS_WORKERS = int(os.getenv("REPROCESS_WORKERS", str(os.cpu_count() or 1)))  # Extraction processes
+    REPROCESS_CHUNK = 500  # Transactions handed to a worker at a time
+    REPROCESS_SAMPLE = 50  # Changed transactions listed in a reprocess summary
+
+    # Text Index Settings (full-text search over stored OCR text, see src/core/text_index.py)
+    TEXT_INDEX_DIR = os.getenv("TEXT_INDEX_DIR", os.path.join(BASE_DIR, "data", "text_index"))
+    TEXT_INDEX_FLUSH_DOCS = 5000  # Documents held in memory before being written as a segment
+    TEXT_INDEX_MERGE_FACTOR = 4  # Segments of one size tier merged together
+    TEXT_INDEX_MAX_MERGE_DOCS = 500_000  # Largest segment a merge may produce (bounds merge time)
+    TEXT_INDEX_MAX_EXPANSIONS = 64  # Most frequent terms a prefix expands to
 
     # CSV Export Settings
     CSV_ENCODING = 'utf-8'
     CSV_INDEX = False
+    EXPORT_CHUNK_ROWS = 1000  # Rows per streamed export chunk
+
+    # Query Settings
+    QUERY_DEFAULT_LIMIT = 100  # Results per page when no limit is given
+    QUERY_MAX_LIMIT = 1000  # Largest page a query may request
+    QUERY_SEGMENT_BLOOM_ERROR_RATE = 0.01  # Invoice/PO number filter per spilled segment; a false hit reads the segment
+
+    # Rollup Settings (ring buffer sizes bound memory regardless of uptime)
+    ROLLUP_MINUTE_BUCKETS = 1440  # Per-minute buckets retained (24 hours)
+    ROLLUP_HOUR_BUCKETS = 720  # Per-hour buckets retained (30 days)
+
+    # Columnar Export Settings (Parquet / Arrow, requires pyarrow)
+    PARQUET_ROW_GROUP_ROWS = 65536  # Rows per row group / record batch (bounds export memory)
+    PARQUET_COMPRESSION = "zstd"
+    ARROW_COMPRESSION = "zstd"
 
     # Gmail Settings
     GMAIL_SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
@@ -55,7 +132,8 @@ class Settings:
 
     # Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-    LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+    LOG_JSON = os.getenv("LOG_JSON", "false").lower() in ("1", "true", "yes")  # JSON lines instead of text
 
     # CORS
     CORS_ORIGINS = ["*"]  # For production, restrict this
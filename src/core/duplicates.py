@@ -0,0 +1,245 @@
+"""
+Duplicate Invoice Detection
+Bloom-filtered exact and fuzzy invoice keys over the whole transaction history
+"""
+
+import logging
+import math
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from src.core.bloom import ScalableBloomFilter
+from src.core.config import settings
+from src.core.query import TransactionQuery, normalize_number, normalize_vendor
+from src.core.records import ExtractionResult, TransactionRecord, date_value, format_date, to_amount, to_date
+from src.core.vendor_registry import canonical_vendor_key
+from src.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_CHECKS = registry.counter(
+    "futurix_duplicate_checks_total",
+    "Duplicate-invoice checks by outcome (clear = Bloom filter negative, confirmed, false_positive)",
+    ("outcome",),
+)
+
+def _vendor_keys(vendor_id: Optional[str], vendor: Optional[str]) -> Set[str]:
+    """A transaction is keyed under its registry id and its canonical name, whichever are known"""
+    keys = {f"id:{vendor_id}"} if vendor_id else set()
+    name = canonical_vendor_key(vendor)
+    if name:
+        keys.add(f"name:{name}")
+    return keys
+
+
+def _buckets(position: float) -> tuple:
+    """
+    Bucket of a position measured in bucket widths, plus the adjacent bucket
+    it is nearer to. Buckets are twice the tolerance wide, so anything
+    within tolerance lies in one of the two.
+    """
+    bucket = math.floor(position)
+    return bucket, bucket - 1 if position - bucket < 0.5 else bucket + 1
+
+
+def _amount_position(amount: float) -> float:
+    # Log scale: the tolerance is relative
+    return math.log(amount) / math.log1p(2 * settings.DUPLICATE_AMOUNT_TOLERANCE_PERCENT / 100)
+
+
+def _date_position(day) -> float:
+    return day.toordinal() / (2 * max(1, settings.DUPLICATE_DATE_WINDOW_DAYS))
+
+
+def _amounts_close(amount1: float, amount2: float) -> bool:
+    # Same measure as compare_amounts: difference as a share of the average
+    average = (amount1 + amount2) / 2
+    difference = abs(amount1 - amount2)
+    return difference == 0 or average > 0 and difference / average * 100 <= settings.DUPLICATE_AMOUNT_TOLERANCE_PERCENT
+
+
+class DuplicateDetector:
+    """
+    Flags invoices that were already processed
+
+    Every stored transaction is keyed two ways:
+
+    - exact: (vendor, invoice number)
+    - fuzzy: (vendor, amount bucket, date bucket), which catches the same
+      invoice resubmitted under a different or misread number
+
+    Only the key hashes are kept, in a scalable Bloom filter (about 15 bits
+    per key at a 0.1% error rate), so all history fits in about four bytes
+    per transaction. A check probes the filter for the invoice's exact key and
+    the fuzzy keys of its neighbouring buckets; the common case, no
+    duplicate, ends there at a constant cost (at most ten filter probes). Only a filter hit runs the
+    storage query that confirms it: by invoice number, or by vendor and
+    amount range. For the latter the detector remembers which spellings of
+    each vendor occur in storage (one small set per vendor).
+
+    The filter is built by one scan of storage on first use and then kept
+    current through add().
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._lock = threading.Lock()
+        self._bloom: Optional[ScalableBloomFilter] = None
+        self._spellings: Dict[str, Set[str]] = {}  # vendor key -> normalized invoice vendor names stored under it
+        self._watermark = 0  # highest id included by the initial scan
+
+    def _ready(self) -> ScalableBloomFilter:
+        if self._bloom is None:
+            with self._lock:
+                if self._bloom is None:
+                    bloom = ScalableBloomFilter(settings.DUPLICATE_BLOOM_CAPACITY, settings.DUPLICATE_BLOOM_ERROR_RATE)
+                    watermark = 0
+                    self._spellings = {}
+                    for transaction in self.storage.iter_transactions():
+                        self._add_keys(bloom, transaction)
+                        watermark = max(watermark, transaction.get("id") or 0)
+                    self._watermark = watermark
+                    self._bloom = bloom
+                    logger.info("Duplicate filter built", extra={
+                        "transactions": watermark, "bytes": bloom.memory_bytes(),
+                    })
+        return self._bloom
+
+    @staticmethod
+    def _keys(vendor_keys: Set[str], invoice_number: Any, amount: Optional[float], day: Optional[date],
+              probe: bool = False) -> List[int]:
+        """Key hashes: exact ones first, then fuzzy (also the nearer adjacent buckets when probing)"""
+        hashes = []
+        number = normalize_number(invoice_number)
+        if number:
+            hashes.extend(hash(("exact", vendor, number)) for vendor in vendor_keys)
+        if amount and amount > 0 and day:
+            amount_buckets = _buckets(_amount_position(amount))
+            date_buckets = _buckets(_date_position(day))
+            if not probe:
+                amount_buckets, date_buckets = amount_buckets[:1], date_buckets[:1]
+            hashes.extend(hash(("fuzzy", vendor, amount_bucket, date_bucket))
+                          for vendor in vendor_keys for amount_bucket in amount_buckets for date_bucket in date_buckets)
+        return hashes
+
+    def _add_keys(self, bloom: ScalableBloomFilter, transaction: Any) -> None:
+        if isinstance(transaction, TransactionRecord):
+            # Typed fields directly, not the rendered strings
+            vendor_id, vendor, number = transaction.vendor_id, transaction.invoice_vendor, transaction.invoice_number
+            amount, day = transaction.invoice_total, date_value(transaction.invoice_date)
+        else:
+            vendor_id, vendor, number = (transaction.get("vendor_id"), transaction.get("invoice_vendor"),
+                                         transaction.get("invoice_number"))
+            amount, day = to_amount(transaction.get("invoice_total")), to_date(transaction.get("invoice_date"))
+        vendor_keys = _vendor_keys(vendor_id, vendor)
+        if not vendor_keys:
+            return
+        for key_hash in self._keys(vendor_keys, number, amount, day):
+            bloom.add(key_hash)
+        spelling = normalize_vendor(vendor)
+        for key in vendor_keys:
+            spellings = self._spellings.get(key)
+            if spellings is None:
+                self._spellings[key] = {spelling}
+            elif spelling not in spellings:
+                spellings.add(spelling)
+
+    def add(self, transaction_id: int, transaction: Dict[str, Any]) -> None:
+        """
+        Index a newly stored transaction (no-op until the filter is built,
+        whose initial scan will include it)
+
+        Args:
+            transaction_id: Id assigned by storage
+            transaction: The stored transaction data
+        """
+        with self._lock:
+            if self._bloom is not None and transaction_id > self._watermark:
+                self._add_keys(self._bloom, transaction)
+
+    def clear(self) -> None:
+        """Forget all keys (storage was reset); the filter is rebuilt on next use"""
+        with self._lock:
+            self._bloom = None
+            self._spellings = {}
+            self._watermark = 0
+
+    def check(self, invoice: ExtractionResult, vendor_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Earlier transactions that look like the same invoice
+
+        Args:
+            invoice: OCR extraction of the invoice being processed
+            vendor_id: Canonical vendor id, if resolved
+
+        Returns:
+            Matching transactions, newest first, each with "match" set to
+            "exact" (same vendor and invoice number) or "fuzzy" (same vendor,
+            amount within DUPLICATE_AMOUNT_TOLERANCE_PERCENT and date within
+            DUPLICATE_DATE_WINDOW_DAYS)
+        """
+        vendor_keys = _vendor_keys(vendor_id, invoice.vendor)
+        if not vendor_keys:
+            return []
+        bloom = self._ready()
+        number = normalize_number(invoice.invoice_no)
+        invoice_date = date_value(invoice.date)
+        probes = self._keys(vendor_keys, number, invoice.total, invoice_date, probe=True)
+        exact_count = len(vendor_keys) if number else 0
+        exact_hit = any(key_hash in bloom for key_hash in probes[:exact_count])
+        fuzzy_hit = any(key_hash in bloom for key_hash in probes[exact_count:])
+        if not exact_hit and not fuzzy_hit:
+            DUPLICATE_CHECKS.inc(outcome="clear")
+            return []
+
+        limit = settings.DUPLICATE_MAX_CANDIDATES
+        found: Dict[int, Dict[str, Any]] = {}
+        if exact_hit:
+            for transaction in self.storage.query(TransactionQuery(invoice_number=number, limit=limit)):
+                if vendor_keys & _vendor_keys(transaction.get("vendor_id"), transaction.get("invoice_vendor")):
+                    found[transaction["id"]] = self._render(transaction, "exact")
+        if fuzzy_hit:
+            tolerance = settings.DUPLICATE_AMOUNT_TOLERANCE_PERCENT / 100
+            window = timedelta(days=settings.DUPLICATE_DATE_WINDOW_DAYS)
+            with self._lock:
+                spellings = set().union(*(self._spellings.get(key, ()) for key in vendor_keys))
+            candidates = []
+            for spelling in sorted(spellings):
+                candidates.extend(self.storage.query(TransactionQuery(
+                    vendor=spelling, min_amount=invoice.total * (1 - tolerance),
+                    max_amount=invoice.total * (1 + tolerance),
+                    # The date window goes into the query: applied after the limit, older
+                    # invoices of the same amount would crowd out the recent duplicate
+                    min_invoice_date=invoice_date - window, max_invoice_date=invoice_date + window, limit=limit,
+                )))
+            for transaction in candidates:
+                day = to_date(transaction.get("invoice_date"))
+                total = to_amount(transaction.get("invoice_total"))
+                if (transaction["id"] not in found and day and total is not None
+                        and abs((day - invoice_date).days) <= settings.DUPLICATE_DATE_WINDOW_DAYS
+                        and _amounts_close(total, invoice.total)
+                        and vendor_keys & _vendor_keys(transaction.get("vendor_id"),
+                                                       transaction.get("invoice_vendor"))):
+                    found[transaction["id"]] = self._render(transaction, "fuzzy")
+
+        DUPLICATE_CHECKS.inc(outcome="confirmed" if found else "false_positive")
+        if found:
+            logger.warning("Possible duplicate invoice", extra={
+                "invoice_no": invoice.invoice_no, "duplicates": sorted(found),
+            })
+        return [found[transaction_id] for transaction_id in sorted(found, reverse=True)]
+
+    @staticmethod
+    def _render(transaction: Dict[str, Any], match: str) -> Dict[str, Any]:
+        day = transaction.get("invoice_date")
+        return {
+            "transaction_id": transaction["id"],
+            "match": match,
+            "invoice_number": transaction.get("invoice_number"),
+            "vendor": transaction.get("invoice_vendor"),
+            "total": transaction.get("invoice_total"),
+            "date": day if isinstance(day, str) else format_date(day),
+            "status": transaction.get("status"),
+            "timestamp": transaction.get("timestamp"),
+        }
@@ -0,0 +1,85 @@
+"""
+Export Cache
+Keeps the latest full export per format on disk, keyed by the storage change token
+"""
+
+import glob
+import hashlib
+import logging
+import os
+from typing import Iterable, Iterator, Optional
+
+from src.core.config import settings
+from src.utils.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+
+class ExportCache:
+    """
+    Disk cache of full (unfiltered) exports
+
+    A full export is written to the cache while it streams to the first
+    client (tee), and renamed into place only once complete. Later requests
+    with the same change token are served from the file; the first request
+    after an insert or clear regenerates it and prunes the stale copy.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or os.path.join(settings.EXPORT_DIR, "cache")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, export_format: str, token: str) -> str:
+        digest = hashlib.sha1(token.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.directory, f"full_{digest}.{export_format}")
+
+    def get(self, export_format: str, token: str) -> Optional[str]:
+        """
+        Look up a complete cached export
+
+        Args:
+            export_format: Export format (file extension)
+            token: Storage change token
+
+        Returns:
+            Path to the cached file, or None on a miss
+        """
+        path = self.path_for(export_format, token)
+        hit = os.path.exists(path)
+        record_cache_lookup("export", hit)
+        return path if hit else None
+
+    def tee(self, export_format: str, token: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Pass chunks through while writing them to the cache
+
+        Args:
+            export_format: Export format (file extension)
+            token: Storage change token the export was generated at
+            chunks: Export body
+
+        Yields:
+            The same chunks
+        """
+        path = self.path_for(export_format, token)
+        partial_path = f"{path}.{os.getpid()}.{id(chunks)}.partial"
+
+        try:
+            with open(partial_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(partial_path, path)
+            self._prune(export_format, keep=path)
+        finally:
+            # Client disconnected or rendering failed - never cache a partial file
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    def _prune(self, export_format: str, keep: str) -> None:
+        for stale in glob.glob(os.path.join(self.directory, f"full_*.{export_format}")):
+            if stale != keep:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
@@ -0,0 +1,280 @@
+"""
+Line-Item Reconciliation
+Pairs invoice and PO lines by optimal assignment on a description/amount cost matrix
+"""
+
+import logging
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+from src.core.comparison import compare_amounts_batch
+from src.core.config import settings
+from src.core.query import normalize_vendor
+from src.core.records import LineItem, Status
+
+logger = logging.getLogger(__name__)
+
+
+def _trigrams(text: str) -> List[str]:
+    padded = f" {normalize_vendor(text)} "
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def description_similarity(descriptions1: Sequence[str], descriptions2: Sequence[str]):
+    """
+    Pairwise similarity of two lists of line descriptions
+
+    Dice coefficient of character trigram sets, for all pairs at once. The
+    second list's trigrams form an inverted index (trigram -> lines); every
+    (line, trigram) of the first list is expanded into that trigram's postings
+    and one bincount over the (line1, line2) cells yields all shared-trigram
+    counts. The work is proportional to the actual overlaps, not to
+    lines x lines x vocabulary as a dense matrix product would be.
+
+    Args:
+        descriptions1: First descriptions (None allowed)
+        descriptions2: Second descriptions
+
+    Returns:
+        ndarray of shape (len(descriptions1), len(descriptions2)) with values in 0-1
+    """
+    import numpy as np
+
+    grams1 = [_trigrams(text or "") for text in descriptions1]
+    grams2 = [_trigrams(text or "") for text in descriptions2]
+    n, m = len(grams1), len(grams2)
+
+    # Inverted index over the second list: postings sorted by trigram id
+    ids: Dict[str, int] = {}
+    gram_ids2 = [ids.setdefault(gram, len(ids)) for grams in grams2 for gram in grams]
+    lines2 = np.repeat(np.arange(m), [len(grams) for grams in grams2])
+    order = np.argsort(np.array(gram_ids2, dtype=np.int64), kind="stable")
+    postings = lines2[order]
+    lengths = np.bincount(np.array(gram_ids2, dtype=np.int64), minlength=len(ids))
+    offsets = np.cumsum(lengths) - lengths
+
+    # (line, trigram) pairs of the first list that occur in the second at all
+    pairs = [(line, ids[gram]) for line, grams in enumerate(grams1) for gram in grams if gram in ids]
+    lines1, gram_ids1 = (np.array(column, dtype=np.int64) for column in zip(*pairs)) if pairs else (
+        np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+
+    # Expand each pair into its posting slice: position k of pair p is offsets[gram] + k
+    counts = lengths[gram_ids1]
+    firsts = np.cumsum(counts) - counts
+    positions = np.repeat(offsets[gram_ids1] - firsts, counts) + np.arange(int(counts.sum()))
+    cells = np.repeat(lines1 * m, counts) + postings[positions]
+    common = np.bincount(cells, minlength=n * m).reshape(n, m)
+
+    sizes1 = np.array([len(grams) for grams in grams1], dtype=np.float64)
+    sizes2 = np.array([len(grams) for grams in grams2], dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        similarity = 2 * common / (sizes1[:, None] + sizes2[None, :])
+    return np.nan_to_num(similarity, nan=0.0)
+
+
+def line_cost_matrix(invoice_items: Sequence[LineItem], po_items: Sequence[LineItem]):
+    """
+    Cost of pairing each invoice line with each PO line (0 = identical)
+
+    A weighted sum of description dissimilarity and the relative difference
+    of the line amounts; a missing amount costs as much as a completely
+    different one.
+
+    Returns:
+        Tuple (cost, description similarity) of ndarrays shaped (invoice lines, PO lines)
+    """
+    import numpy as np
+
+    weight = settings.LINE_ITEM_DESCRIPTION_WEIGHT
+    similarity = description_similarity([item.description for item in invoice_items],
+                                        [item.description for item in po_items])
+
+    nan = float("nan")
+    amounts1 = np.array([nan if item.amount is None else item.amount for item in invoice_items], dtype=np.float64)
+    amounts2 = np.array([nan if item.amount is None else item.amount for item in po_items], dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        relative = np.abs(amounts1[:, None] - amounts2[None, :]) / np.maximum(np.abs(amounts1)[:, None],
+                                                                              np.abs(amounts2)[None, :])
+    relative[amounts1[:, None] == amounts2[None, :]] = 0  # also covers 0 vs 0
+    relative = np.clip(np.nan_to_num(relative, nan=1.0), 0, 1)
+
+    return weight * (1 - similarity) + (1 - weight) * relative, similarity
+
+
+def optimal_assignment(cost) -> Tuple[List[int], List[int]]:
+    """
+    Minimum-cost assignment of rows to columns (Hungarian algorithm)
+
+    Shortest augmenting paths with dual potentials; each path search step
+    updates all columns as one array operation. Rows start out assigned to
+    their cheapest column where no earlier row claimed it, so on the
+    near-diagonal matrices typical of invoice/PO lines only the few
+    contested rows need a path search at all.
+
+    Args:
+        cost: 2-D array of finite costs (any shape)
+
+    Returns:
+        (rows, columns) of the min(n, m) assigned pairs, ordered by row
+    """
+    import numpy as np
+
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    if n == 0:
+        return [], []
+
+    # 1-based as in the textbook formulation: column 0 is the virtual start of each search
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=np.int64)  # row assigned to each column, 0 = free
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    # Row reduction: every row's cheapest column has zero reduced cost
+    cheapest = cost.argmin(axis=1)
+    u[1:] = cost[np.arange(n), cheapest]
+    claimed, first_rows = np.unique(cheapest, return_index=True)
+    owner[claimed + 1] = first_rows + 1
+    pending = np.ones(n, dtype=bool)
+    pending[first_rows] = False
+
+    for row in (np.flatnonzero(pending) + 1).tolist():
+        owner[0] = row
+        column = 0
+        min_reduced = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current = owner[column]
+            reduced = cost[current - 1] - u[current] - v[1:]
+            better = ~used[1:] & (reduced < min_reduced[1:])
+            min_reduced[1:][better] = reduced[better]
+            way[1:][better] = column
+            following = int(np.argmin(np.where(used[1:], np.inf, min_reduced[1:]))) + 1
+            delta = min_reduced[following]
+            u[owner[used]] += delta
+            v[used] -= delta
+            min_reduced[~used] -= delta
+            column = following
+            if owner[column] == 0:
+                break
+        # Flip the augmenting path
+        while column:
+            previous = way[column]
+            owner[column] = owner[previous]
+            column = previous
+
+    columns = np.flatnonzero(owner[1:])
+    rows = owner[1:][columns] - 1
+    if transposed:
+        rows, columns = columns, rows
+    order = np.argsort(rows)
+    return rows[order].tolist(), columns[order].tolist()
+
+
+def _line(item: LineItem, number: int, key: str) -> Dict[str, Any]:
+    return {key: number, **item.to_dict()}
+
+
+def reconcile_line_items(invoice_items: Sequence[Union[LineItem, Dict[str, Any]]],
+                         po_items: Sequence[Union[LineItem, Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Pair invoice lines with PO lines and check each pair
+
+    Lines are paired by a minimum-cost assignment over line_cost_matrix();
+    pairs costing more than LINE_ITEM_MAX_COST are left unpaired, so an
+    invoice line with no counterpart is reported instead of being forced
+    onto an unrelated PO line. Each pair then has its quantity compared
+    exactly and its unit price and amount within AMOUNT_TOLERANCE_PERCENT.
+
+    Args:
+        invoice_items: Invoice line items (LineItem or dict)
+        po_items: PO line items
+
+    Returns:
+        Dictionary with per-pair results and the unpaired lines of each side
+        (line numbers are 1-based positions in each document's table)
+    """
+    import numpy as np
+
+    invoice_items = [LineItem.coerce(item) for item in invoice_items]
+    po_items = [LineItem.coerce(item) for item in po_items]
+
+    pairs: List[Tuple[int, int]] = []
+    similarity = None
+    if invoice_items and po_items:
+        cost, similarity = line_cost_matrix(invoice_items, po_items)
+        # Capping costs at the threshold makes "leave both unpaired" as cheap as
+        # any worse pairing. A line with no pairing under the cap then costs the
+        # same wherever it goes, so it is dropped before solving; that keeps the
+        # path searches away from lines like freight that match nothing.
+        max_cost = settings.LINE_ITEM_MAX_COST
+        candidates = cost < max_cost
+        keep_rows = np.flatnonzero(candidates.any(axis=1))
+        keep_columns = np.flatnonzero(candidates.any(axis=0))
+        rows, columns = optimal_assignment(np.minimum(cost[np.ix_(keep_rows, keep_columns)], max_cost))
+        pairs = [(row, column) for row, column in zip(keep_rows[rows].tolist(), keep_columns[columns].tolist())
+                 if cost[row, column] < max_cost]
+
+    nan = float("nan")
+
+    def values(name: str, items: List[LineItem], indexes: List[int]):
+        return [nan if getattr(items[i], name) is None else getattr(items[i], name) for i in indexes]
+
+    rows = [row for row, _ in pairs]
+    columns = [column for _, column in pairs]
+    amount_matches = compare_amounts_batch(values("amount", invoice_items, rows),
+                                           values("amount", po_items, columns))[0]
+    price_matches, _, price_percents = compare_amounts_batch(values("unit_price", invoice_items, rows),
+                                                             values("unit_price", po_items, columns))
+    quantities1 = np.array(values("quantity", invoice_items, rows), dtype=np.float64)
+    quantities2 = np.array(values("quantity", po_items, columns), dtype=np.float64)
+    # A side without a quantity or unit price is judged on the amount alone
+    quantity_matches = np.isnan(quantities1) | np.isnan(quantities2) | (quantities1 == quantities2)
+    price_matches |= np.isnan(price_percents)
+
+    lines = []
+    for index, (row, column) in enumerate(pairs):
+        invoice_item, po_item = invoice_items[row], po_items[column]
+        mismatches = {}
+        if not quantity_matches[index]:
+            mismatches["quantity"] = {"invoice": invoice_item.quantity, "po": po_item.quantity}
+        if not price_matches[index]:
+            mismatches["unit_price"] = {"invoice": invoice_item.unit_price, "po": po_item.unit_price}
+        if not amount_matches[index]:
+            mismatches["amount"] = {"invoice": invoice_item.amount, "po": po_item.amount}
+        lines.append({
+            "invoice_line": row + 1,
+            "po_line": column + 1,
+            "description": invoice_item.description,
+            "po_description": po_item.description,
+            "description_similarity": int(round(float(similarity[row, column]) * 100)),
+            "matched": not mismatches,
+            "mismatches": mismatches,
+        })
+
+    paired_rows, paired_columns = set(rows), set(columns)
+    unpaired_invoice = [_line(item, number + 1, "invoice_line")
+                        for number, item in enumerate(invoice_items) if number not in paired_rows]
+    unpaired_po = [_line(item, number + 1, "po_line")
+                   for number, item in enumerate(po_items) if number not in paired_columns]
+
+    matched_lines = sum(line["matched"] for line in lines)
+    matched = matched_lines == len(invoice_items) == len(po_items)
+
+    logger.info("Line reconciliation complete", extra={
+        "invoice_lines": len(invoice_items), "po_lines": len(po_items), "matched_lines": matched_lines,
+    })
+
+    return {
+        "status": Status.MATCHED if matched else Status.MISMATCH,
+        "matched": matched,
+        "invoice_lines": len(invoice_items),
+        "po_lines": len(po_items),
+        "matched_lines": matched_lines,
+        "lines": lines,
+        "not_on_po": unpaired_invoice,
+        "not_on_invoice": unpaired_po,
+    }
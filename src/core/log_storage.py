@@ -0,0 +1,468 @@
+"""
+Log-Structured Transaction Storage
+Append-only, checksummed, segmented record log with snapshots and fast recovery
+"""
+
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.core.config import settings
+from src.core.query import TransactionIndex, TransactionQuery
+from src.core.records import normalize_transaction
+from src.core.storage import BaseTransactionStorage, format_statistics, is_matched_status
+
+logger = logging.getLogger(__name__)
+
+
+# Record frame: payload length (u32) + CRC32 of payload (u32), then the payload
+FRAME_HEADER = struct.Struct("<II")
+# Packed record position for the query index: segment number above, byte offset below
+_OFFSET_BITS = 40
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+SNAPSHOT_FILE = "snapshot.json"
+
+
+def encode_record(record: Dict[str, Any]) -> bytes:
+    """Frame a record as length + checksum + JSON payload"""
+    payload = json.dumps(record, separators=(",", ":"), default=str).encode("utf-8")
+    return FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_records(path: str, offset: int = 0) -> Iterator[Tuple[int, Optional[Dict[str, Any]], int]]:
+    """
+    Read framed records from a segment file
+
+    Args:
+        path: Segment file path
+        offset: Byte offset to start reading from
+
+    Yields:
+        Tuples of (offset, record, next_offset). A final tuple with record
+        None marks a torn or corrupt tail starting at `offset`.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            header = f.read(FRAME_HEADER.size)
+            if not header:
+                return
+            if len(header) < FRAME_HEADER.size:
+                yield offset, None, offset
+                return
+
+            length, checksum = FRAME_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                yield offset, None, offset
+                return
+
+            next_offset = offset + FRAME_HEADER.size + length
+            yield offset, json.loads(payload), next_offset
+            offset = next_offset
+
+
+class LogTransactionStorage(BaseTransactionStorage):
+    """
+    File-based transaction storage built on an append-only record log
+
+    Every insert is a single sequential append of a framed record to the
+    active segment; segments roll over at a size limit. A snapshot of the
+    counters and a sparse id -> (segment, offset) index is written
+    periodically, so recovery only replays records appended after it.
+    fsync is batched by record count and interval instead of per record; a
+    timer syncs appends that no later write or count trigger covers, so a
+    record is durable within the interval even if writes stop.
+    Queries use secondary indexes plus exact record positions, built by one
+    scan on the first query and maintained on append afterwards.
+    """
+
+    def __init__(self, directory: str = None, segment_bytes: int = None,
+                 snapshot_interval: int = None, index_interval: int = None,
+                 fsync_every: int = None, fsync_interval_ms: float = None):
+        """
+        Open the log directory and recover state
+
+        Args:
+            directory: Directory holding segments and snapshot
+            segment_bytes: Roll to a new segment after this many bytes
+            snapshot_interval: Write a snapshot every N records
+            index_interval: Keep a sparse index entry every N records
+            fsync_every: fsync after N unsynced records (0 disables count trigger)
+            fsync_interval_ms: fsync when the oldest unsynced record is this old
+        """
+        super().__init__()
+        self.directory = directory or settings.LOG_STORAGE_DIR
+        self.segment_bytes = segment_bytes or settings.LOG_SEGMENT_BYTES
+        self.snapshot_interval = snapshot_interval or settings.LOG_SNAPSHOT_INTERVAL
+        self.index_interval = index_interval or settings.LOG_INDEX_INTERVAL
+        self.fsync_every = settings.LOG_FSYNC_EVERY if fsync_every is None else fsync_every
+        interval_ms = settings.LOG_FSYNC_INTERVAL_MS if fsync_interval_ms is None else fsync_interval_ms
+        self.fsync_interval = interval_ms / 1000
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.RLock()
+
+        # Recovered / maintained state
+        self.first_segment = 0
+        self.active_segment = 0
+        self.next_id = 1
+        self.last_id_value = 0
+        self.total = 0
+        self.matched = 0
+        self.sparse_index: List[Tuple[int, int, int]] = []  # (id, segment, offset)
+        self._since_snapshot = 0
+        self._unsynced = 0
+        self._sync_timer: Optional[threading.Timer] = None
+
+        # Secondary indexes for queries, built by one scan on first use
+        self._index: Optional[TransactionIndex] = None
+        self._positions = array("q")  # packed (segment, offset), parallel to _index.ids
+        self._last_sync = time.monotonic()
+
+        self.instance_id = ""
+        self._recover()
+        self._file = open(self._segment_path(self.active_segment), "ab", buffering=0)
+
+        if not self.instance_id:
+            # New log directory: persist its identity straight away
+            self.instance_id = uuid.uuid4().hex[:8]
+            self._write_snapshot()
+
+    # ------------------------------------------------------------------ paths
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}")
+
+    def _segment_numbers(self) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                numbers.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(n for n in numbers if n >= self.first_segment)
+
+    # --------------------------------------------------------------- recovery
+
+    def _recover(self) -> None:
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        segment, offset = 0, 0
+
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self.instance_id = snapshot["instance_id"]
+            self.first_segment = snapshot["first_segment"]
+            self.next_id = snapshot["next_id"]
+            self.total = snapshot["total"]
+            self.matched = snapshot["matched"]
+            self.sparse_index = [tuple(entry) for entry in snapshot["sparse_index"]]
+            self.last_id_value = snapshot.get("last_id", 0)
+            segment, offset = snapshot["segment"], snapshot["offset"]
+
+        self.active_segment = max([segment] + self._segment_numbers())
+        replayed = 0
+
+        # Replay only what was appended after the snapshot position
+        for number in self._segment_numbers():
+            if number < segment:
+                continue
+            start = offset if number == segment else 0
+            path = self._segment_path(number)
+            for record_offset, record, _ in read_records(path, start):
+                if record is None:
+                    logger.warning("Truncating torn log tail", extra={"segment": number, "offset": record_offset})
+                    with open(path, "r+b") as f:
+                        f.truncate(record_offset)
+                    break
+                self._apply(record, number, record_offset)
+                replayed += 1
+
+        self._since_snapshot = replayed
+        logger.info("Transaction log recovered", extra={"records": self.total, "replayed": replayed})
+
+    def _apply(self, record: Dict[str, Any], segment: int, offset: int) -> None:
+        """Update in-memory counters and sparse index for one record"""
+        transaction_id = record["id"]
+        if self.total % self.index_interval == 0:
+            self.sparse_index.append((transaction_id, segment, offset))
+        self.total += 1
+        self.matched += is_matched_status(record.get("status"))
+        self.next_id = max(self.next_id, transaction_id + 1)
+        self.last_id_value = transaction_id
+
+    # ---------------------------------------------------------------- writing
+
+    def add_transaction(self, transaction: Dict[str, Any], latency: Optional[float] = None) -> int:
+        """
+        Append a transaction to the log
+
+        Args:
+            transaction: Transaction data dictionary
+            latency: Seconds spent processing the pair (for throughput rollups)
+
+        Returns:
+            Transaction id
+        """
+        with self._lock:
+            record = normalize_transaction(transaction)
+            record["id"] = self.next_id
+            frame = encode_record(record)
+
+            if self._file.tell() + len(frame) > self.segment_bytes and self._file.tell() > 0:
+                self._roll_segment()
+
+            offset = self._file.tell()
+            self._file.write(frame)
+            self._apply(record, self.active_segment, offset)
+            self.last_id_value = record["id"]
+            if self._index is not None:
+                self._index.add(record)
+                self._positions.append((self.active_segment << _OFFSET_BITS) | offset)
+            self._columns_add(record["id"], record)
+            self._rollup_add(record, latency)
+            self._touch()
+
+            self._unsynced += 1
+            self._maybe_sync()
+
+            self._since_snapshot += 1
+            if self._since_snapshot >= self.snapshot_interval:
+                self._write_snapshot()
+
+            logger.debug("Transaction #%d appended", record["id"])
+            return record["id"]
+
+    def _maybe_sync(self) -> None:
+        now = time.monotonic()
+        if (self.fsync_every and self._unsynced >= self.fsync_every) or \
+                now - self._last_sync >= self.fsync_interval:
+            self.sync()
+        elif self._sync_timer is None:
+            # Bound the time an append stays unsynced when no further write comes
+            self._sync_timer = threading.Timer(self.fsync_interval, self._timed_sync)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+
+    def _timed_sync(self) -> None:
+        with self._lock:
+            self._sync_timer = None
+            if not self._file.closed:
+                self.sync()
+
+    def sync(self) -> None:
+        """fsync the active segment"""
+        with self._lock:
+            if self._unsynced:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def _roll_segment(self) -> None:
+        self.sync()
+        self._file.close()
+        self.active_segment += 1
+        self._file = open(self._segment_path(self.active_segment), "ab", buffering=0)
+
+    def _write_snapshot(self) -> None:
+        """Atomically persist counters, sparse index and the replay position"""
+        self.sync()
+        snapshot = {
+            "instance_id": self.instance_id,
+            "first_segment": self.first_segment,
+            "segment": self.active_segment,
+            "offset": self._file.tell(),
+            "next_id": self.next_id,
+            "last_id": self.last_id_value,
+            "total": self.total,
+            "matched": self.matched,
+            "sparse_index": self.sparse_index,
+        }
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._since_snapshot = 0
+
+    def clear(self) -> None:
+        """Clear all transactions and compact the log down to an empty segment"""
+        with self._lock:
+            old_segments = self._segment_numbers()
+            self.sync()
+            self._file.close()
+
+            # Point the snapshot past the old segments first, so a crash
+            # during deletion never resurrects cleared records
+            self.first_segment = self.active_segment = self.active_segment + 1
+            self.total = 0
+            self.matched = 0
+            self.sparse_index = []
+            self.last_id_value = 0
+            self._index = None
+            self._positions = array("q")
+            self._columns_reset()
+            self.rollups.clear()
+            self._touch()
+            self._file = open(self._segment_path(self.active_segment), "ab", buffering=0)
+            self._write_snapshot()
+
+            for number in old_segments:
+                os.remove(self._segment_path(number))
+
+        logger.info("All transactions cleared")
+
+    def close(self) -> None:
+        """Flush, snapshot and close the active segment"""
+        with self._lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+            if not self._file.closed:
+                self._write_snapshot()
+                self._file.close()
+
+    # ---------------------------------------------------------------- reading
+
+    def _iter_from(self, segment: int, offset: int) -> Iterator[Dict[str, Any]]:
+        for number in self._segment_numbers():
+            if number < segment:
+                continue
+            start = offset if number == segment else 0
+            try:
+                for _, record, _ in read_records(self._segment_path(number), start):
+                    if record is None:
+                        return
+                    yield record
+            except FileNotFoundError:
+                # Segment removed by a concurrent clear()
+                return
+
+    def _position_for(self, transaction_id: int) -> Tuple[int, int]:
+        """Closest indexed (segment, offset) at or before a transaction id"""
+        position = bisect_right(self.sparse_index, (transaction_id, float("inf"), float("inf"))) - 1
+        if position < 0:
+            return self.first_segment, 0
+        _, segment, offset = self.sparse_index[position]
+        return segment, offset
+
+    def iter_transactions(self) -> Iterator[Dict[str, Any]]:
+        return self._iter_from(self.first_segment, 0)
+
+    def _iter_after(self, since_id: Optional[int]) -> Iterator[Dict[str, Any]]:
+        if not since_id:
+            return self.iter_transactions()
+        return self._iter_from(*self._position_for(since_id + 1))
+
+    def _ensure_index(self) -> TransactionIndex:
+        with self._lock:
+            if self._index is None:
+                index, positions = TransactionIndex(), array("q")
+                for number in self._segment_numbers():
+                    for offset, record, _ in read_records(self._segment_path(number)):
+                        if record is None:
+                            break
+                        index.add(record)
+                        positions.append((number << _OFFSET_BITS) | offset)
+                self._index, self._positions = index, positions
+                logger.info("Query index built", extra={"records": len(index)})
+            return self._index
+
+    def _fetch(self, ids: Iterable[int]) -> Iterator[Dict[str, Any]]:
+        """Read records by id using their exact indexed positions"""
+        index = self._ensure_index()
+        positions = self._positions
+        handles: Dict[int, Any] = {}
+        try:
+            for transaction_id in ids:
+                position = bisect_left(index.ids, transaction_id)
+                if position >= len(index.ids) or index.ids[position] != transaction_id:
+                    continue
+                packed = positions[position]
+                segment, offset = packed >> _OFFSET_BITS, packed & ((1 << _OFFSET_BITS) - 1)
+                if segment not in handles:
+                    try:
+                        handles[segment] = open(self._segment_path(segment), "rb")
+                    except FileNotFoundError:
+                        return
+                f = handles[segment]
+                f.seek(offset)
+                length, checksum = FRAME_HEADER.unpack(f.read(FRAME_HEADER.size))
+                payload = f.read(length)
+                if zlib.crc32(payload) == checksum:
+                    yield json.loads(payload)
+        finally:
+            for f in handles.values():
+                f.close()
+
+    def _query_candidates(self, query: TransactionQuery) -> Iterator[Dict[str, Any]]:
+        index = self._ensure_index()
+        candidates = index.candidates(query)
+        if candidates is None:
+            since_id, until_id = index.id_window(query.start, query.end)
+            if query.after_id is not None:
+                since_id = max(since_id or 0, query.after_id)
+            return self.iter_filtered(query.start, query.end, query.matched, since_id=since_id, until_id=until_id)
+        return self._fetch(candidates)
+
+    def get_transaction(self, transaction_id: int) -> Optional[Dict[str, Any]]:
+        segment, offset = self._position_for(transaction_id)
+        for record in self._iter_from(segment, offset):
+            if record["id"] == transaction_id:
+                return record
+            if record["id"] > transaction_id:
+                break
+        return None
+
+    def get_recent_transactions(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get most recent transactions
+
+        Args:
+            limit: Number of transactions to return
+
+        Returns:
+            List of recent transactions (oldest first)
+        """
+        if limit <= 0:
+            return self.get_all_transactions()
+
+        # Start from the sparse index entry `limit` records back from the end
+        position = max(0, (self.total - limit) // self.index_interval)
+        if position < len(self.sparse_index):
+            _, segment, offset = self.sparse_index[position]
+        else:
+            segment, offset = self.first_segment, 0
+
+        recent = deque(self._iter_from(segment, offset), maxlen=limit)
+        return list(recent)
+
+    def count(self) -> int:
+        return self.total
+
+    def last_id(self) -> int:
+        return self.last_id_value
+
+    def _last_id_and_count(self) -> Tuple[int, int]:
+        with self._lock:
+            return self.last_id_value, self.total
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get statistics about stored transactions
+
+        Returns:
+            Statistics dictionary
+        """
+        return format_statistics(self.total, self.matched)
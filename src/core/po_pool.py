@@ -0,0 +1,337 @@
+"""
+PO Pool
+Open purchase orders indexed by PO number, canonical vendor and amount
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.core.comparison import compare_batch, compare_invoice_po
+from src.core.config import settings
+from src.core.query import normalize_number
+from src.core.records import ExtractionResult, date_value, format_date
+from src.core.rules import ComparisonPolicy
+from src.core.vendor_registry import canonical_vendor_key
+from src.utils.metrics import record_cache_lookup, registry
+
+logger = logging.getLogger(__name__)
+
+PO_POOL_SIZE = registry.gauge(
+    "futurix_po_pool_open",
+    "Open purchase orders held in the PO pool",
+)
+
+# Fields of an extraction kept in the pool (raw OCR text is not)
+_FIELDS = ("vendor", "po_no", "date", "total", "line_items", "confidence")
+
+
+def file_digest(path: str) -> str:
+    """Content hash identifying a document regardless of its file name"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:32]
+
+
+class PooledPO(NamedTuple):
+    """One purchase order in the pool"""
+
+    po_id: str  # content hash of the source document
+    extraction: ExtractionResult
+    vendor_id: Optional[str]
+
+
+class POMatch(NamedTuple):
+    """Best pooled PO for an invoice, with its comparison result"""
+
+    po: PooledPO
+    comparison: Dict[str, Any]
+    matched_by: str  # "po_number", "vendor_amount", "vendor" or "amount"
+    candidates: int
+
+
+def _to_entry(po: PooledPO) -> Dict[str, Any]:
+    extraction = po.extraction
+    entry = {
+        "po_id": po.po_id, "vendor_id": po.vendor_id, "vendor": extraction.vendor, "po_no": extraction.po_no,
+        "date": format_date(extraction.date),
+        "total": extraction.total, "confidence": extraction.confidence,
+    }
+    if extraction.line_items:
+        entry["line_items"] = [item.to_dict() for item in extraction.line_items]
+    return entry
+
+
+def _from_entry(entry: Dict[str, Any]) -> PooledPO:
+    extraction = ExtractionResult(
+        vendor=entry.get("vendor"), po_no=entry.get("po_no"),
+        date=entry.get("date"),
+        total=entry.get("total"), line_items=entry.get("line_items"), confidence=entry.get("confidence") or 0,
+    )
+    return PooledPO(entry["po_id"], extraction, entry.get("vendor_id"))
+
+
+class POPool:
+    """
+    Purchase orders ingested once and looked up by invoice
+
+    POs are keyed by the content hash of their document, so the same file
+    is only OCR'd once however many invoices (or re-uploads) reference it.
+    Three indexes narrow the candidates for an invoice:
+
+    - normalized PO number -> POs
+    - canonical vendor id (or normalized vendor name) -> POs
+    - PO totals in one sorted array, so an amount range is two binary searches
+
+    Only the few candidates they yield are compared.
+    The pool is persisted as an append-only JSON-lines file (closing a PO
+    appends a tombstone) and replayed on first use.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._pos: Dict[str, PooledPO] = {}
+        self._by_number: Dict[str, List[str]] = {}
+        self._by_vendor: Dict[str, List[str]] = {}
+        self._amounts = array("d")  # sorted PO totals
+        self._amount_ids: List[str] = []  # po_id per _amounts entry
+        self._file = None  # append handle for the pool file
+        PO_POOL_SIZE.set_function(lambda: len(self._pos))
+
+    # ---------------------------------------------------------------- loading
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if self.path and os.path.exists(self.path):
+                # Resolve tombstones first, then index the survivors and sort amounts once
+                entries: Dict[str, Dict[str, Any]] = {}
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        entry = json.loads(line)
+                        if entry.get("closed"):
+                            entries.pop(entry["po_id"], None)
+                        else:
+                            entries.setdefault(entry["po_id"], entry)
+                for entry in entries.values():
+                    self._index(_from_entry(entry), keep_sorted=False)
+                order = sorted(range(len(self._amounts)), key=self._amounts.__getitem__)
+                self._amounts = array("d", (self._amounts[i] for i in order))
+                self._amount_ids = [self._amount_ids[i] for i in order]
+                logger.info("PO pool loaded", extra={"open_pos": len(self._pos), "path": self.path})
+            self._loaded = True
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        if not self.path:
+            return
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    # --------------------------------------------------------------- indexing
+
+    @staticmethod
+    def _vendor_key(vendor_id: Optional[str], vendor: Optional[str]) -> Optional[str]:
+        if vendor_id:
+            return f"id:{vendor_id}"
+        key = canonical_vendor_key(vendor)
+        return f"name:{key}" if key else None
+
+    def _index(self, po: PooledPO, keep_sorted: bool = True) -> None:
+        if po.po_id in self._pos:
+            return
+        self._pos[po.po_id] = po
+        number = normalize_number(po.extraction.po_no)
+        if number:
+            self._by_number.setdefault(number, []).append(po.po_id)
+        vendor_key = self._vendor_key(po.vendor_id, po.extraction.vendor)
+        if vendor_key:
+            self._by_vendor.setdefault(vendor_key, []).append(po.po_id)
+        if po.extraction.total is not None:
+            position = bisect_right(self._amounts, po.extraction.total) if keep_sorted else len(self._amounts)
+            self._amounts.insert(position, po.extraction.total)
+            self._amount_ids.insert(position, po.po_id)
+
+    def _unindex(self, po_id: str) -> Optional[PooledPO]:
+        po = self._pos.pop(po_id, None)
+        if po is None:
+            return None
+        number = normalize_number(po.extraction.po_no)
+        if number:
+            self._by_number[number].remove(po_id)
+        vendor_key = self._vendor_key(po.vendor_id, po.extraction.vendor)
+        if vendor_key:
+            self._by_vendor[vendor_key].remove(po_id)
+        if po.extraction.total is not None:
+            position = bisect_left(self._amounts, po.extraction.total)
+            while self._amount_ids[position] != po_id:
+                position += 1
+            del self._amounts[position]
+            del self._amount_ids[position]
+        return po
+
+    # ----------------------------------------------------------------- public
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._pos)
+
+    def get(self, po_id: str) -> Optional[PooledPO]:
+        """Pooled PO by id (content hash), recording a cache lookup"""
+        self._ensure_loaded()
+        po = self._pos.get(po_id)
+        record_cache_lookup("po_extraction", po is not None)
+        return po
+
+    def add(self, po_id: str, extraction: ExtractionResult, vendor_id: Optional[str] = None) -> PooledPO:
+        """
+        Add an extracted PO (no-op if the same document is already pooled)
+
+        Args:
+            po_id: Content hash of the PO document (see file_digest)
+            extraction: OCR extraction of the PO
+            vendor_id: Canonical vendor id, if resolved
+
+        Returns:
+            The pooled PO
+        """
+        self._ensure_loaded()
+        with self._lock:
+            existing = self._pos.get(po_id)
+            if existing is not None:
+                return existing
+            kept = ExtractionResult(**{name: getattr(extraction, name) for name in _FIELDS})
+            po = PooledPO(po_id, kept, vendor_id)
+            self._index(po)
+            self._append(_to_entry(po))
+            return po
+
+    def close(self, po_id: str) -> bool:
+        """
+        Remove a PO from the pool (e.g. once fully invoiced)
+
+        Returns:
+            Whether the PO was open
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if self._unindex(po_id) is None:
+                return False
+            self._append({"po_id": po_id, "closed": True})
+            return True
+
+    def _amount_window(self, total: float, window_percent: float) -> Tuple[int, int, float, float]:
+        """Positions [start, end) of _amounts within window_percent of `total`, and the bounds"""
+        low = total * (1 - window_percent / 100)
+        high = total * (1 + window_percent / 100)
+        if low > high:
+            low, high = high, low
+        return bisect_left(self._amounts, low), bisect_right(self._amounts, high), low, high
+
+    def _amount_range(self, total: float, start: int, end: int) -> Iterator[str]:
+        """Pooled PO ids at positions [start, end) of _amounts, nearest to `total` first"""
+        centre = bisect_left(self._amounts, total, start, end)
+        # Walk outwards from the invoice total
+        left, right = centre - 1, centre
+        while left >= start or right < end:
+            if right < end and (left < start or self._amounts[right] - total <= total - self._amounts[left]):
+                yield self._amount_ids[right]
+                right += 1
+            else:
+                yield self._amount_ids[left]
+                left -= 1
+
+    def candidates(self, invoice: ExtractionResult, vendor_id: Optional[str] = None) -> Tuple[List[str], str]:
+        """
+        Candidate PO ids for an invoice, from the most selective index that applies
+
+        Returns:
+            (candidate ids, index used)
+        """
+        limit = settings.PO_POOL_MAX_CANDIDATES
+        window = settings.PO_POOL_AMOUNT_WINDOW_PERCENT
+
+        number = normalize_number(invoice.po_no)
+        if number and self._by_number.get(number):
+            return list(self._by_number[number][:limit]), "po_number"
+
+        vendor_key = self._vendor_key(vendor_id, invoice.vendor)
+        by_vendor = self._by_vendor.get(vendor_key, []) if vendor_key else []
+        total = invoice.total
+        if total is not None:
+            start, end, low, high = self._amount_window(total, window)
+            if by_vendor:
+                # Intersect by walking whichever side is smaller
+                if len(by_vendor) <= end - start:
+                    amounts = {po_id: self._pos[po_id].extraction.total for po_id in by_vendor}
+                    in_range = sorted(
+                        (po_id for po_id, amount in amounts.items() if amount is not None and low <= amount <= high),
+                        key=lambda po_id: abs(amounts[po_id] - total),
+                    )
+                else:
+                    members = set(by_vendor)
+                    in_range = [po_id for po_id in self._amount_range(total, start, end) if po_id in members]
+                if in_range:
+                    return in_range[:limit], "vendor_amount"
+            else:
+                in_range = list(islice(self._amount_range(total, start, end), limit))
+                if in_range:
+                    return in_range, "amount"
+        return list(by_vendor[-limit:]), "vendor"
+
+    def find(self, invoice: ExtractionResult, vendor_id: Optional[str] = None,
+             policy: Optional[ComparisonPolicy] = None) -> Optional[POMatch]:
+        """
+        Best open PO for an invoice
+
+        Candidates from the indexes are compared in one compare_batch call;
+        the one passing the most checks wins, ties going to the smallest
+        amount difference and then the nearest date. The winner's result
+        comes from compare_invoice_po, as for an uploaded pair.
+
+        Args:
+            invoice: OCR extraction of the invoice
+            vendor_id: Canonical vendor id of the invoice, if resolved
+            policy: Comparison policy for the invoice's vendor (default policy if omitted)
+
+        Returns:
+            POMatch, or None if the pool has no candidate
+        """
+        self._ensure_loaded()
+        with self._lock:
+            ids, matched_by = self.candidates(invoice, vendor_id)
+            pos = [self._pos[po_id] for po_id in ids]
+
+        if not pos:
+            return None
+
+        def rank(item):
+            po, result = item
+            amount_gap = abs((invoice.total or 0) - (po.extraction.total or 0))
+            invoice_date, po_date = date_value(invoice.date), date_value(po.extraction.date)
+            date_gap = abs((invoice_date - po_date).days) if invoice_date and po_date else float("inf")
+            return -result["passed_checks"], amount_gap, date_gap
+
+        policies = None if policy is None else [policy] * len(pos)
+        results = compare_batch([invoice] * len(pos), [po.extraction for po in pos], policies)
+        best, _ = min(zip(pos, results), key=rank)
+        return POMatch(best, compare_invoice_po(invoice, best.extraction, policy), matched_by, len(pos))
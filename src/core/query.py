@@ -0,0 +1,450 @@
+"""
+Transaction Query Module
+Filter model and secondary indexes for transaction lookups
+"""
+
+import math
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from src.core.bloom import BloomFilter
+from src.core.config import settings
+from src.core.records import Status, TransactionRecord, date_value, to_date, to_timestamp
+
+
+def normalize_vendor(name: Optional[str]) -> str:
+    """Lowercase, strip punctuation and collapse whitespace ("ABC Pvt. Ltd" -> "abc pvt ltd")"""
+    if not name:
+        return ""
+    return " ".join(re.sub(r"[^\w\s]", " ", name.lower()).split())
+
+
+def normalize_number(number: Optional[str]) -> str:
+    """Case-insensitive key for invoice/PO numbers"""
+    return (number or "").strip().upper()
+
+
+class TransactionQuery:
+    """
+    Filters for a transaction query (all optional, combined with AND)
+
+    Attributes:
+        vendor: Vendor name matched against invoice or PO vendor
+        fuzzy: Match vendor names by similarity instead of exact (normalized) equality
+        matched: True for matched only, False for mismatched only
+        invoice_number: Exact invoice number (case-insensitive)
+        po_number: Exact PO number (case-insensitive)
+        min_amount: Inclusive lower bound on the invoice total
+        max_amount: Inclusive upper bound on the invoice total
+        min_invoice_date: Inclusive lower bound on the (parsed) invoice date
+        max_invoice_date: Inclusive upper bound on the invoice date
+        start: Inclusive lower processing-timestamp bound (see parse_time_bound)
+        end: Inclusive upper processing-timestamp bound
+        after_id: Only transactions with a larger id (pagination cursor)
+        limit: Maximum number of results
+    """
+
+    def __init__(self, vendor: Optional[str] = None, fuzzy: bool = False, matched: Optional[bool] = None,
+                 invoice_number: Optional[str] = None, po_number: Optional[str] = None,
+                 min_amount: Optional[float] = None, max_amount: Optional[float] = None,
+                 min_invoice_date: Optional[date] = None, max_invoice_date: Optional[date] = None,
+                 start: Optional[str] = None, end: Optional[str] = None,
+                 after_id: Optional[int] = None, limit: int = 100):
+        self.vendor = normalize_vendor(vendor) or None
+        self.fuzzy = fuzzy
+        self.matched = matched
+        self.invoice_number = normalize_number(invoice_number) or None
+        self.po_number = normalize_number(po_number) or None
+        self.min_amount = min_amount
+        self.max_amount = max_amount
+        self.min_invoice_date = min_invoice_date
+        self.max_invoice_date = max_invoice_date
+        self.start = start
+        self.end = end
+        self.after_id = after_id
+        self.limit = limit
+        self._vendor_cache: Dict[str, bool] = {}
+
+    def vendor_matches(self, name: Optional[str]) -> bool:
+        """Whether a (raw) vendor name satisfies the vendor filter"""
+        key = normalize_vendor(name)
+        if not key:
+            return False
+        if not self.fuzzy:
+            return key == self.vendor
+        if key not in self._vendor_cache:
+            from src.core.comparison import fuzzy_match_vendor
+            self._vendor_cache[key] = fuzzy_match_vendor(key, self.vendor)
+        return self._vendor_cache[key]
+
+    def matches(self, transaction: Any) -> bool:
+        """
+        Check a transaction (record or dict) against every filter
+
+        Indexes only narrow the candidates; this is the final word.
+        """
+        if self.vendor and not (self.vendor_matches(transaction.get("invoice_vendor"))
+                                or self.vendor_matches(transaction.get("po_vendor"))):
+            return False
+        if self.matched is not None and Status.parse(transaction.get("status")).matched != self.matched:
+            return False
+        if self.invoice_number and normalize_number(transaction.get("invoice_number")) != self.invoice_number:
+            return False
+        if self.po_number and normalize_number(transaction.get("po_number")) != self.po_number:
+            return False
+        if self.min_amount is not None or self.max_amount is not None:
+            amount = transaction.get("invoice_total")
+            if amount is None:
+                return False
+            if self.min_amount is not None and amount < self.min_amount:
+                return False
+            if self.max_amount is not None and amount > self.max_amount:
+                return False
+        if self.min_invoice_date is not None or self.max_invoice_date is not None:
+            # Not indexed: checked before the limit is applied, so it narrows what the limit counts
+            day = (date_value(transaction.invoice_date) if isinstance(transaction, TransactionRecord)
+                   else to_date(transaction.get("invoice_date")))
+            if day is None:
+                return False
+            if self.min_invoice_date is not None and day < self.min_invoice_date:
+                return False
+            if self.max_invoice_date is not None and day > self.max_invoice_date:
+                return False
+        timestamp = transaction.get("timestamp") or ""
+        if self.start and timestamp < self.start:
+            return False
+        if self.end and timestamp > self.end:
+            return False
+        return True
+
+
+# Amount buckets are quarter-octaves (~19% wide); non-positive amounts share one bucket
+_NON_POSITIVE_BUCKET = -(10 ** 6)
+
+
+def _amount_bucket(amount: float) -> int:
+    return int(math.floor(math.log2(amount) * 4)) if amount > 0 else _NON_POSITIVE_BUCKET
+
+
+class SegmentFilter:
+    """
+    Summary of a block of transactions that rules it out for most queries
+
+    Kept per spilled segment instead of index postings: the invoice total
+    range, the status counts and a Bloom filter of the block's vendors and
+    invoice/PO numbers (a few bytes per transaction). Vendor names
+    themselves are kept once for all blocks by the caller.
+    """
+
+    __slots__ = ("keys", "min_amount", "max_amount", "count", "matched")
+
+    def __init__(self, records: Sequence[TransactionRecord], vendors: Optional[Set[str]] = None):
+        """
+        Args:
+            records: Transactions of the block
+            vendors: Set that receives the block's normalized vendor names
+        """
+        names = set()
+        keys = []
+        amounts = []
+        for record in records:
+            names.add(normalize_vendor(record.invoice_vendor))
+            names.add(normalize_vendor(record.po_vendor))
+            for kind, number in (("invoice", record.invoice_number), ("po", record.po_number)):
+                number = normalize_number(number)
+                if number:
+                    keys.append(hash((kind, number)))
+            if record.invoice_total is not None:
+                amounts.append(record.invoice_total)
+        names.discard("")
+        keys.extend(hash(("vendor", name)) for name in names)
+        if vendors is not None:
+            vendors.update(names)
+
+        self.keys = BloomFilter(len(keys), settings.QUERY_SEGMENT_BLOOM_ERROR_RATE)
+        for key in keys:
+            self.keys.add(key)
+        self.min_amount = min(amounts) if amounts else None
+        self.max_amount = max(amounts) if amounts else None
+        self.count = len(records)
+        self.matched = sum(record.matched for record in records)
+
+    def may_match(self, query: TransactionQuery, vendors: Iterable[str] = ()) -> bool:
+        """
+        False when no transaction of the block can satisfy the query
+
+        Args:
+            query: The query
+            vendors: Normalized names the vendor filter accepts (needed for a fuzzy one)
+        """
+        if query.vendor:
+            names = vendors if query.fuzzy else (query.vendor,)
+            if not any(hash(("vendor", name)) in self.keys for name in names):
+                return False
+        if query.matched is not None and self.matched == (0 if query.matched else self.count):
+            return False
+        if query.invoice_number and hash(("invoice", query.invoice_number)) not in self.keys:
+            return False
+        if query.po_number and hash(("po", query.po_number)) not in self.keys:
+            return False
+        if query.min_amount is not None or query.max_amount is not None:
+            if self.min_amount is None:
+                return False
+            if query.min_amount is not None and self.max_amount < query.min_amount:
+                return False
+            if query.max_amount is not None and self.min_amount > query.max_amount:
+                return False
+        return True
+
+
+class TransactionIndex:
+    """
+    In-memory secondary indexes over transaction ids
+
+    Maintained incrementally on insert. Postings are append-only int64
+    arrays of ascending ids, per normalized vendor, invoice number, PO
+    number, status and amount bucket. Processing time maps to an id range by
+    binary search, because ids and timestamps both grow with insertion order.
+
+    Invoice/PO numbers are nearly unique, so they are keyed by hash and a
+    posting holds a bare id until a second transaction shares the key;
+    hash collisions only widen the candidates checked by the final predicate.
+
+    A backend that moves old transactions out of memory calls
+    discard_through() so that postings cover only the ids above `floor`;
+    the older ids are its to search (see SegmentFilter).
+
+    Inserts take a lock; lookups copy the posting maps under it, so a query
+    never iterates a dict that a concurrent insert is growing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        self._vendors: Dict[str, array] = {}
+        self._invoice_numbers: Dict[int, Union[int, array]] = {}
+        self._po_numbers: Dict[int, Union[int, array]] = {}
+        self._status: Dict[bool, array] = {True: array("q"), False: array("q")}
+        self._amounts: Dict[int, array] = {}
+        self.ids = array("q")
+        self._timestamps = array("q")
+        self._time_ordered = True
+        self.floor = 0  # ids <= floor have been discarded
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def _post(postings: Dict[Any, array], key: Any, transaction_id: int) -> None:
+        if key is None or key == "":
+            return
+        ids = postings.get(key)
+        if ids is None:
+            ids = postings[key] = array("q")
+        if not ids or ids[-1] != transaction_id:
+            ids.append(transaction_id)
+
+    @staticmethod
+    def _post_number(postings: Dict[int, Union[int, array]], number: str, transaction_id: int) -> None:
+        if not number:
+            return
+        key = hash(number)
+        ids = postings.get(key)
+        if ids is None:
+            postings[key] = transaction_id
+        elif isinstance(ids, int):
+            postings[key] = array("q", (ids, transaction_id))
+        else:
+            ids.append(transaction_id)
+
+    @staticmethod
+    def _number_postings(postings: Dict[int, Union[int, array]], number: str) -> array:
+        ids = postings.get(hash(number))
+        if ids is None:
+            return array("q")
+        return array("q", (ids,)) if isinstance(ids, int) else ids
+
+    def add(self, transaction: Any) -> None:
+        """
+        Index one transaction (record or dict); ids must arrive in ascending order
+
+        Args:
+            transaction: Stored transaction including its id
+        """
+        if isinstance(transaction, TransactionRecord):
+            transaction_id, timestamp = transaction.id, transaction.timestamp
+            matched = transaction.matched
+        else:
+            transaction_id, timestamp = transaction["id"], to_timestamp(transaction.get("timestamp"))
+            matched = Status.parse(transaction.get("status")).matched
+
+        vendors = (normalize_vendor(transaction.get("invoice_vendor")), normalize_vendor(transaction.get("po_vendor")))
+        numbers = (normalize_number(transaction.get("invoice_number")), normalize_number(transaction.get("po_number")))
+        amount = transaction.get("invoice_total")
+        timestamp = timestamp or 0
+
+        with self._lock:
+            for vendor in vendors:
+                self._post(self._vendors, vendor, transaction_id)
+            self._post_number(self._invoice_numbers, numbers[0], transaction_id)
+            self._post_number(self._po_numbers, numbers[1], transaction_id)
+            self._status[matched].append(transaction_id)
+            if amount is not None:
+                self._post(self._amounts, _amount_bucket(amount), transaction_id)
+
+            if self._timestamps and timestamp < self._timestamps[-1]:
+                # Out-of-order timestamps: stop using time for index lookups
+                self._time_ordered = False
+            self.ids.append(transaction_id)
+            self._timestamps.append(timestamp)
+
+    @staticmethod
+    def _discard(postings: Dict[Any, Union[int, array]], last_id: int) -> None:
+        # Replace rather than trim arrays: lookups may still hold the old ones
+        for key, ids in list(postings.items()):
+            if isinstance(ids, int):
+                if ids <= last_id:
+                    del postings[key]
+                continue
+            position = bisect_right(ids, last_id)
+            if position == len(ids):
+                del postings[key]
+            elif position:
+                postings[key] = ids[position:]
+
+    def discard_through(self, last_id: int) -> None:
+        """
+        Drop every posting for ids <= last_id
+
+        Args:
+            last_id: Newest id no longer indexed (becomes `floor`)
+        """
+        with self._lock:
+            for postings in (self._vendors, self._invoice_numbers, self._po_numbers, self._amounts):
+                self._discard(postings, last_id)
+            for matched, ids in list(self._status.items()):
+                self._status[matched] = ids[bisect_right(ids, last_id):]
+            position = bisect_right(self.ids, last_id)
+            self.ids = self.ids[position:]
+            self._timestamps = self._timestamps[position:]
+            self.floor = max(self.floor, last_id)
+
+    def vendor_names(self) -> List[str]:
+        """Distinct normalized vendor names"""
+        with self._lock:
+            return list(self._vendors)
+
+    def id_window(self, start: Optional[str], end: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Translate a processing-time window to an id window
+
+        Returns:
+            (since_id, until_id): ids in the window are > since_id and <= until_id
+            (None for an open side)
+        """
+        with self._lock:
+            ids, timestamps, floor = self.ids, self._timestamps, self.floor
+        if not self._time_ordered or not ids:
+            return None, None
+        since_id = until_id = None
+        start_ts, end_ts = to_timestamp(start), to_timestamp(end)
+        if start_ts is not None:
+            position = bisect_left(timestamps, start_ts)
+            since_id = ids[position - 1] if position > 0 else 0
+        if end_ts is not None:
+            # Discarded ids are older than every indexed one
+            position = bisect_right(timestamps, end_ts)
+            until_id = ids[position - 1] if position > 0 else floor
+        return since_id, until_id
+
+    def _vendor_postings(self, query: TransactionQuery) -> List[array]:
+        if not query.fuzzy:
+            ids = self._vendors.get(query.vendor)
+            return [ids] if ids is not None else []
+        with self._lock:
+            vendors = list(self._vendors.items())
+        return [ids for name, ids in vendors if query.vendor_matches(name)]
+
+    def _amount_postings(self, query: TransactionQuery) -> List[array]:
+        low = _amount_bucket(query.min_amount) if query.min_amount is not None else None
+        high = _amount_bucket(query.max_amount) if query.max_amount is not None else None
+        with self._lock:
+            amounts = list(self._amounts.items())
+        return [
+            ids for bucket, ids in amounts
+            if (low is None or bucket >= low) and (high is None or bucket <= high)
+        ]
+
+    def candidates(self, query: TransactionQuery) -> Optional[Sequence[int]]:
+        """
+        Candidate ids for a query, ascending, using the most selective indexes
+
+        Returns:
+            Sorted candidate ids (a superset of the matches), or None when no
+            index applies and the caller should scan the id/time window
+        """
+        return self.lookup(query)[0]
+
+    def lookup(self, query: TransactionQuery) -> Tuple[Optional[Sequence[int]], int]:
+        """
+        Candidate ids above the floor, and the floor they were taken at
+
+        Returns:
+            (candidates, floor): candidates as for candidates(), all > floor;
+            matches with ids <= floor are not indexed
+        """
+        groups: List[List[array]] = []
+        if query.vendor:
+            groups.append(self._vendor_postings(query))
+        if query.invoice_number:
+            groups.append([self._number_postings(self._invoice_numbers, query.invoice_number)])
+        if query.po_number:
+            groups.append([self._number_postings(self._po_numbers, query.po_number)])
+        if query.min_amount is not None or query.max_amount is not None:
+            groups.append(self._amount_postings(query))
+        if query.matched is not None:
+            groups.append([self._status[query.matched]])
+
+        if not groups:
+            return None, self.floor
+
+        # Intersect starting from the smallest group, probing the rest with sets
+        groups.sort(key=lambda postings: sum(len(ids) for ids in postings))
+        candidates = _union(groups[0])
+        for postings in groups[1:]:
+            if not candidates:
+                break
+            if sum(len(ids) for ids in postings) > 64 * len(candidates):
+                # Much larger than the candidate set: leave it to the final predicate
+                continue
+            members = set(_union(postings))
+            candidates = [transaction_id for transaction_id in candidates if transaction_id in members]
+
+        since_id, until_id = self.id_window(query.start, query.end)
+        # Read after the postings: ids discarded meanwhile are left to the caller, not returned twice
+        floor = self.floor
+        since_id = max(since_id or 0, query.after_id or 0, floor)
+        candidates = candidates[bisect_right(candidates, since_id):]
+        if until_id is not None:
+            candidates = candidates[:bisect_right(candidates, until_id)]
+        return candidates, floor
+
+
+def _union(postings: Iterable[array]) -> Sequence[int]:
+    postings = [ids for ids in postings if len(ids)]
+    if len(postings) == 1:
+        return postings[0]
+    return sorted(set().union(*postings))
+
+
+def query_limit(limit: Optional[int]) -> int:
+    """Clamp a requested page size to settings.QUERY_MAX_LIMIT"""
+    if not limit or limit <= 0:
+        return settings.QUERY_DEFAULT_LIMIT
+    return min(limit, settings.QUERY_MAX_LIMIT)
@@ -0,0 +1,343 @@
+"""
+Record Types
+Compact, typed records for extraction results and stored transactions
+"""
+
+import sys
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+# Date formats accepted from OCR output, tried in order
+DATE_FORMATS = [
+    '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d', '%m/%d/%Y',
+    '%d.%m.%Y', '%d %B %Y', '%d %b %Y', '%B %d, %Y', '%b %d, %Y',
+]
+
+# Rendering used for dates in API responses and exports
+DISPLAY_DATE_FORMAT = '%d/%m/%Y'
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# OCR text characters rendered in API responses (the full text is stored, see text_store.py)
+RAW_TEXT_PREVIEW_CHARS = 500
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class Status(str, Enum):
+    """
+    Outcome of an invoice/PO comparison
+
+    A str subclass, so it serializes as (and compares equal to) the display
+    text the API has always returned.
+    """
+
+    MATCHED = "MATCHED ✅"
+    MISMATCH = "MISMATCH ⚠️"
+
+    def __str__(self) -> str:
+        return self.value
+
+    @property
+    def matched(self) -> bool:
+        return self is Status.MATCHED
+
+    @classmethod
+    def parse(cls, value: Any) -> "Status":
+        """Accept a Status, its display text, or a bare "matched"/"mismatch" name"""
+        if isinstance(value, cls):
+            return value
+        text = str(value or "").upper()
+        return cls.MISMATCH if "MISMATCH" in text or "MATCHED" not in text else cls.MATCHED
+
+
+def parse_date(date_str: Optional[str]) -> Optional[datetime]:
+    """
+    Parse a date string using the first matching format in DATE_FORMATS
+
+    Args:
+        date_str: Date string as extracted from a document
+
+    Returns:
+        Parsed datetime, or None if no format matches
+    """
+    if not date_str:
+        return None
+    date_str = date_str.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+class DocumentDate(date):
+    """
+    A parsed date that keeps the text it was written as
+
+    Only dates written other than in DISPLAY_DATE_FORMAT ("January 5, 2024")
+    need one; they are rendered back as written. Other dates stay plain
+    date objects.
+    """
+
+    __slots__ = ("text",)
+
+    def __new__(cls, year: int, month: Optional[int] = None, day: Optional[int] = None,
+                text: Optional[str] = None):
+        self = super().__new__(cls, year, month, day)
+        self.text = text
+        return self
+
+    def __reduce__(self):
+        return type(self), (self.year, self.month, self.day, self.text)
+
+
+def to_date(value: Any) -> Optional[date]:
+    """Coerce a date, datetime or date string to a date (None if it does not parse)"""
+    if value is None or isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    parsed = parse_date(value) if isinstance(value, str) else None
+    if parsed is None:
+        return None
+    text = value.strip()
+    if text == parsed.strftime(DISPLAY_DATE_FORMAT):
+        return parsed.date()
+    return DocumentDate(parsed.year, parsed.month, parsed.day, text)
+
+
+def to_document_date(value: Any) -> Union[date, str, None]:
+    """
+    Coerce a document date for storage on a record
+
+    Returns:
+        The parsed date (rendered back as written), or the text itself when
+        it matches none of DATE_FORMATS, so it is still shown and can still
+        be compared as written
+    """
+    parsed = to_date(value)
+    if parsed is None and isinstance(value, str) and value.strip():
+        return value.strip()
+    return parsed
+
+
+def date_value(value: Any) -> Optional[date]:
+    """A record's date field if it is a parsed date (None for missing or unparsed text)"""
+    return value if isinstance(value, date) else None
+
+
+def to_amount(value: Any) -> Optional[float]:
+    """Coerce a number or numeric string (commas allowed) to a float"""
+    if value is None or isinstance(value, float):
+        return value
+    try:
+        return float(value.replace(",", "") if isinstance(value, str) else value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_timestamp(value: Any) -> Optional[int]:
+    """Coerce a "YYYY-MM-DD HH:MM:SS" string or datetime to whole seconds since the epoch"""
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            # fromisoformat parses TIMESTAMP_FORMAT far faster than strptime
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return int((value - _EPOCH).total_seconds())
+
+
+def format_date(value: Union[date, str, None]) -> Optional[str]:
+    """Render a date field as written (DISPLAY_DATE_FORMAT for dates not given as text)"""
+    if value is None or isinstance(value, str):
+        return value
+    return getattr(value, "text", None) or value.strftime(DISPLAY_DATE_FORMAT)
+
+
+def format_timestamp(seconds: Optional[int]) -> Optional[str]:
+    return (_EPOCH + timedelta(seconds=seconds)).strftime(TIMESTAMP_FORMAT) if seconds is not None else None
+
+
+def _preview_text(text: str) -> str:
+    # Responses carry the start of the OCR text; the full text stays on the record
+    if len(text) > RAW_TEXT_PREVIEW_CHARS:
+        return text[:RAW_TEXT_PREVIEW_CHARS] + "..."
+    return text
+
+
+def _intern(value: Any) -> Optional[str]:
+    # Vendor names repeat across thousands of records; share one copy each
+    return sys.intern(value) if isinstance(value, str) else None
+
+
+class _Record:
+    """
+    Shared behaviour for slotted records
+
+    Attributes hold typed values; get()/[]/to_dict() return the JSON form
+    (dates and timestamps rendered as strings), so records can be used
+    anywhere a transaction dict was used before.
+    """
+
+    __slots__ = ()
+
+    # Field name -> function rendering the typed value for JSON
+    _renderers: Dict[str, Any] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        value = getattr(self, key)
+        render = self._renderers.get(key)
+        return render(value) if render is not None and value is not None else value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: self[name] for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class LineItem(_Record):
+    """One line of an invoice or PO table"""
+
+    __slots__ = ("description", "quantity", "unit_price", "amount")
+
+    def __init__(self, description: Optional[str] = None, quantity: Any = None,
+                 unit_price: Any = None, amount: Any = None):
+        self.description = description
+        self.quantity = to_amount(quantity)
+        self.unit_price = to_amount(unit_price)
+        self.amount = to_amount(amount)
+        # Tables often omit the line total; derive it when both factors are known
+        if self.amount is None and self.quantity is not None and self.unit_price is not None:
+            self.amount = round(self.quantity * self.unit_price, 2)
+
+    @classmethod
+    def coerce(cls, data: Union["LineItem", Dict[str, Any]]) -> "LineItem":
+        """Accept a LineItem or a line item dict"""
+        if isinstance(data, cls):
+            return data
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+
+def _render_line_items(items: List[LineItem]) -> List[Dict[str, Any]]:
+    return [item.to_dict() for item in items]
+
+
+class ExtractionResult(_Record):
+    """Fields extracted from one invoice or PO document"""
+
+    __slots__ = ("vendor", "invoice_no", "po_no", "date", "total", "line_items", "raw_text", "confidence", "error",
+                 "ocr_engine")
+
+    _renderers = {"date": format_date, "line_items": _render_line_items, "raw_text": _preview_text}
+
+    def __init__(self, vendor: Optional[str] = None, invoice_no: Optional[str] = None,
+                 po_no: Optional[str] = None, date: Any = None, total: Any = None,
+                 line_items: Optional[Sequence[Any]] = None,
+                 raw_text: str = "", confidence: float = 0, error: Optional[str] = None,
+                 ocr_engine: str = "Shivaay AI"):
+        self.vendor = _intern(vendor)
+        self.invoice_no = invoice_no
+        self.po_no = po_no
+        self.date = to_document_date(date)
+        self.total = to_amount(total)
+        self.line_items = [LineItem.coerce(item) for item in line_items] if line_items else []
+        self.raw_text = raw_text
+        self.confidence = confidence
+        self.error = error
+        self.ocr_engine = ocr_engine
+
+    @classmethod
+    def coerce(cls, data: Union["ExtractionResult", Dict[str, Any]]) -> "ExtractionResult":
+        """Accept an ExtractionResult or a legacy extraction dict"""
+        if isinstance(data, cls):
+            return data
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """API representation (omits `error` when extraction succeeded)"""
+        result = super().to_dict()
+        if self.error is None:
+            del result["error"]
+            result["extracted_fields"] = {
+                "vendor": self.vendor is not None,
+                "total": self.total is not None,
+                "date": self.date is not None,
+                "number": self.invoice_no is not None or self.po_no is not None,
+            }
+        return result
+
+
+# Details stored for every matched pair; shared instead of copied per record
+MATCHED_DETAILS = {
+    "message": "All fields matched successfully",
+    "vendor_match": True,
+    "amount_match": True,
+    "date_match": True,
+}
+
+
+class TransactionRecord(_Record):
+    """One stored invoice/PO comparison"""
+
+    __slots__ = (
+        "id", "invoice_vendor", "po_vendor", "invoice_total", "po_total",
+        "invoice_date", "po_date", "invoice_number", "po_number",
+        "status", "timestamp", "details", "vendor_id",
+    )
+
+    _renderers = {
+        "invoice_date": format_date,
+        "po_date": format_date,
+        "timestamp": format_timestamp,
+    }
+
+    def __init__(self, id: Optional[int] = None, invoice_vendor: Optional[str] = None,
+                 po_vendor: Optional[str] = None, invoice_total: Any = None, po_total: Any = None,
+                 invoice_date: Any = None, po_date: Any = None, invoice_number: Optional[str] = None,
+                 po_number: Optional[str] = None, status: Any = None, timestamp: Any = None,
+                 details: Optional[Dict[str, Any]] = None, vendor_id: Optional[str] = None):
+        self.id = id
+        self.invoice_vendor = _intern(invoice_vendor)
+        self.po_vendor = _intern(po_vendor)
+        self.invoice_total = to_amount(invoice_total)
+        self.po_total = to_amount(po_total)
+        self.invoice_date = to_document_date(invoice_date)
+        self.po_date = to_document_date(po_date)
+        self.invoice_number = invoice_number
+        self.po_number = po_number
+        self.status = Status.parse(status)
+        self.timestamp = to_timestamp(timestamp)
+        self.details = MATCHED_DETAILS if details == MATCHED_DETAILS else (details or {})
+        self.vendor_id = _intern(vendor_id)  # canonical vendor from the registry, if resolved
+
+    @property
+    def matched(self) -> bool:
+        return self.status is Status.MATCHED
+
+    @classmethod
+    def from_dict(cls, transaction: Union["TransactionRecord", Dict[str, Any]], **overrides) -> "TransactionRecord":
+        """Build a record from a transaction dict (unknown keys are ignored)"""
+        if isinstance(transaction, cls) and not overrides:
+            return transaction
+        values = {name: transaction.get(name) for name in cls.__slots__}
+        values.update(overrides)
+        return cls(**values)
+
+
+def normalize_transaction(transaction: Dict[str, Any]) -> Dict[str, Any]:
+    """Canonical JSON form of a transaction (typed parsing, then rendering)"""
+    return TransactionRecord.from_dict(transaction).to_dict()
@@ -0,0 +1,198 @@
+"""
+Offline Reprocessing
+Re-run field extraction and comparison over stored OCR text, in parallel and without OCR calls
+"""
+
+import json
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.core.comparison import compare_invoice_po
+from src.core.config import settings
+from src.core.records import Status, TransactionRecord, format_date, to_amount, to_document_date
+from src.core.text_store import RawTextStore, decompress_text
+from src.services.ocr_service import extract_fields
+
+logger = logging.getLogger(__name__)
+
+# Transaction field -> (document, extraction attribute)
+FIELDS = (
+    ("invoice_vendor", "invoice", "vendor"),
+    ("invoice_number", "invoice", "invoice_no"),
+    ("invoice_date", "invoice", "date"),
+    ("invoice_total", "invoice", "total"),
+    ("po_vendor", "po", "vendor"),
+    ("po_number", "po", "po_no"),
+    ("po_date", "po", "date"),
+    ("po_total", "po", "total"),
+)
+
+# One transaction handed to a worker:
+# (id, invoice payload, PO payload, policy, stored field values, stored as matched)
+WorkItem = Tuple[int, bytes, bytes, Any, Tuple[Any, ...], bool]
+
+
+def _stored_values(transaction: Any) -> Tuple[Tuple[Any, ...], bool]:
+    """Typed values of FIELDS as stored, and whether the transaction was matched"""
+    if isinstance(transaction, TransactionRecord):
+        return tuple(getattr(transaction, name) for name, _, _ in FIELDS), transaction.matched
+    values = []
+    for name, _, attribute in FIELDS:
+        value = transaction.get(name)
+        values.append(to_document_date(value) if attribute == "date" else to_amount(value) if attribute == "total"
+                      else value)
+    return tuple(values), Status.parse(transaction.get("status")).matched
+
+
+def _render(value: Any) -> Any:
+    return format_date(value) if isinstance(value, date) else value
+
+
+def reprocess_chunk(chunk: List[WorkItem]) -> List[Tuple[int, bool, bool, Dict[str, Dict[str, Any]]]]:
+    """
+    Re-extract and re-compare a chunk of transactions (runs in a worker process)
+
+    Returns:
+        One (id, stored matched, reprocessed matched, changed fields) per item;
+        changed fields map a transaction field to its stored and new value
+    """
+    results = []
+    for transaction_id, invoice_payload, po_payload, policy, stored, stored_matched in chunk:
+        documents = {
+            "invoice": extract_fields(decompress_text(invoice_payload)),
+            "po": extract_fields(decompress_text(po_payload)),
+        }
+        comparison = compare_invoice_po(documents["invoice"], documents["po"], policy)
+        changes = {}
+        for (name, document, attribute), old in zip(FIELDS, stored):
+            new = getattr(documents[document], attribute)
+            if new != old:
+                changes[name] = {"stored": _render(old), "reprocessed": _render(new)}
+        results.append((transaction_id, stored_matched, Status.parse(comparison["status"]).matched, changes))
+    return results
+
+
+def _run_chunks(chunks: Iterable[List[WorkItem]], workers: int) -> Iterator[List[tuple]]:
+    """Results of reprocess_chunk per chunk, in order; at most two chunks per worker in flight"""
+    if workers <= 1:
+        yield from map(reprocess_chunk, chunks)
+        return
+    # spawn: forking a threaded server process can deadlock the children
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(reprocess_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def reprocess(storage, text_store: RawTextStore, policy_for: Optional[Callable[..., Any]] = None,
+              workers: Optional[int] = None, after_id: int = 0, until_id: Optional[int] = None,
+              sample: Optional[int] = None, output: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Re-run the field extractors and compare_invoice_po over stored OCR text
+
+    Each stored transaction with both texts is re-extracted from its text
+    and compared again under its vendor's current policy; stored
+    transactions are not modified. The work is split into chunks of
+    REPROCESS_CHUNK transactions over `workers` processes, fed with the
+    still-compressed texts while storage and the text store are read in
+    id order.
+
+    Args:
+        storage: Transaction storage backend
+        text_store: Store holding the OCR text of each transaction
+        policy_for: policy_for(vendor_id, vendor) -> ComparisonPolicy (default policy if None)
+        workers: Worker processes (default REPROCESS_WORKERS; 1 runs in this process)
+        after_id: Only transactions with a larger id
+        until_id: Only transactions up to this id
+        sample: Changed transactions to include in the summary (default REPROCESS_SAMPLE)
+        output: Optional path of a JSON-lines file receiving every changed transaction
+
+    Returns:
+        Summary: counts, status matrix (stored -> reprocessed), changes per
+        field and a sample of changed transactions
+    """
+    workers = max(1, settings.REPROCESS_WORKERS if workers is None else workers)
+    sample = settings.REPROCESS_SAMPLE if sample is None else max(0, sample)
+    started = time.perf_counter()
+    counts = {"processed": 0, "missing_text": 0}
+
+    def work_items() -> Iterator[WorkItem]:
+        texts = text_store.iter_compressed(after_id, until_id)
+        current = next(texts, None)
+        for transaction in storage.iter_filtered(since_id=after_id, until_id=until_id):
+            transaction_id = transaction.get("id")
+            while current is not None and current[0] < transaction_id:
+                current = next(texts, None)
+            if current is None or current[0] != transaction_id or current[1] is None or current[2] is None:
+                counts["missing_text"] += 1
+                continue
+            stored, matched = _stored_values(transaction)
+            policy = None
+            if policy_for is not None:
+                policy = policy_for(transaction.get("vendor_id"),
+                                    transaction.get("invoice_vendor") or transaction.get("po_vendor"))
+            yield transaction_id, current[1], current[2], policy, stored, matched
+
+    def chunks() -> Iterator[List[WorkItem]]:
+        chunk = []
+        for item in work_items():
+            chunk.append(item)
+            if len(chunk) >= settings.REPROCESS_CHUNK:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    matrix = {"matched": {"matched": 0, "mismatch": 0}, "mismatch": {"matched": 0, "mismatch": 0}}
+    field_changes = {name: 0 for name, _, _ in FIELDS}
+    changed: List[Dict[str, Any]] = []
+    changed_count = 0
+    report = open(output, "w", encoding="utf-8") if output else None
+    try:
+        for results in _run_chunks(chunks(), workers):
+            for transaction_id, stored_matched, matched, changes in results:
+                counts["processed"] += 1
+                matrix["matched" if stored_matched else "mismatch"]["matched" if matched else "mismatch"] += 1
+                if not changes and matched == stored_matched:
+                    continue
+                changed_count += 1
+                for name in changes:
+                    field_changes[name] += 1
+                entry = {
+                    "transaction_id": transaction_id,
+                    "status": {"stored": "matched" if stored_matched else "mismatch",
+                               "reprocessed": "matched" if matched else "mismatch"},
+                    "fields": changes,
+                }
+                if len(changed) < sample:
+                    changed.append(entry)
+                if report is not None:
+                    report.write(json.dumps(entry, default=str) + "\n")
+    finally:
+        if report is not None:
+            report.close()
+
+    seconds = time.perf_counter() - started
+    logger.info("Reprocessing complete", extra={
+        "processed": counts["processed"], "changed": changed_count, "seconds": round(seconds, 2),
+    })
+    return {
+        "processed": counts["processed"],
+        "missing_text": counts["missing_text"],
+        "changed": changed_count,
+        "status_matrix": matrix,
+        "flipped": matrix["matched"]["mismatch"] + matrix["mismatch"]["matched"],
+        "field_changes": {name: count for name, count in field_changes.items() if count},
+        "sample": changed,
+        "workers": workers,
+        "seconds": round(seconds, 3),
+    }
@@ -0,0 +1,142 @@
+"""
+Throughput Rollups
+Per-minute and per-hour counters in fixed-size ring buffers, updated on insert
+"""
+
+import threading
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from src.core.records import format_timestamp, to_timestamp
+
+# Supported resolutions: name -> bucket width in seconds
+RESOLUTIONS = {"minute": 60, "hour": 3600}
+
+
+class RollupRing:
+    """
+    Fixed number of consecutive time buckets, reused in a circle
+
+    Slot `(timestamp // width) % slots` holds the bucket that timestamp falls
+    in. Each slot remembers which bucket it holds, so a slot left over from a
+    previous lap is reset when a newer bucket claims it. Memory is allocated
+    once and never grows.
+    """
+
+    def __init__(self, width: int, slots: int):
+        self.width = width
+        self.slots = slots
+        self.start = array("q", [-1]) * slots  # bucket start (epoch seconds) held by each slot
+        self.processed = array("q", [0]) * slots
+        self.matched = array("q", [0]) * slots
+        self.timed = array("q", [0]) * slots  # transactions that reported a latency
+        self.latency_sum = array("d", [0.0]) * slots
+        self.latency_max = array("d", [0.0]) * slots
+        self.newest = -1
+
+    def add(self, timestamp: int, matched: bool, latency: Optional[float]) -> None:
+        bucket = timestamp - timestamp % self.width
+        if bucket <= self.newest - self.slots * self.width:
+            return  # older than the retained window
+        slot = (bucket // self.width) % self.slots
+        if self.start[slot] != bucket:
+            if self.start[slot] > bucket:
+                return  # slot already reused by a newer bucket
+            self.start[slot] = bucket
+            self.processed[slot] = self.matched[slot] = self.timed[slot] = 0
+            self.latency_sum[slot] = self.latency_max[slot] = 0.0
+        self.newest = max(self.newest, bucket)
+
+        self.processed[slot] += 1
+        self.matched[slot] += matched
+        if latency is not None:
+            self.timed[slot] += 1
+            self.latency_sum[slot] += latency
+            self.latency_max[slot] = max(self.latency_max[slot], latency)
+
+    def series(self, until: int, buckets: int) -> List[Dict[str, Any]]:
+        """
+        The `buckets` consecutive buckets ending with the one containing `until`
+
+        Buckets without transactions are included (zeroed), so charts get an
+        evenly spaced series.
+        """
+        buckets = max(1, min(buckets, self.slots))
+        last = until - until % self.width
+        series = []
+        for bucket in range(last - (buckets - 1) * self.width, last + self.width, self.width):
+            slot = (bucket // self.width) % self.slots
+            if self.start[slot] == bucket:
+                processed, matched, timed = self.processed[slot], self.matched[slot], self.timed[slot]
+                latency_sum, latency_max = self.latency_sum[slot], self.latency_max[slot]
+            else:
+                processed = matched = timed = 0
+                latency_sum = latency_max = 0.0
+            series.append({
+                "start": format_timestamp(bucket),
+                "processed": processed,
+                "matched": matched,
+                "match_rate": f"{(matched / processed * 100):.2f}%" if processed else "0%",
+                "avg_latency_ms": round(latency_sum / timed * 1000, 2) if timed else None,
+                "max_latency_ms": round(latency_max * 1000, 2) if timed else None,
+            })
+        return series
+
+
+class ThroughputRollups:
+    """
+    One RollupRing per resolution, updated together under one lock
+
+    Buckets are keyed by the transaction's processing timestamp (the same
+    clock as the stored `timestamp` field).
+    """
+
+    def __init__(self, minute_slots: int, hour_slots: int):
+        self._slots = {"minute": minute_slots, "hour": hour_slots}
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.rings = {
+                name: RollupRing(width, self._slots[name]) for name, width in RESOLUTIONS.items()
+            }
+
+    def add(self, timestamp: Optional[int], matched: bool, latency: Optional[float] = None) -> None:
+        """
+        Count one processed transaction
+
+        Args:
+            timestamp: Processing time in epoch seconds (None = now)
+            matched: Whether the pair matched
+            latency: Processing latency in seconds, if known
+        """
+        if timestamp is None:
+            timestamp = _now()
+        with self._lock:
+            for ring in self.rings.values():
+                ring.add(timestamp, matched, latency)
+
+    def series(self, resolution: str, buckets: int) -> Dict[str, Any]:
+        """
+        Most recent buckets of one resolution, ending at the current time
+
+        Raises:
+            ValueError: If the resolution is unknown
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution '{resolution}' (use {', '.join(RESOLUTIONS)})")
+        with self._lock:
+            ring = self.rings[resolution]
+            return {
+                "resolution": resolution,
+                "bucket_seconds": ring.width,
+                "retained_buckets": ring.slots,
+                "buckets": ring.series(max(_now(), ring.newest), buckets),
+            }
+
+
+def _now() -> int:
+    # Stored timestamps are naive local time, so "now" is taken the same way
+    return to_timestamp(datetime.now())
@@ -0,0 +1,313 @@
+"""
+Comparison Rules
+Per-vendor comparison policies compiled from a declarative rules file
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from src.core.config import settings
+from src.core.similarity import SCORERS
+from src.core.vendor_registry import canonical_vendor_key
+
+logger = logging.getLogger(__name__)
+
+# Default mismatch reasons (str.format templates, see ComparisonPolicy)
+VENDOR_REASON = "Vendor names do not match (fuzzy match < {threshold:g}%)"
+AMOUNT_PERCENT_REASON = "Amount difference exceeds tolerance (diff: {difference_percent:.2f}%)"
+AMOUNT_ABSOLUTE_REASON = "Amount difference exceeds tolerance (diff: {difference:.2f}, allowed: {tolerance:g})"
+DATE_REASON = "Dates do not match (diff: {difference_days} days)"
+
+# Comparators per field and the values they take
+COMPARATORS = {
+    "vendor": set(SCORERS),  # similarity scorer; tolerance = minimum score
+    "amount": {"percent", "absolute"},  # tolerance = % of the average amount, or currency units
+    "date": {"days"},  # tolerance = days
+}
+
+# Sample values used to check reason templates when rules are compiled
+_TEMPLATE_FIELDS = {
+    "invoice": "INV", "po": "PO", "threshold": 85, "tolerance": 1.0,
+    "difference": 1.0, "difference_percent": 1.0, "difference_days": 1,
+}
+
+
+class ComparisonPolicy(NamedTuple):
+    """Tolerances and reason templates applied to one invoice/PO comparison"""
+
+    vendor_scorer: str
+    vendor_threshold: float
+    amount_comparator: str  # "percent" or "absolute"
+    amount_tolerance: float
+    date_tolerance_days: int
+    vendor_reason: str = VENDOR_REASON
+    amount_reason: str = AMOUNT_PERCENT_REASON
+    date_reason: str = DATE_REASON
+    source: str = "default"  # which rules produced it, e.g. "group:logistics, vendor:V-00042"
+
+
+def default_policy() -> ComparisonPolicy:
+    """The global tolerances from settings"""
+    return ComparisonPolicy(
+        vendor_scorer=settings.VENDOR_SCORER,
+        vendor_threshold=settings.VENDOR_FUZZY_THRESHOLD,
+        amount_comparator="percent",
+        amount_tolerance=settings.AMOUNT_TOLERANCE_PERCENT,
+        date_tolerance_days=settings.DATE_TOLERANCE_DAYS,
+    )
+
+
+def _vendor_key(vendor_id: Optional[str], vendor: Optional[str]) -> Optional[str]:
+    if vendor_id:
+        return f"id:{vendor_id}"
+    key = canonical_vendor_key(vendor)
+    return f"name:{key}" if key else None
+
+
+def _member_keys(member: str) -> List[str]:
+    """Rules name vendors by registry id ("V-00042") or by name ("ABC Pvt Ltd"); a member matches either"""
+    keys = [_vendor_key(member.strip(), None)] if member and member.strip() else []
+    name_key = _vendor_key(None, member)
+    return keys + [name_key] if name_key else keys
+
+
+def _apply(policy: ComparisonPolicy, rule: Dict[str, Any], label: str) -> ComparisonPolicy:
+    """Policy with one rule's field settings applied"""
+    field = rule["field"]
+    comparator = rule.get("comparator")
+    tolerance = rule["tolerance"]
+    reason = rule.get("reason")
+    if field == "vendor":
+        changes = {"vendor_scorer": comparator or policy.vendor_scorer, "vendor_threshold": tolerance}
+        if reason:
+            changes["vendor_reason"] = reason
+    elif field == "amount":
+        comparator = comparator or "percent"
+        changes = {
+            "amount_comparator": comparator, "amount_tolerance": tolerance,
+            "amount_reason": reason or (AMOUNT_PERCENT_REASON if comparator == "percent" else AMOUNT_ABSOLUTE_REASON),
+        }
+    else:
+        changes = {"date_tolerance_days": int(tolerance)}
+        if reason:
+            changes["date_reason"] = reason
+    if policy.source == "default":
+        source = label
+    elif label in policy.source.split(", "):
+        source = policy.source  # several rules from the same level
+    else:
+        source = f"{policy.source}, {label}"
+    return policy._replace(source=source, **changes)
+
+
+def _check_members(members: Any, where: str) -> None:
+    """Raise ValueError unless members is a list of vendor ids or names"""
+    if not isinstance(members, list):
+        raise ValueError(f"{where} must be a list of vendor ids or names")
+    for member in members:
+        if not isinstance(member, str):
+            raise ValueError(f"{where} must be a list of vendor ids or names, got {member!r}")
+
+
+def _validate(rule: Dict[str, Any], groups: Dict[str, List[str]], number: int) -> None:
+    """Raise ValueError describing the first problem with a rule"""
+    where = f"rule {number}"
+    if not isinstance(rule, dict):
+        raise ValueError(f"{where}: expected an object")
+    targets = [key for key in ("vendor", "vendors", "group") if key in rule]
+    if len(targets) > 1:
+        raise ValueError(f"{where}: give only one of vendor, vendors or group")
+    if "vendor" in rule and not isinstance(rule["vendor"], str):
+        raise ValueError(f"{where}: vendor must be a string (use vendors for a list)")
+    if "vendors" in rule:
+        _check_members(rule["vendors"], f"{where}: vendors")
+    if "group" in rule and rule["group"] not in groups:
+        raise ValueError(f"{where}: unknown group {rule['group']!r}")
+    field = rule.get("field")
+    if field not in COMPARATORS:
+        raise ValueError(f"{where}: field must be one of {', '.join(COMPARATORS)}")
+    comparator = rule.get("comparator")
+    if comparator is not None and comparator not in COMPARATORS[field]:
+        raise ValueError(f"{where}: {field} comparator must be one of {', '.join(sorted(COMPARATORS[field]))}")
+    tolerance = rule.get("tolerance")
+    if isinstance(tolerance, bool) or not isinstance(tolerance, (int, float)) or tolerance < 0:
+        raise ValueError(f"{where}: tolerance must be a non-negative number")
+    reason = rule.get("reason")
+    if reason is not None:
+        try:
+            str(reason).format(**_TEMPLATE_FIELDS)
+        except (KeyError, IndexError, ValueError) as e:
+            raise ValueError(f"{where}: bad reason template ({e})") from None
+
+
+class CompiledRules(NamedTuple):
+    """Dispatch table built from one version of the rules file"""
+
+    default: ComparisonPolicy
+    table: Dict[str, ComparisonPolicy]  # vendor key -> policy
+    rules: int
+    groups: int
+    loaded_at: Optional[float]
+
+
+def compile_rules(document: Dict[str, Any], loaded_at: Optional[float] = None) -> CompiledRules:
+    """
+    Compile a rules document into a vendor -> policy dispatch table
+
+    Rules without a target change the default for every vendor; group rules
+    apply to each member, then vendor rules on top (later rules win within
+    a level). Every vendor a rule mentions gets one precomputed policy, so a
+    comparison costs one dict lookup however many rules there are.
+
+    Args:
+        document: Parsed rules file ({"groups": {...}, "rules": [...]})
+        loaded_at: File modification time, for reporting
+
+    Returns:
+        CompiledRules
+
+    Raises:
+        ValueError: If a rule is invalid
+    """
+    groups = document.get("groups") or {}
+    rules = document.get("rules") or []
+    if not isinstance(groups, dict) or not isinstance(rules, list):
+        raise ValueError('expected {"groups": {name: [vendors]}, "rules": [...]}')
+    for name, members in groups.items():
+        _check_members(members, f"group {name!r}")
+    for number, rule in enumerate(rules, 1):
+        _validate(rule, groups, number)
+
+    default = default_policy()
+    for rule in rules:
+        if not any(key in rule for key in ("vendor", "vendors", "group")):
+            default = _apply(default, rule, "all vendors")
+
+    # Rules per vendor key, in precedence order: groups first, then the vendor's own
+    pending: Dict[str, List[Tuple[int, int, Dict[str, Any], str]]] = {}
+    for number, rule in enumerate(rules):
+        if "group" in rule:
+            level, members, label = 0, groups[rule["group"]], f"group:{rule['group']}"
+        else:
+            level, members = 1, rule.get("vendors") or ([rule["vendor"]] if "vendor" in rule else [])
+            label = None
+        for member in members:
+            for key in _member_keys(member):
+                pending.setdefault(key, []).append((level, number, rule, label or f"vendor:{member}"))
+
+    table: Dict[str, ComparisonPolicy] = {}
+    shared: Dict[ComparisonPolicy, ComparisonPolicy] = {}
+    for key, entries in pending.items():
+        policy = default
+        for _, _, rule, label in sorted(entries, key=lambda entry: entry[:2]):
+            policy = _apply(policy, rule, label)
+        # Vendors configured identically share one policy object
+        table[key] = shared.setdefault(policy, policy)
+
+    return CompiledRules(default, table, len(rules), len(groups), loaded_at)
+
+
+class ComparisonRules:
+    """
+    Comparison policies per vendor, read from a JSON rules file
+
+    Example file:
+
+        {
+          "groups": {"logistics": ["V-00042", "Mahindra Logistics"]},
+          "rules": [
+            {"group": "logistics", "field": "date", "tolerance": 10},
+            {"vendor": "V-00042", "field": "amount", "comparator": "absolute", "tolerance": 500},
+            {"field": "vendor", "comparator": "token_set", "tolerance": 80}
+          ]
+        }
+
+    Vendors are named by registry id or by name (matched after
+    canonical_vendor_key normalization). The file is compiled on first use
+    and recompiled when its modification time changes (checked at most every
+    COMPARISON_RULES_CHECK_SECONDS). A file that fails to parse or validate
+    is logged and the previous rules stay in force.
+    """
+
+    def __init__(self, path: Optional[str] = None, check_interval: float = None):
+        self.path = path
+        self.check_interval = settings.COMPARISON_RULES_CHECK_SECONDS if check_interval is None else check_interval
+        self._lock = threading.Lock()
+        self._compiled: Optional[CompiledRules] = None
+        self._stamp: Optional[Tuple[int, int]] = None  # (mtime_ns, size) of the compiled file
+        self._checked = 0.0
+        self.last_error: Optional[str] = None
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except (OSError, TypeError):
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, stamp: Optional[Tuple[int, int]]) -> None:
+        if stamp is None:
+            if self._compiled is None or self._stamp is not None:
+                logger.info("No comparison rules at %s; global tolerances apply", self.path)
+            self._compiled = compile_rules({})
+            self._stamp = None
+            self.last_error = None
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                compiled = compile_rules(json.load(f), loaded_at=stamp[0] / 1e9)
+        except (OSError, ValueError) as e:  # json.JSONDecodeError is a ValueError
+            self.last_error = str(e)
+            self._stamp = stamp  # don't retry until the file changes again
+            logger.error("Comparison rules not reloaded, keeping previous version: %s", e)
+            if self._compiled is None:
+                self._compiled = compile_rules({})
+            return
+        self._compiled = compiled
+        self._stamp = stamp
+        self.last_error = None
+        logger.info("Comparison rules loaded", extra={"rules": compiled.rules, "vendors": len(compiled.table)})
+
+    def compiled(self) -> CompiledRules:
+        """Current dispatch table, reloading first if the file changed"""
+        now = time.monotonic()
+        if self._compiled is None or now - self._checked >= self.check_interval:
+            with self._lock:
+                if self._compiled is None or now - self._checked >= self.check_interval:
+                    stamp = self._file_stamp()
+                    if self._compiled is None or stamp != self._stamp:
+                        self._load(stamp)
+                    self._checked = now
+        return self._compiled
+
+    def reload(self) -> CompiledRules:
+        """Recompile now regardless of the check interval"""
+        with self._lock:
+            self._load(self._file_stamp())
+            self._checked = time.monotonic()
+        return self._compiled
+
+    def policy_for(self, vendor_id: Optional[str] = None, vendor: Optional[str] = None) -> ComparisonPolicy:
+        """
+        Policy for a vendor
+
+        Args:
+            vendor_id: Canonical vendor id, if resolved
+            vendor: Vendor name as extracted (used when no id rule applies)
+
+        Returns:
+            The vendor's compiled policy, or the default policy
+        """
+        compiled = self.compiled()
+        if not compiled.table:
+            return compiled.default
+        if vendor_id:
+            policy = compiled.table.get(f"id:{vendor_id}")
+            if policy is not None:
+                return policy
+        key = _vendor_key(None, vendor)
+        return compiled.table.get(key, compiled.default) if key else compiled.default
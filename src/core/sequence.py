@@ -0,0 +1,77 @@
+"""
+Id Sequence
+Thread-safe, monotonic transaction ids that persist across restarts
+"""
+
+import logging
+import os
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Serializes block reservations between sequences sharing a state file
+_RESERVE_LOCK = threading.Lock()
+
+
+class IdSequence:
+    """
+    Hands out strictly increasing ids, reserving them from disk in blocks
+
+    Only the end of the reserved block is persisted, once per `block` ids,
+    so issuing an id is an in-memory increment under a lock. After a restart
+    numbering resumes past the last reserved block: ids left unused by the
+    previous process become a gap, never a duplicate.
+    """
+
+    def __init__(self, path: Optional[str] = None, block: int = 1000, start: int = 1):
+        """
+        Args:
+            path: File holding the reserved ceiling (None = in-memory only)
+            block: Ids reserved per disk write
+            start: First id when no state exists yet
+        """
+        self.path = path
+        self.block = max(1, block)
+        self._lock = threading.Lock()
+        self._next = start
+        self._ceiling = start - 1  # last id reserved for this process
+
+    def _read_ceiling(self) -> int:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+        except ValueError:
+            logger.warning("Ignoring unreadable id sequence state in %s", self.path)
+            return 0
+
+    def _reserve(self) -> None:
+        if self.path is None:
+            self._ceiling += self.block
+            return
+        with _RESERVE_LOCK:
+            # Re-read the file: another sequence (or an earlier run) may own higher ids
+            self._next = max(self._next, self._read_ceiling() + 1)
+            ceiling = self._next + self.block - 1
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(str(ceiling))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._ceiling = ceiling
+
+    def next(self) -> int:
+        """Issue the next id"""
+        with self._lock:
+            if self._next > self._ceiling:
+                self._reserve()
+            value = self._next
+            self._next += 1
+            return value
@@ -0,0 +1,215 @@
+"""
+Spill Tier
+Compressed on-disk segments holding transactions evicted from memory
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from src.core.query import SegmentFilter
+from src.core.records import DocumentDate, Status, TransactionRecord
+
+logger = logging.getLogger(__name__)
+
+
+SEGMENT_SUFFIX = ".jsonl.z"
+
+
+def _encode_date(value: Union[date, str, None]) -> Any:
+    # Ordinal; [ordinal, text] for a date written another way; unparsed text as is
+    if isinstance(value, DocumentDate):
+        return [value.toordinal(), value.text]
+    return value.toordinal() if isinstance(value, date) else value
+
+
+def _decode_date(value: Any) -> Union[date, str, None]:
+    if isinstance(value, list):
+        day = date.fromordinal(value[0])
+        return DocumentDate(day.year, day.month, day.day, value[1])
+    return date.fromordinal(value) if isinstance(value, int) and value else value
+
+
+def _encode(record: TransactionRecord) -> str:
+    """One record as a positional JSON array of its typed values (dates as ordinals)"""
+    return json.dumps([
+        record.id, record.invoice_vendor, record.po_vendor, record.invoice_total, record.po_total,
+        _encode_date(record.invoice_date), _encode_date(record.po_date),
+        record.invoice_number, record.po_number, int(record.matched), record.timestamp, record.details,
+        record.vendor_id,
+    ], separators=(",", ":"))
+
+
+def _decode(line: str) -> TransactionRecord:
+    (transaction_id, invoice_vendor, po_vendor, invoice_total, po_total, invoice_date, po_date,
+     invoice_number, po_number, matched, timestamp, details, vendor_id) = json.loads(line)
+    return TransactionRecord(
+        id=transaction_id, invoice_vendor=invoice_vendor, po_vendor=po_vendor,
+        invoice_total=invoice_total, po_total=po_total,
+        invoice_date=_decode_date(invoice_date), po_date=_decode_date(po_date),
+        invoice_number=invoice_number, po_number=po_number,
+        status=Status.MATCHED if matched else Status.MISMATCH,
+        timestamp=timestamp, details=details, vendor_id=vendor_id,
+    )
+
+
+class SpillSegment(NamedTuple):
+    """Summary of one immutable spilled segment (kept in memory)"""
+
+    path: str
+    first_id: int
+    last_id: int
+    count: int
+    matched: int
+    min_timestamp: int
+    max_timestamp: int
+    size: int
+    query_filter: SegmentFilter  # rules the segment out for most queries
+
+
+class SpillTier:
+    """
+    Append-only set of compressed segments, oldest first
+
+    Each spill writes one zlib-compressed JSON-lines file of positional
+    typed rows (no key names, no date re-parsing on read) and records its id
+    and timestamp range, so readers can skip whole segments that a delta or
+    time-window query cannot match; a SegmentFilter does the same for the
+    other query filters. Segments are never modified after
+    they are written; clear() removes all of them.
+    """
+
+    def __init__(self, directory: str, compression_level: int = 6, cached_segments: int = 4):
+        self.directory = directory
+        self.compression_level = compression_level
+        self.segments: Tuple[SpillSegment, ...] = ()
+        # Distinct normalized vendor names of all segments (replaced, not updated, on write)
+        self.vendors: FrozenSet[str] = frozenset()
+        self._sequence = 0
+
+        # Recently loaded segments for point lookups (id -> record)
+        self.cached_segments = cached_segments
+        self._cache: "OrderedDict[str, Dict[int, TransactionRecord]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def write(self, records: List[TransactionRecord]) -> SpillSegment:
+        """
+        Write records (ascending ids) to a new compressed segment
+
+        Args:
+            records: Records to spill
+
+        Returns:
+            The new segment summary (the caller publishes it)
+        """
+        lines = "\n".join(_encode(record) for record in records)
+        payload = zlib.compress(lines.encode("utf-8"), self.compression_level)
+
+        self._sequence += 1
+        path = os.path.join(self.directory, f"spill-{self._sequence:08d}{SEGMENT_SUFFIX}")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+        timestamps = [record.timestamp or 0 for record in records]
+        vendors = set(self.vendors)
+        segment = SpillSegment(
+            path=path,
+            first_id=records[0].id,
+            last_id=records[-1].id,
+            count=len(records),
+            matched=sum(record.matched for record in records),
+            min_timestamp=min(timestamps),
+            max_timestamp=max(timestamps),
+            size=len(payload),
+            query_filter=SegmentFilter(records, vendors),
+        )
+        self.vendors = frozenset(vendors)
+        logger.debug("Spilled %d transactions to %s (%d bytes)", segment.count, path, segment.size)
+        return segment
+
+    @staticmethod
+    def read(segment: SpillSegment) -> Iterator[TransactionRecord]:
+        """Decompress one segment and yield its records"""
+        try:
+            with open(segment.path, "rb") as f:
+                payload = zlib.decompress(f.read())
+        except FileNotFoundError:
+            # Segment removed by a concurrent clear()
+            return
+        for line in payload.decode("utf-8").splitlines():
+            yield _decode(line)
+
+    def load(self, segment: SpillSegment) -> Dict[int, TransactionRecord]:
+        """
+        Records of one segment by id, for point lookups (LRU-cached)
+
+        Scans use read() instead, so a full export does not evict the
+        segments that queries keep returning to.
+        """
+        with self._cache_lock:
+            records = self._cache.get(segment.path)
+            if records is not None:
+                self._cache.move_to_end(segment.path)
+                return records
+
+        records = {record.id: record for record in self.read(segment)}
+        with self._cache_lock:
+            self._cache[segment.path] = records
+            while len(self._cache) > self.cached_segments:
+                self._cache.popitem(last=False)
+        return records
+
+    def iter_records(self, segments: Iterable[SpillSegment], since_id: Optional[int] = None,
+                     start: Optional[int] = None, end: Optional[int] = None) -> Iterator[TransactionRecord]:
+        """
+        Iterate records of the given segments, skipping segments outside the id/time window
+
+        Args:
+            segments: Segment snapshot to read
+            since_id: Skip records with id <= since_id
+            start: Skip segments whose newest timestamp is before this (epoch seconds)
+            end: Skip segments whose oldest timestamp is after this (epoch seconds)
+        """
+        for segment in segments:
+            if since_id is not None and segment.last_id <= since_id:
+                continue
+            if start is not None and segment.max_timestamp < start:
+                continue
+            if end is not None and segment.min_timestamp > end:
+                continue
+            for record in self.read(segment):
+                if since_id is None or record.id > since_id:
+                    yield record
+
+    def disk_bytes(self) -> int:
+        return sum(segment.size for segment in self.segments)
+
+    def clear(self) -> None:
+        """Delete every segment (the directory itself is kept)"""
+        segments, self.segments = self.segments, ()
+        self.vendors = frozenset()
+        with self._cache_lock:
+            self._cache.clear()
+        for segment in segments:
+            try:
+                os.remove(segment.path)
+            except FileNotFoundError:
+                pass
+
+    def destroy(self) -> None:
+        """Remove the spill directory entirely"""
+        self.segments = ()
+        self.vendors = frozenset()
+        with self._cache_lock:
+            self._cache.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,390 @@
+"""
+SQLite Transaction Storage
+Durable storage backend using SQLite in WAL mode with group commit
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import Future
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from src.core.config import settings
+from src.core.query import TransactionQuery
+from src.core.records import normalize_transaction
+from src.core.storage import BaseTransactionStorage, format_statistics, is_matched_status
+
+logger = logging.getLogger(__name__)
+
+
+COLUMNS = (
+    "invoice_vendor", "po_vendor", "invoice_total", "po_total",
+    "invoice_date", "po_date", "invoice_number", "po_number",
+    "status", "timestamp", "vendor_id",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    invoice_vendor TEXT,
+    po_vendor TEXT,
+    invoice_total REAL,
+    po_total REAL,
+    invoice_date TEXT,
+    po_date TEXT,
+    invoice_number TEXT,
+    po_number TEXT,
+    status TEXT,
+    matched INTEGER NOT NULL DEFAULT 0,
+    timestamp TEXT,
+    details TEXT,
+    vendor_id TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_status ON transactions (status);
+CREATE INDEX IF NOT EXISTS idx_transactions_matched ON transactions (matched);
+CREATE INDEX IF NOT EXISTS idx_transactions_invoice_vendor ON transactions (invoice_vendor);
+CREATE INDEX IF NOT EXISTS idx_transactions_po_vendor ON transactions (po_vendor);
+DROP INDEX IF EXISTS idx_transactions_invoice_number;
+DROP INDEX IF EXISTS idx_transactions_po_number;
+CREATE INDEX IF NOT EXISTS idx_transactions_invoice_number_nocase ON transactions (invoice_number COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_transactions_po_number_nocase ON transactions (po_number COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_transactions_invoice_total ON transactions (invoice_total);
+CREATE INDEX IF NOT EXISTS idx_transactions_timestamp ON transactions (timestamp);
+"""
+
+INSERT_SQL = (
+    f"INSERT INTO transactions ({', '.join(COLUMNS)}, matched, details) "
+    f"VALUES ({', '.join('?' for _ in COLUMNS)}, ?, ?)"
+)
+SELECT_SQL = f"SELECT id, {', '.join(COLUMNS)}, details FROM transactions"
+
+# Writer queue operations
+_INSERT = "insert"
+_CLEAR = "clear"
+_STOP = "stop"
+
+
+def _to_row(transaction: Dict[str, Any]) -> Tuple:
+    transaction = normalize_transaction(transaction)
+    values = tuple(transaction.get(column) for column in COLUMNS)
+    details = json.dumps(transaction.get("details", {}), default=str)
+    return values + (int(is_matched_status(transaction.get("status"))), details)
+
+
+def _from_row(row: sqlite3.Row) -> Dict[str, Any]:
+    transaction = {column: row[column] for column in COLUMNS}
+    transaction["details"] = json.loads(row["details"]) if row["details"] else {}
+    transaction["id"] = row["id"]
+    return transaction
+
+
+class SQLiteTransactionStorage(BaseTransactionStorage):
+    """
+    SQLite-backed transaction storage
+
+    All writes go through a single writer thread that drains queued inserts
+    and commits them together (group commit), so concurrent uploads share one
+    fsync. Reads use per-thread connections; WAL mode lets them proceed while
+    the writer commits. Nothing is loaded into memory at startup.
+    """
+
+    def __init__(self, path: str = None, batch_size: int = None, batch_wait_ms: float = None):
+        """
+        Open (or create) the database and start the writer thread
+
+        Args:
+            path: Database file path (defaults to settings.SQLITE_PATH)
+            batch_size: Max inserts per commit
+            batch_wait_ms: How long to wait for more inserts before committing
+        """
+        super().__init__()
+        self.path = path or settings.SQLITE_PATH
+        self.batch_size = batch_size or settings.SQLITE_GROUP_COMMIT_MAX
+        self.batch_wait = (batch_wait_ms if batch_wait_ms is not None else settings.SQLITE_GROUP_COMMIT_WAIT_MS) / 1000
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        connection = self._connect()
+        existing = {row["name"] for row in connection.execute("PRAGMA table_info(transactions)")}
+        if existing and "vendor_id" not in existing:
+            # Databases created before canonical vendor ids
+            connection.execute("ALTER TABLE transactions ADD COLUMN vendor_id TEXT")
+        connection.executescript(SCHEMA)
+        connection.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('instance_id', ?)", (uuid.uuid4().hex[:8],)
+        )
+        connection.commit()
+        self.instance_id = connection.execute("SELECT value FROM meta WHERE key = 'instance_id'").fetchone()[0]
+
+        # Distinct vendor names, loaded on the first vendor query and kept current on insert
+        self._vendor_names: Optional[Set[str]] = None
+        self._vendor_lock = threading.Lock()
+
+        self._queue: "queue.Queue[Tuple[str, Any, Future]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, name="sqlite-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is durable across application crashes in WAL mode
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=5000")
+        with self._connections_lock:
+            self._connections.append(connection)
+        return connection
+
+    def _reader(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _submit(self, operation: str, payload: Any = None) -> Any:
+        future: Future = Future()
+        self._queue.put((operation, payload, future))
+        return future.result()
+
+    def _writer_loop(self) -> None:
+        connection = self._connect()
+
+        while True:
+            batch = [self._queue.get()]
+
+            # Collect whatever else arrives within the batch window
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=self.batch_wait))
+                except queue.Empty:
+                    break
+
+            stop = self._apply_batch(connection, batch)
+            if stop:
+                connection.close()
+                return
+
+    def _apply_batch(self, connection: sqlite3.Connection, batch: List[Tuple[str, Any, Future]]) -> bool:
+        results = []
+        stop = False
+        try:
+            with connection:
+                for operation, payload, _ in batch:
+                    if operation == _INSERT:
+                        results.append(connection.execute(INSERT_SQL, payload).lastrowid)
+                    elif operation == _CLEAR:
+                        connection.execute("DELETE FROM transactions")
+                        results.append(None)
+                    else:
+                        stop = True
+                        results.append(None)
+        except Exception as e:
+            logger.exception("SQLite group commit failed")
+            for _, _, future in batch:
+                future.set_exception(e)
+            return stop
+
+        if len(batch) > 1:
+            logger.debug("Group commit of %d operations", len(batch))
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+        return stop
+
+    def add_transaction(self, transaction: Dict[str, Any], latency: Optional[float] = None) -> int:
+        """
+        Add a new transaction to storage (blocks until committed)
+
+        Args:
+            transaction: Transaction data dictionary
+            latency: Seconds spent processing the pair (for throughput rollups)
+
+        Returns:
+            Transaction id (SQLite rowid)
+        """
+        row = _to_row(transaction)
+        transaction_id = self._submit(_INSERT, row)
+        with self._vendor_lock:
+            if self._vendor_names is not None:
+                self._vendor_names.update(name for name in row[:2] if name)
+        self._columns_add(transaction_id, transaction)
+        self._rollup_add(transaction, latency)
+        self._touch()
+        logger.debug("Transaction #%d stored", transaction_id)
+        return transaction_id
+
+    def _iter_query(self, sql: str, params: Tuple = ()) -> Iterator[Dict[str, Any]]:
+        """
+        Stream rows on a dedicated connection
+
+        Streaming consumers (e.g. StreamingResponse) resume the generator on
+        arbitrary worker threads, so it must not share a thread-local reader.
+        """
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        try:
+            for row in connection.execute(sql, params):
+                yield _from_row(row)
+        finally:
+            connection.close()
+
+    def iter_transactions(self) -> Iterator[Dict[str, Any]]:
+        return self._iter_query(f"{SELECT_SQL} ORDER BY id")
+
+    def iter_filtered(self, start: Optional[str] = None, end: Optional[str] = None,
+                      matched: Optional[bool] = None, since_id: Optional[int] = None,
+                      until_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Filtered iteration pushed down to SQL (uses the id/timestamp/matched indexes)"""
+        clauses, params = [], []
+        if since_id is not None:
+            clauses.append("id > ?")
+            params.append(since_id)
+        if until_id is not None:
+            clauses.append("id <= ?")
+            params.append(until_id)
+        if start:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            clauses.append("timestamp <= ?")
+            params.append(end)
+        if matched is not None:
+            clauses.append("matched = ?")
+            params.append(int(matched))
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._iter_query(f"{SELECT_SQL}{where} ORDER BY id", tuple(params))
+
+    def _vendors(self) -> List[str]:
+        """Snapshot of the distinct vendor names (inserts keep adding to the set)"""
+        with self._vendor_lock:
+            if self._vendor_names is None:
+                # Loaded under the lock, so an insert committed meanwhile is either read or added after
+                rows = self._reader().execute(
+                    "SELECT invoice_vendor FROM transactions WHERE invoice_vendor IS NOT NULL "
+                    "UNION SELECT po_vendor FROM transactions WHERE po_vendor IS NOT NULL"
+                ).fetchall()
+                self._vendor_names = {row[0] for row in rows}
+            return list(self._vendor_names)
+
+    def _query_candidates(self, query: TransactionQuery) -> Iterator[Dict[str, Any]]:
+        """Query pushed down to SQL; every filter is served by an index"""
+        clauses, params = [], []
+        if query.vendor:
+            # Normalized/fuzzy matching runs over the distinct names, then an indexed IN
+            names = [name for name in self._vendors() if query.vendor_matches(name)]
+            if not names:
+                return iter(())
+            marks = ", ".join("?" for _ in names)
+            clauses.append(f"(invoice_vendor IN ({marks}) OR po_vendor IN ({marks}))")
+            params.extend(names + names)
+        if query.invoice_number:
+            clauses.append("invoice_number = ? COLLATE NOCASE")
+            params.append(query.invoice_number)
+        if query.po_number:
+            clauses.append("po_number = ? COLLATE NOCASE")
+            params.append(query.po_number)
+        if query.min_amount is not None:
+            clauses.append("invoice_total >= ?")
+            params.append(query.min_amount)
+        if query.max_amount is not None:
+            clauses.append("invoice_total <= ?")
+            params.append(query.max_amount)
+        if query.matched is not None:
+            clauses.append("matched = ?")
+            params.append(int(query.matched))
+        if query.start:
+            clauses.append("timestamp >= ?")
+            params.append(query.start)
+        if query.end:
+            clauses.append("timestamp <= ?")
+            params.append(query.end)
+        if query.after_id is not None:
+            clauses.append("id > ?")
+            params.append(query.after_id)
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._iter_query(f"{SELECT_SQL}{where} ORDER BY id", tuple(params))
+
+    def get_recent_transactions(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get most recent transactions
+
+        Args:
+            limit: Number of transactions to return
+
+        Returns:
+            List of recent transactions (oldest first)
+        """
+        if limit <= 0:
+            return self.get_all_transactions()
+        rows = self._reader().execute(f"{SELECT_SQL} ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [_from_row(row) for row in reversed(rows)]
+
+    def get_transaction(self, transaction_id: int) -> Optional[Dict[str, Any]]:
+        row = self._reader().execute(f"{SELECT_SQL} WHERE id = ?", (transaction_id,)).fetchone()
+        return _from_row(row) if row else None
+
+    def _fetch(self, ids: List[int]) -> Iterator[Dict[str, Any]]:
+        # Batches stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            marks = ", ".join("?" for _ in batch)
+            yield from self._iter_query(f"{SELECT_SQL} WHERE id IN ({marks}) ORDER BY id", tuple(batch))
+
+    def count(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    def last_id(self) -> int:
+        return self._reader().execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]
+
+    def _last_id_and_count(self) -> Tuple[int, int]:
+        # One statement reads one snapshot
+        return tuple(self._reader().execute("SELECT COALESCE(MAX(id), 0), COUNT(*) FROM transactions").fetchone())
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get statistics about stored transactions
+
+        Returns:
+            Statistics dictionary
+        """
+        total, matched = self._reader().execute(
+            "SELECT COUNT(*), COALESCE(SUM(matched), 0) FROM transactions"
+        ).fetchone()
+        return format_statistics(total, matched)
+
+    def clear(self) -> None:
+        """Clear all stored transactions"""
+        self._submit(_CLEAR)
+        with self._vendor_lock:
+            self._vendor_names = None
+        self._columns_reset()
+        self.rollups.clear()
+        self._touch()
+        logger.info("All transactions cleared")
+
+    def close(self) -> None:
+        """Stop the writer thread and close all connections"""
+        if self._writer.is_alive():
+            self._submit(_STOP)
+            self._writer.join()
+        with self._connections_lock:
+            for connection in self._connections:
+                try:
+                    connection.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
@@ -1,56 +1,592 @@
 """
 Data Storage & CSV Export Module
-Handles in-memory storage and CSV generation
+Handles transaction storage backends and CSV generation
 """
 
 import os
-import pandas as pd
-from typing import List, Dict, Any
-from datetime import datetime
+import io
+import csv
+import uuid
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from collections import deque
+from itertools import chain
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
+from datetime import datetime, timezone
 
+from src.core.config import settings
+from src.core.aggregation import TransactionColumns, aggregate, simulate
+from src.core.query import TransactionIndex, TransactionQuery
+from src.core.records import TransactionRecord, to_timestamp
+from src.core.rollups import ThroughputRollups
+from src.core.sequence import IdSequence
+from src.core.spill_tier import SpillSegment, SpillTier
+from src.utils.metrics import record_cache_lookup, registry
 
-class TransactionStorage:
-    """In-memory storage for verified transactions"""
+logger = logging.getLogger(__name__)
+
+STORAGE_TRANSACTIONS = registry.gauge(
+    "futurix_storage_transactions",
+    "Transactions held by the in-memory backend, by tier (resident, spilled)",
+    ("tier",),
+)
+SPILL_BYTES = registry.gauge(
+    "futurix_storage_spill_bytes",
+    "Compressed bytes of transactions spilled to disk",
+)
+
+
+def is_matched_status(status: Optional[str]) -> bool:
+    """Whether a stored status string means the pair matched"""
+    return "MATCHED" in (status or "")
+
+
+def parse_time_bound(value: Optional[str], end: bool = False) -> Optional[str]:
+    """
+    Normalize a date or datetime filter to a comparable timestamp string
+
+    Args:
+        value: "YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS"
+        end: Whether this is an inclusive upper bound (a bare date covers the whole day)
+
+    Returns:
+        Timestamp string in storage format, or None
+
+    Raises:
+        ValueError: If the value is not a valid date/datetime
+    """
+    if not value:
+        return None
+    if len(value) == 10:
+        datetime.strptime(value, "%Y-%m-%d")
+        return f"{value} 23:59:59" if end else f"{value} 00:00:00"
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%d %H:%M:%S")
+
+
+def format_statistics(total: int, matched: int) -> Dict[str, Any]:
+    """Build the statistics payload shared by all storage backends"""
+    return {
+        "total_processed": total,
+        "matched": matched,
+        "mismatched": total - matched,
+        "match_rate": f"{(matched/total*100):.2f}%" if total > 0 else "0%"
+    }
+
+
+class BaseTransactionStorage:
+    """Interface shared by all transaction storage backends"""
 
     def __init__(self):
-        """Initialize empty transaction list"""
-        self.transactions = []
+        # Columnar copy for aggregations, built on first use (see columns())
+        self._columns: Optional[TransactionColumns] = None
+        self._columns_lock = threading.Lock()
+        self._aggregate_cache: Optional[Tuple[str, Dict[str, Any]]] = None
+        # Throughput of this process, fed by add_transaction()
+        self.rollups = ThroughputRollups(settings.ROLLUP_MINUTE_BUCKETS, settings.ROLLUP_HOUR_BUCKETS)
+
+    # When transactions were last added or cleared (UTC); backends call _touch()
+    last_modified: datetime = datetime.now(timezone.utc)
 
-    def add_transaction(self, transaction: Dict[str, Any]) -> None:
+    # Identifies one physical store, so ids from a recreated store never
+    # produce the same change token as the store it replaced
+    instance_id: str = ""
+
+    # Whether stored transactions survive a restart (data kept beside them,
+    # such as OCR text, is only worth keeping across restarts if they do)
+    durable: bool = True
+
+    def add_transaction(self, transaction: Dict[str, Any], latency: Optional[float] = None) -> int:
         """
         Add a new transaction to storage
 
         Args:
             transaction: Transaction data dictionary
+            latency: Seconds spent processing the pair (for throughput rollups)
+
+        Returns:
+            Transaction id
         """
-        self.transactions.append(transaction)
-        print(f"💾 Transaction #{len(self.transactions)} stored")
+        raise NotImplementedError
 
-    def get_all_transactions(self) -> List[Dict[str, Any]]:
+    def iter_transactions(self) -> Iterator[Dict[str, Any]]:
         """
-        Get all stored transactions
+        Iterate over all stored transactions, oldest first
 
         Returns:
-            List of all transactions
+            Iterator of transactions
         """
-        return self.transactions
+        raise NotImplementedError
 
     def get_recent_transactions(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
-        Get most recent transactions
+        Get most recent transactions (oldest first)
 
         Args:
-            limit: Number of transactions to return
+            limit: Number of transactions to return (<= 0 returns all)
 
         Returns:
             List of recent transactions
         """
-        return self.transactions[-limit:] if limit > 0 else self.transactions
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Number of stored transactions"""
+        raise NotImplementedError
+
+    def last_id(self) -> int:
+        """Id of the newest stored transaction (0 when empty)"""
+        raise NotImplementedError
+
+    def _last_id_and_count(self) -> Tuple[int, int]:
+        """Newest id and count, read together (backends read both from one state)"""
+        return self.last_id(), self.count()
+
+    def watermark(self) -> Tuple[int, str]:
+        """
+        Newest stored id and the change token of the same stored set
+
+        Read together, so a write landing in between cannot make the token
+        describe a different set than the id bounds.
+        """
+        last_id, count = self._last_id_and_count()
+        return last_id, f"{self.instance_id}-{last_id}-{count}"
+
+    def change_token(self) -> str:
+        """
+        Opaque token that changes whenever transactions are added or cleared
+
+        Ids are never reused within a store, so (store, last id, count)
+        identifies the stored set.
+        """
+        return self.watermark()[1]
+
+    def _touch(self) -> None:
+        self.last_modified = datetime.now(timezone.utc)
 
     def clear(self) -> None:
         """Clear all stored transactions"""
-        self.transactions = []
-        print("🗑️  All transactions cleared")
+        raise NotImplementedError
+
+    def get_all_transactions(self) -> List[Dict[str, Any]]:
+        """
+        Get all stored transactions
+
+        Returns:
+            List of all transactions
+        """
+        return list(self.iter_transactions())
+
+    def _iter_after(self, since_id: Optional[int]) -> Iterator[Dict[str, Any]]:
+        """Iterate from the first transaction with id > since_id (backends may seek)"""
+        return self.iter_transactions()
+
+    def iter_filtered(self, start: Optional[str] = None, end: Optional[str] = None,
+                      matched: Optional[bool] = None, since_id: Optional[int] = None,
+                      until_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over transactions within a time/id window and/or with a status
+
+        Args:
+            start: Inclusive lower timestamp bound (see parse_time_bound)
+            end: Inclusive upper timestamp bound
+            matched: True for matched only, False for mismatched only
+            since_id: Only transactions with id greater than this watermark
+            until_id: Only transactions with id up to and including this one
+
+        Returns:
+            Iterator of transactions, oldest first
+        """
+        for transaction in self._iter_after(since_id):
+            transaction_id = transaction.get("id", 0)
+            if since_id is not None and transaction_id <= since_id:
+                continue
+            if until_id is not None and transaction_id > until_id:
+                break
+            timestamp = transaction.get("timestamp") or ""
+            if start and timestamp < start:
+                continue
+            if end and timestamp > end:
+                continue
+            if matched is not None and is_matched_status(transaction.get("status")) != matched:
+                continue
+            yield transaction
+
+    def query(self, query: TransactionQuery) -> List[Dict[str, Any]]:
+        """
+        Find transactions matching a query, oldest first
+
+        Args:
+            query: Filters, cursor and page size
+
+        Returns:
+            Up to query.limit matching transactions (as dicts)
+        """
+        results = []
+        for transaction in self._query_candidates(query):
+            if query.matches(transaction):
+                results.append(transaction.to_dict() if isinstance(transaction, TransactionRecord) else transaction)
+                if len(results) >= query.limit:
+                    break
+        return results
+
+    def _query_candidates(self, query: TransactionQuery) -> Iterator[Dict[str, Any]]:
+        """Transactions that may match (backends with indexes narrow this)"""
+        return self.iter_filtered(query.start, query.end, query.matched, since_id=query.after_id)
+
+    def get_transactions(self, ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Look up several transactions by id at once
+
+        Args:
+            ids: Transaction ids, in any order
+
+        Returns:
+            Transactions (as dicts) by id; ids no longer stored are left out
+        """
+        ids = sorted(set(ids))
+        if not ids:
+            return {}
+        return {transaction["id"]: transaction.to_dict() if isinstance(transaction, TransactionRecord) else transaction
+                for transaction in self._fetch(ids)}
+
+    def _fetch(self, ids: List[int]) -> Iterator[Dict[str, Any]]:
+        """Transactions with the given ascending ids (backends with indexes look them up directly)"""
+        wanted = set(ids)
+        for transaction in self.iter_filtered(since_id=ids[0] - 1, until_id=ids[-1]):
+            if transaction.get("id") in wanted:
+                yield transaction
+
+    def columns(self) -> TransactionColumns:
+        """
+        Columnar arrays for aggregation, built by one scan on first use
+
+        Afterwards backends keep them current through _columns_add().
+        Inserts wait on the lock while the initial scan runs.
+        """
+        with self._columns_lock:
+            if self._columns is None:
+                columns = TransactionColumns()
+                for transaction in self.iter_transactions():
+                    columns.append(transaction)
+                    columns.watermark = max(columns.watermark, transaction.get("id") or 0)
+                self._columns = columns
+            return self._columns
+
+    def _columns_add(self, transaction_id: int, transaction: Dict[str, Any]) -> None:
+        """Append a committed transaction to the columns unless the initial scan saw it"""
+        with self._columns_lock:
+            if self._columns is not None and transaction_id > self._columns.watermark:
+                self._columns.append(transaction)
+
+    def _rollup_add(self, transaction: Any, latency: Optional[float]) -> None:
+        """Count a committed transaction in the per-minute/per-hour rollups"""
+        if isinstance(transaction, TransactionRecord):
+            self.rollups.add(transaction.timestamp, transaction.matched, latency)
+        else:
+            self.rollups.add(to_timestamp(transaction.get("timestamp")),
+                             is_matched_status(transaction.get("status")), latency)
+
+    def throughput(self, resolution: str = "minute", buckets: int = 60) -> Dict[str, Any]:
+        """
+        Processed count, match rate and latency per time bucket
+
+        Served from fixed-size ring buffers updated on insert; no stored
+        transactions are read.
+
+        Args:
+            resolution: "minute" or "hour"
+            buckets: Number of most recent buckets to return
+
+        Returns:
+            Rollup series dictionary (see rollups.ThroughputRollups.series)
+
+        Raises:
+            ValueError: If the resolution is unknown
+        """
+        return self.rollups.series(resolution, buckets)
+
+    def _columns_reset(self) -> None:
+        with self._columns_lock:
+            self._columns = None
+
+    def aggregate(self, top: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Per-vendor and per-mismatch-field statistics (cached until the next change)
+
+        Args:
+            top: Only return the N vendors with the most transactions
+
+        Returns:
+            Aggregation dictionary (see aggregation.aggregate)
+        """
+        token = self.change_token()
+        cached = self._aggregate_cache
+        hit = cached is not None and cached[0] == token
+        record_cache_lookup("aggregate", hit)
+        if not hit:
+            cached = self._aggregate_cache = (token, aggregate(self.columns()))
+
+        result = cached[1]
+        if top:
+            result = dict(result, vendors=result["vendors"][:top])
+        return result
+
+    def simulate(self, vendor_threshold: float = None, amount_tolerance: float = None,
+                 date_tolerance: float = None, top: int = 10,
+                 policy_for: Optional[Callable[..., Any]] = None) -> Dict[str, Any]:
+        """
+        Statuses all stored transactions would get under other tolerances
+
+        Args:
+            vendor_threshold: Proposed minimum vendor score (default: current setting)
+            amount_tolerance: Proposed amount tolerance in percent (default: current setting)
+            date_tolerance: Proposed date tolerance in days (default: current setting)
+            top: Number of vendors with the most flips to list
+            policy_for: policy_for(vendor_id, vendor) -> ComparisonPolicy, to leave
+                out vendors with their own Comparison Rules
+
+        Returns:
+            Simulation dictionary (see aggregation.simulate)
+        """
+        return simulate(self.columns(), vendor_threshold, amount_tolerance, date_tolerance, top, policy_for)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Get statistics about stored transactions
+
+        Returns:
+            Statistics dictionary
+        """
+        total = 0
+        matched = 0
+        for transaction in self.iter_transactions():
+            total += 1
+            matched += is_matched_status(transaction.get("status"))
+        return format_statistics(total, matched)
+
+    def close(self) -> None:
+        """Release any resources held by the backend"""
+
+    def __len__(self) -> int:
+        return self.count()
+
+
+class _RecordIds:
+    """Read-only view of the ids of an id-ordered record list, for bisect (whose key= needs Python 3.10)"""
+
+    __slots__ = ("records",)
+
+    def __init__(self, records: List[TransactionRecord]):
+        self.records = records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index: int) -> int:
+        return self.records[index].id
+
+
+class TransactionStorage(BaseTransactionStorage):
+    """
+    In-memory storage for verified transactions
+
+    Transactions are held as slotted TransactionRecord objects (typed fields,
+    no per-record key dict), and scans compare those typed fields directly.
+
+    Records are bounded by a resident budget: once more than `resident_limit`
+    plus one spill batch are held, the oldest transactions are written to a
+    compressed on-disk SpillTier. What stays in RAM per spilled transaction
+    is its share of a segment filter, plus its aggregation columns once
+    columns() has been built. Iteration, filters, statistics and exports
+    cover both tiers transparently; /history reads only the resident tail.
+
+    Filtered queries use a TransactionIndex over the resident tier and the
+    SegmentFilter of each spilled segment, so index memory stays within the
+    resident budget too. Nothing survives a restart except the id sequence.
+    """
+
+    durable = False
+
+    def __init__(self, resident_limit: int = None, spill_batch: int = None, spill_dir: str = None,
+                 id_file: str = None):
+        """
+        Initialize empty transaction list
+
+        Args:
+            resident_limit: Transactions kept in RAM (defaults to
+                settings.MEMORY_RESIDENT_TRANSACTIONS, 0 = unbounded)
+            spill_batch: Transactions moved to disk per spill
+            spill_dir: Spill directory (defaults to a per-instance
+                directory under settings.MEMORY_SPILL_DIR)
+            id_file: Where reserved ids are recorded so numbering continues
+                after a restart (defaults to settings.MEMORY_ID_FILE)
+        """
+        super().__init__()
+        self.transactions: List[TransactionRecord] = []
+        self._ids = IdSequence(id_file or settings.MEMORY_ID_FILE)
+        self.instance_id = uuid.uuid4().hex[:8]
+
+        self.resident_limit = settings.MEMORY_RESIDENT_TRANSACTIONS if resident_limit is None else resident_limit
+        self.spill_batch = max(1, spill_batch or settings.MEMORY_SPILL_BATCH)
+        self.spill_dir = spill_dir or os.path.join(settings.MEMORY_SPILL_DIR, self.instance_id)
+        self._spill: Optional[SpillTier] = None  # created on first spill
+        self._spilled = 0
+        self._matched = 0
+        self.index = TransactionIndex()
+
+        # Guards inserts (id order = list order = index order) and swapping
+        # the (segments, resident list) pair during a spill
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+
+        STORAGE_TRANSACTIONS.set_function(lambda: len(self.transactions), tier="resident")
+        STORAGE_TRANSACTIONS.set_function(lambda: self._spilled, tier="spilled")
+        SPILL_BYTES.set_function(lambda: self._spill.disk_bytes() if self._spill else 0)
+        self._touch()
+
+    def add_transaction(self, transaction: Dict[str, Any], latency: Optional[float] = None) -> int:
+        """
+        Add a new transaction to storage
+
+        Args:
+            transaction: Transaction data dictionary
+            latency: Seconds spent processing the pair (for throughput rollups)
+
+        Returns:
+            Transaction id
+        """
+        record = TransactionRecord.from_dict(transaction, id=None)
+        with self._lock:
+            record.id = self._ids.next()
+            self.transactions.append(record)
+            self.index.add(record)
+            self._matched += record.matched
+            resident = len(self.transactions)
+
+        # Outside the insert lock: columns() scans storage while holding its own lock
+        self._columns_add(record.id, record)
+        self._rollup_add(record, latency)
+        self._touch()
+        logger.debug("Transaction #%d stored", record.id)
+
+        if self.resident_limit and resident >= self.resident_limit + self.spill_batch:
+            # One spill at a time; a concurrent insert just leaves it to the spiller
+            if self._spill_lock.acquire(blocking=False):
+                try:
+                    self._spill_oldest(len(self.transactions) - self.resident_limit)
+                finally:
+                    self._spill_lock.release()
+        return record.id
+
+    def _spill_oldest(self, count: int) -> None:
+        """Move the oldest `count` resident transactions to the disk tier"""
+        if self._spill is None:
+            self._spill = SpillTier(self.spill_dir)
+
+        segment = self._spill.write(self.transactions[:count])
+        with self._lock:
+            # Publish a new list rather than trimming in place, so readers
+            # holding the previous snapshot never see records shift under them
+            self._spill.segments += (segment,)
+            self.transactions = self.transactions[count:]
+            self._spilled += segment.count
+        # After publishing, so a query that finds these ids gone from the index finds the segment
+        self.index.discard_through(segment.last_id)
+
+        logger.info("Spilled transactions to disk", extra={"spilled": segment.count, "bytes": segment.size})
+
+    def _snapshot(self) -> Tuple[Tuple[SpillSegment, ...], List[TransactionRecord]]:
+        with self._lock:
+            return (self._spill.segments if self._spill else ()), self.transactions
+
+    def _iter_window(self, since_id: Optional[int] = None, start: Optional[int] = None,
+                     end: Optional[int] = None) -> Iterator[TransactionRecord]:
+        """Iterate both tiers from since_id, skipping spilled segments outside [start, end]"""
+        segments, resident = self._snapshot()
+        if segments:
+            yield from self._spill.iter_records(segments, since_id, start, end)
+
+        # Ids are ascending, so the watermark position is a binary search away
+        position = bisect_right(_RecordIds(resident), since_id) if since_id else 0
+        for index in range(position, len(resident)):
+            yield resident[index]
+
+    def iter_transactions(self) -> Iterator[TransactionRecord]:
+        return self._iter_window()
+
+    def _iter_after(self, since_id: Optional[int]) -> Iterator[TransactionRecord]:
+        return self._iter_window(since_id)
+
+    def iter_filtered(self, start: Optional[str] = None, end: Optional[str] = None,
+                      matched: Optional[bool] = None, since_id: Optional[int] = None,
+                      until_id: Optional[int] = None) -> Iterator[TransactionRecord]:
+        """Filtered iteration comparing typed record fields (no string parsing per record)"""
+        start_ts, end_ts = to_timestamp(start), to_timestamp(end)
+
+        for record in self._iter_window(since_id, start_ts, end_ts):
+            if until_id is not None and record.id > until_id:
+                break
+            timestamp = record.timestamp or 0
+            if start_ts is not None and timestamp < start_ts:
+                continue
+            if end_ts is not None and timestamp > end_ts:
+                continue
+            if matched is not None and record.matched != matched:
+                continue
+            yield record
+
+    def _query_candidates(self, query: TransactionQuery) -> Iterator[TransactionRecord]:
+        candidates, floor = self.index.lookup(query)
+        if candidates is None:
+            since_id, until_id = self.index.id_window(query.start, query.end)
+            if query.after_id is not None:
+                since_id = max(since_id or 0, query.after_id)
+            return self.iter_filtered(query.start, query.end, query.matched, since_id=since_id, until_id=until_id)
+        return chain(self._scan_spilled(query, floor), self._fetch(candidates))
+
+    def _scan_spilled(self, query: TransactionQuery, floor: int) -> Iterator[TransactionRecord]:
+        """Spilled records with ids <= floor, reading only segments whose filter admits the query"""
+        if not floor:
+            return
+        segments, _ = self._snapshot()
+        start, end = to_timestamp(query.start), to_timestamp(query.end)
+        vendors = [name for name in self._spill.vendors if query.vendor_matches(name)] if query.fuzzy else ()
+        for segment in segments:
+            if segment.first_id > floor:
+                break
+            if not segment.query_filter.may_match(query, vendors):
+                continue
+            for record in self._spill.iter_records((segment,), query.after_id, start, end):
+                if record.id > floor:
+                    return
+                yield record
+
+    def _fetch(self, ids: Iterable[int]) -> Iterator[TransactionRecord]:
+        """Look up records by ascending id in either tier"""
+        segments, resident = self._snapshot()
+        first_resident = resident[0].id if resident else None
+        resident_ids = _RecordIds(resident)
+        segment_starts = [segment.first_id for segment in segments]
+        loaded, decoded = None, {}
+        spill = self._spill
+
+        for transaction_id in ids:
+            if first_resident is not None and transaction_id >= first_resident:
+                position = bisect_left(resident_ids, transaction_id)
+                if position < len(resident) and resident[position].id == transaction_id:
+                    yield resident[position]
+                continue
+
+            position = bisect_right(segment_starts, transaction_id) - 1
+            if position < 0:
+                continue
+            if position != loaded:
+                # Candidates are ascending, so each segment is loaded at most once
+                loaded, decoded = position, spill.load(segments[position])
+            record = decoded.get(transaction_id)
+            if record is not None:
+                yield record
 
     def get_statistics(self) -> Dict[str, Any]:
         """
@@ -59,24 +595,169 @@ class TransactionStorage:
         Returns:
             Statistics dictionary
         """
-        total = len(self.transactions)
-        matched = sum(1 for t in self.transactions if "MATCHED" in t.get("status", ""))
-        mismatched = total - matched
+        return format_statistics(self.count(), self._matched)
+
+    def get_recent_transactions(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Get most recent transactions
+
+        Args:
+            limit: Number of transactions to return
+
+        Returns:
+            List of recent transactions (as dicts)
+        """
+        _, resident = self._snapshot()
+        if 0 < limit <= len(resident):
+            records = resident[-limit:]
+        elif limit > 0:
+            records = deque(self.iter_transactions(), maxlen=limit)
+        else:
+            records = self.iter_transactions()
+        return [record.to_dict() for record in records]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._spilled + len(self.transactions)
 
-        return {
-            "total_processed": total,
-            "matched": matched,
-            "mismatched": mismatched,
-            "match_rate": f"{(matched/total*100):.2f}%" if total > 0 else "0%"
-        }
+    def last_id(self) -> int:
+        segments, resident = self._snapshot()
+        if resident:
+            return resident[-1].id
+        return segments[-1].last_id if segments else 0
 
+    def _last_id_and_count(self) -> Tuple[int, int]:
+        with self._lock:
+            if self.transactions:
+                last_id = self.transactions[-1].id
+            else:
+                last_id = self._spill.segments[-1].last_id if self._spill and self._spill.segments else 0
+            return last_id, self._spilled + len(self.transactions)
+
+    def clear(self) -> None:
+        """Clear all stored transactions (including the disk tier)"""
+        with self._lock:
+            self.transactions = []
+            self._spilled = 0
+            self._matched = 0
+            self.index.clear()
+            if self._spill:
+                self._spill.clear()
+        self._columns_reset()
+        self.rollups.clear()
+        self._touch()
+        logger.info("All transactions cleared")
 
-def export_to_csv(transactions: List[Dict[str, Any]], output_dir: str = "data/exports") -> str:
+    def close(self) -> None:
+        """Delete the disk tier; in-memory history does not outlive the process"""
+        if self._spill:
+            self._spill.destroy()
+
+
+def create_storage(backend: str = None) -> BaseTransactionStorage:
+    """
+    Create the transaction storage backend selected in settings
+
+    Args:
+        backend: "memory", "sqlite" or "log" (defaults to settings.STORAGE_BACKEND)
+
+    Returns:
+        Storage instance
+    """
+    backend = (backend or settings.STORAGE_BACKEND).lower()
+
+    if backend == "memory":
+        return TransactionStorage()
+    if backend == "sqlite":
+        from src.core.sqlite_storage import SQLiteTransactionStorage
+        return SQLiteTransactionStorage(settings.SQLITE_PATH)
+    if backend == "log":
+        from src.core.log_storage import LogTransactionStorage
+        return LogTransactionStorage(settings.LOG_STORAGE_DIR)
+
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+# Column set for CSV (and other tabular) exports
+EXPORT_COLUMNS = [
+    "Invoice Vendor", "PO Vendor", "Invoice Total", "PO Total",
+    "Invoice Date", "PO Date", "Invoice Number", "PO Number",
+    "Status", "Mismatched Fields", "Timestamp",
+]
+
+
+def mismatch_summary(details: Any) -> str:
+    """Comma-separated names of the fields that failed comparison"""
+    mismatch_fields = []
+
+    if isinstance(details, dict):
+        for field, info in details.items():
+            if isinstance(info, dict) and "reason" in info:
+                mismatch_fields.append(field)
+
+    return ", ".join(mismatch_fields) if mismatch_fields else "None"
+
+
+def _or_missing(transaction: Dict[str, Any], key: str, missing: str = "N/A") -> Any:
+    """Field value, or `missing` when absent or None (records hold every field, unset ones as None)"""
+    value = transaction.get(key)
+    return missing if value is None else value
+
+
+def transaction_to_row(transaction: Dict[str, Any]) -> List[Any]:
+    """Flatten a transaction into the EXPORT_COLUMNS order"""
+    return [
+        _or_missing(transaction, "invoice_vendor"),
+        _or_missing(transaction, "po_vendor"),
+        transaction.get("invoice_total", 0),
+        transaction.get("po_total", 0),
+        _or_missing(transaction, "invoice_date"),
+        _or_missing(transaction, "po_date"),
+        _or_missing(transaction, "invoice_number"),
+        _or_missing(transaction, "po_number"),
+        _or_missing(transaction, "status", "Unknown"),
+        mismatch_summary(transaction.get("details", {})),
+        _or_missing(transaction, "timestamp"),
+    ]
+
+
+def iter_csv(transactions: Iterable[Dict[str, Any]], chunk_rows: int = None) -> Iterator[bytes]:
+    """
+    Render transactions as CSV, yielding encoded chunks
+
+    Only one chunk of rows is held in memory at a time, so this can stream
+    an arbitrarily large history.
+
+    Args:
+        transactions: Iterable of transaction dictionaries
+        chunk_rows: Rows per yielded chunk (defaults to settings.EXPORT_CHUNK_ROWS)
+
+    Yields:
+        UTF-8 encoded CSV chunks, header first
+    """
+    chunk_rows = chunk_rows or settings.EXPORT_CHUNK_ROWS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+
+    rows = 0
+    for transaction in transactions:
+        writer.writerow(transaction_to_row(transaction))
+        rows += 1
+        if rows % chunk_rows == 0:
+            yield buffer.getvalue().encode(settings.CSV_ENCODING)
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode(settings.CSV_ENCODING)
+
+
+def export_to_csv(transactions: Iterable[Dict[str, Any]], output_dir: str = "data/exports") -> str:
     """
     Export transactions to CSV file
 
     Args:
-        transactions: List of transaction dictionaries
+        transactions: Iterable of transaction dictionaries
         output_dir: Directory to save CSV file
 
     Returns:
@@ -86,52 +767,20 @@ def export_to_csv(transactions: List[Dict[str, Any]], output_dir: str = "data/ex
         # Create exports directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
 
-        # Prepare data for DataFrame
-        csv_data = []
-
-        for transaction in transactions:
-            # Extract mismatch details if present
-            details = transaction.get("details", {})
-            mismatch_fields = []
-
-            if isinstance(details, dict):
-                for field, info in details.items():
-                    if isinstance(info, dict) and "reason" in info:
-                        mismatch_fields.append(field)
-
-            mismatch_summary = ", ".join(mismatch_fields) if mismatch_fields else "None"
-
-            csv_data.append({
-                "Invoice Vendor": transaction.get("invoice_vendor", "N/A"),
-                "PO Vendor": transaction.get("po_vendor", "N/A"),
-                "Invoice Total": transaction.get("invoice_total", 0),
-                "PO Total": transaction.get("po_total", 0),
-                "Invoice Date": transaction.get("invoice_date", "N/A"),
-                "PO Date": transaction.get("po_date", "N/A"),
-                "Invoice Number": transaction.get("invoice_number", "N/A"),
-                "PO Number": transaction.get("po_number", "N/A"),
-                "Status": transaction.get("status", "Unknown"),
-                "Mismatched Fields": mismatch_summary,
-                "Timestamp": transaction.get("timestamp", "N/A")
-            })
-
-        # Create DataFrame
-        df = pd.DataFrame(csv_data)
-
         # Generate filename with timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"futurix_transactions_{timestamp}.csv"
         filepath = os.path.join(output_dir, filename)
 
         # Export to CSV
-        df.to_csv(filepath, index=False, encoding='utf-8')
+        with open(filepath, "wb") as f:
+            for chunk in iter_csv(transactions):
+                f.write(chunk)
 
-        print(f"📊 CSV exported: {filepath}")
-        print(f"   Total records: {len(csv_data)}")
+        logger.info("CSV exported", extra={"path": filepath})
 
         return filepath
 
-    except Exception as e:
-        print(f"❌ CSV export error: {str(e)}")
+    except Exception:
+        logger.exception("CSV export error")
         raise
-
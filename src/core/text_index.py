@@ -0,0 +1,689 @@
+"""
+Full-Text Search
+Incremental inverted index over OCR text, with invoice-aware tokens, BM25 ranking and memory-mapped segments
+"""
+
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import uuid
+from collections import Counter
+from itertools import chain, repeat
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.core.config import settings
+from src.core.text_store import RawTextStore, decompress_text
+
+logger = logging.getLogger(__name__)
+
+# Runs of letters/digits, joined by the separators invoice ids and numbers use
+# ("INV-2024-001", "PO/22/118", "1,25,000.00", "12.03.2025")
+_WORD = re.compile(r"\w+(?:[-/.,]\w+)*")
+_SEPARATOR = re.compile(r"[-/.,]")
+# Amounts with digit grouping or decimals
+_NUMBER = re.compile(r"\d{1,3}(?:,\d{2,3})+(?:\.\d+)?|\d+\.\d+")
+MAX_TERM_CHARS = 48  # longer runs are OCR noise (base64, rules), not searchable text
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Segment file: magic, doc count, term count, posting count, term bytes, total document length;
+# then doc ids (i8), posting starts (u4, terms + 1), term offsets (u4, terms + 1),
+# doc lengths (u4), postings as doc positions (u4), term frequencies (u2), term bytes
+SEGMENT_HEADER = struct.Struct("<8sQQQQQ")
+SEGMENT_MAGIC = b"FTSEG001"
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".idx"
+MANIFEST_FILE = "manifest.json"
+
+
+def _number_terms(token: str) -> List[str]:
+    # "1,250.00" is indexed as "1250.00" and "1250"
+    number = token.replace(",", "")
+    whole, _, fraction = number.partition(".")
+    return [number, whole] if fraction and not fraction.strip("0") else [number]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Index terms of a text, lowercased
+
+    Plain words, numbers and codes ("27AABCU9603R1ZM") are one term each.
+    Amounts drop their digit grouping. Ids with separators ("INV-2024-001")
+    give the id without separators ("inv2024001") plus each part ("inv",
+    "2024", "001"), so "INV/2024/001", "INV2024001" and "2024-001" all find
+    it.
+    """
+    terms = []
+    for token in _WORD.findall(text.lower()):
+        if len(token) > MAX_TERM_CHARS:
+            continue
+        if token.isalnum() or _SEPARATOR.search(token) is None:
+            terms.append(token)
+        elif _NUMBER.fullmatch(token):
+            terms.extend(_number_terms(token))
+        else:
+            parts = _SEPARATOR.split(token)
+            terms.append("".join(parts))
+            terms.extend(part for part in parts if len(part) > 1 or part.isdigit())
+    return terms
+
+
+def parse_query(query: str, prefix: bool = False) -> List[Tuple[str, bool]]:
+    """
+    Query terms, each with whether it is matched as a prefix
+
+    A word ending in "*" is a prefix; with `prefix` the last word is too.
+    An id with separators is searched by its parts, or by its joined form
+    when it is a prefix ("INV-2024*" matches "inv2024001").
+    """
+    words = query.split()
+    terms: List[Tuple[str, bool]] = []
+    for number, word in enumerate(words):
+        is_prefix = word.endswith("*") or prefix and number == len(words) - 1
+        tokens = _WORD.findall(word.rstrip("*").lower())
+        for position, token in enumerate(tokens):
+            token_prefix = is_prefix and position == len(tokens) - 1
+            if len(token) > MAX_TERM_CHARS:
+                continue
+            if _SEPARATOR.search(token) is None:
+                terms.append((token, token_prefix))
+            elif _NUMBER.fullmatch(token):
+                terms.append((_number_terms(token)[-1] if not token_prefix else token.replace(",", ""), token_prefix))
+            elif token_prefix:
+                terms.append(("".join(_SEPARATOR.split(token)), True))
+            else:
+                terms.extend((part, False) for part in _SEPARATOR.split(token) if len(part) > 1 or part.isdigit())
+    # The same term twice adds nothing but cost
+    return list(dict.fromkeys(terms))
+
+
+def snippet(text: Optional[str], terms: Iterable[str], width: int = 60) -> Optional[str]:
+    """Text around the first occurrence of any term (case-insensitive), or None"""
+    if not text:
+        return None
+    lowered = text.lower()
+    found = [position for position in (lowered.find(term) for term in terms) if position >= 0]
+    if not found:
+        return None
+    start = min(found)
+    left, right = max(0, start - width), min(len(text), start + width)
+    excerpt = " ".join(text[left:right].split())
+    return ("..." if left else "") + excerpt + ("..." if right < len(text) else "")
+
+
+class _MemorySegment:
+    """Documents indexed since the last flush: term -> (doc positions, frequencies)"""
+
+    def __init__(self):
+        self.doc_ids: List[int] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def add(self, doc_id: int, terms: List[str]) -> None:
+        position = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.doc_lengths.append(len(terms))
+        self.total_length += len(terms)
+        postings = self.postings
+        for term, count in Counter(terms).items():
+            entry = postings.get(term)
+            if entry is None:
+                postings[term] = ([position], [count])
+            else:
+                entry[0].append(position)
+                entry[1].append(count)
+
+    def expansions(self, prefix: str, limit: int) -> List[str]:
+        """Up to `limit` terms starting with `prefix`, the most frequent first"""
+        names = [name for name in list(self.postings) if name.startswith(prefix)]
+        if len(names) > limit:
+            names = sorted(names, key=lambda name: len(self.postings[name][0]), reverse=True)[:limit]
+        return names
+
+    def lookup(self, term: str) -> Optional[Tuple[Any, Any]]:
+        """(doc positions, frequencies) of a term, or None"""
+        import numpy as np
+
+        entry = self.postings.get(term)
+        if entry is None:
+            return None
+        positions, frequencies = entry
+        count = len(positions)  # snapshot: adds may append concurrently
+        return (np.array(positions[:count], dtype=np.uint32),
+                np.minimum(frequencies[:count], 0xFFFF).astype(np.uint16))
+
+    def documents(self):
+        import numpy as np
+
+        count = len(self.doc_lengths)
+        return np.array(self.doc_ids[:count], dtype=np.int64), np.array(self.doc_lengths[:count], dtype=np.uint32)
+
+    def postings_arrays(self):
+        """(sorted term bytes, posting starts, positions, frequencies), for writing a segment"""
+        import numpy as np
+
+        terms = sorted(self.postings, key=lambda name: name.encode("utf-8"))
+        entries = [self.postings[term] for term in terms]
+        starts = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(positions) for positions, _ in entries], out=starts[1:])
+        positions = np.fromiter(chain.from_iterable(entry[0] for entry in entries), dtype=np.uint32,
+                                count=int(starts[-1]))
+        frequencies = np.fromiter(chain.from_iterable(entry[1] for entry in entries), dtype=np.int64,
+                                  count=int(starts[-1]))
+        return ([term.encode("utf-8") for term in terms], starts, positions,
+                np.minimum(frequencies, 0xFFFF).astype(np.uint16))
+
+
+class _DiskSegment:
+    """
+    Immutable segment file, memory-mapped
+
+    Terms are sorted, so a lookup is a binary search over the term offsets
+    and a prefix is one contiguous range; postings are zero-copy numpy views.
+    """
+
+    def __init__(self, path: str):
+        import numpy as np
+
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, docs, terms, postings, term_bytes, self.total_length = SEGMENT_HEADER.unpack_from(self._map, 0)
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"{path} is not a text index segment")
+        offset = SEGMENT_HEADER.size
+
+        def view(dtype, count):
+            nonlocal offset
+            array = np.frombuffer(self._map, dtype=dtype, count=count, offset=offset)
+            offset += array.nbytes
+            return array
+
+        self.doc_ids = view("<i8", docs)
+        self.posting_starts = view("<u4", terms + 1)
+        self.term_offsets = view("<u4", terms + 1)
+        self.doc_lengths = view("<u4", docs)
+        self.postings = view("<u4", postings)
+        self.frequencies = view("<u2", postings)
+        self._terms = memoryview(self._map)[offset:offset + term_bytes]
+        # Plain-int views for the binary search (numpy scalars are slow to index one by one)
+        self._offsets = memoryview(self.term_offsets).cast("B").cast("I")
+        self.term_count = terms
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def _term(self, index: int) -> bytes:
+        offsets = self._offsets
+        return self._terms[offsets[index]:offsets[index + 1]].tobytes()
+
+    def _lower_bound(self, term: bytes) -> int:
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._term(middle) < term:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def expansions(self, prefix: str, limit: int) -> List[str]:
+        import numpy as np
+
+        key = prefix.encode("utf-8")
+        low = self._lower_bound(key)
+        # Terms sharing the prefix end before the first term >= prefix + 0xFF
+        high = self._lower_bound(key + b"\xff")
+        indexes = range(low, high)
+        if high - low > limit:
+            frequencies = np.diff(self.posting_starts[low:high + 1].astype(np.int64))
+            indexes = (low + np.argpartition(frequencies, -limit)[-limit:]).tolist()
+        return [self._term(index).decode("utf-8") for index in indexes]
+
+    def lookup(self, term: str) -> Optional[Tuple[Any, Any]]:
+        key = term.encode("utf-8")
+        index = self._lower_bound(key)
+        if index == self.term_count or self._term(index) != key:
+            return None
+        start, end = int(self.posting_starts[index]), int(self.posting_starts[index + 1])
+        return self.postings[start:end], self.frequencies[start:end]
+
+    def documents(self):
+        return self.doc_ids, self.doc_lengths
+
+    def postings_arrays(self):
+        offsets = self.term_offsets.tolist()
+        terms = bytes(self._terms)
+        return ([terms[offsets[index]:offsets[index + 1]] for index in range(self.term_count)],
+                self.posting_starts.astype("int64"), self.postings, self.frequencies)
+
+
+def _write_segment(path: str, segments: List[Any]) -> None:
+    """
+    Write one segment file holding the documents of `segments`, in order
+
+    Terms are merged across the inputs in byte order. Postings are gathered
+    with one vectorized index instead of per term; each input's doc
+    positions are shifted past the documents before it, so they stay sorted.
+    """
+    import numpy as np
+
+    doc_ids, doc_lengths = zip(*(segment.documents() for segment in segments))
+    inputs = [segment.postings_arrays() for segment in segments]
+    if len(inputs) == 1:
+        terms, posting_starts, positions, frequencies = inputs[0]
+    else:
+        # Each input's postings, shifted, laid end to end; an input term's postings are one range of them
+        shifts = np.cumsum([0] + [len(ids) for ids in doc_ids[:-1]])
+        bases = np.cumsum([0] + [len(entry[2]) for entry in inputs[:-1]])
+        all_positions = np.concatenate([entry[2].astype(np.uint32) + np.uint32(shift)
+                                        for entry, shift in zip(inputs, shifts)])
+        all_frequencies = np.concatenate([entry[3] for entry in inputs])
+
+        terms, term_numbers, sources, indexes = [], [], [], []
+        for term, source, index in heapq.merge(*(zip(entry[0], repeat(number), range(len(entry[0])))
+                                                 for number, entry in enumerate(inputs))):
+            if not terms or terms[-1] != term:
+                terms.append(term)
+            term_numbers.append(len(terms) - 1)
+            sources.append(source)
+            indexes.append(index)
+        sources, indexes = np.array(sources, dtype=np.int64), np.array(indexes, dtype=np.int64)
+        range_starts = np.empty(len(indexes), dtype=np.int64)
+        lengths = np.empty(len(indexes), dtype=np.int64)
+        for number, entry in enumerate(inputs):
+            mask = sources == number
+            starts = entry[1]
+            range_starts[mask] = bases[number] + starts[indexes[mask]]
+            lengths[mask] = starts[indexes[mask] + 1] - starts[indexes[mask]]
+        gather = np.repeat(range_starts - np.cumsum(lengths) + lengths, lengths) + np.arange(int(lengths.sum()))
+        positions, frequencies = all_positions[gather], all_frequencies[gather]
+        posting_starts = np.zeros(len(terms) + 1, dtype=np.int64)
+        counts = np.bincount(np.array(term_numbers, dtype=np.int64), weights=lengths, minlength=len(terms))
+        np.cumsum(counts.astype(np.int64), out=posting_starts[1:])
+
+    term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    np.cumsum([len(term) for term in terms], out=term_offsets[1:])
+    term_bytes = b"".join(terms)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, sum(len(ids) for ids in doc_ids), len(terms), len(positions),
+                                    len(term_bytes), sum(segment.total_length for segment in segments)))
+        f.write(np.concatenate(doc_ids).astype("<i8").tobytes())
+        f.write(posting_starts.astype("<u4").tobytes())
+        f.write(term_offsets.astype("<u4").tobytes())
+        f.write(np.concatenate(doc_lengths).astype("<u4").tobytes())
+        f.write(positions.astype("<u4").tobytes())
+        f.write(frequencies.astype("<u2").tobytes())
+        f.write(term_bytes)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+class TextIndex:
+    """
+    Inverted index over the OCR text of every stored transaction
+
+    A transaction's invoice and PO text form one document, found by its
+    transaction id. New documents go to an in-memory segment; every
+    TEXT_INDEX_FLUSH_DOCS documents it is written out by a background thread
+    as an immutable segment file, and segments of similar size are merged
+    TEXT_INDEX_MERGE_FACTOR at a time (up to TEXT_INDEX_MAX_MERGE_DOCS
+    documents), so a query touches a few segments however large the
+    history. Segment files are memory-mapped: opening the index maps the
+    files listed in the manifest without reading them, and the pages a
+    query touches are loaded on demand.
+
+    Documents not yet written to a segment when the process stopped are
+    re-indexed from the RawTextStore when the index is opened.
+
+    Queries match every term (prefix terms match any term starting with
+    them) and rank documents by BM25.
+    """
+
+    def __init__(self, directory: Optional[str] = None, text_store: Optional[RawTextStore] = None,
+                 flush_docs: Optional[int] = None, merge_factor: Optional[int] = None,
+                 max_merge_docs: Optional[int] = None):
+        self.directory = directory or settings.TEXT_INDEX_DIR
+        self.text_store = text_store
+        self.flush_docs = flush_docs or settings.TEXT_INDEX_FLUSH_DOCS
+        self.merge_factor = max(2, merge_factor or settings.TEXT_INDEX_MERGE_FACTOR)
+        self.max_merge_docs = max_merge_docs or settings.TEXT_INDEX_MAX_MERGE_DOCS
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._segments: List[_DiskSegment] = []
+        self._frozen: List[_MemorySegment] = []  # full in-memory segments waiting to be written
+        self._delta = _MemorySegment()
+        self._maintaining = False
+        self._idle = threading.Condition(self._lock)
+        self._recovered: set = set()  # newest ids indexed by _catch_up, which a racing add() must skip
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _segment_files(self) -> List[str]:
+        try:
+            return [name for name in os.listdir(self.directory) if name.startswith(SEGMENT_PREFIX)]
+        except FileNotFoundError:
+            return []
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            try:
+                with open(self._path(MANIFEST_FILE), "r", encoding="utf-8") as f:
+                    names = json.load(f)["segments"]
+            except FileNotFoundError:
+                names = []
+            segments = []
+            for name in names:
+                try:
+                    segments.append(_DiskSegment(self._path(name)))
+                except (OSError, ValueError) as e:
+                    logger.error("Text index segment %s unreadable, re-indexing its documents: %s", name, e)
+            # Written but never listed (a crash before the manifest was updated)
+            for name in set(self._segment_files()) - set(names):
+                _remove(self._path(name))
+            self._segments = segments
+            self._loaded = True
+        self._catch_up()
+
+    def _catch_up(self) -> None:
+        """Index stored texts that no segment holds (unflushed at shutdown, or the index was removed)"""
+        if self.text_store is None:
+            return
+        import numpy as np
+
+        indexed = np.concatenate([segment.doc_ids for segment in self._segments]) if self._segments \
+            else np.zeros(0, dtype=np.int64)
+        stored = np.frombuffer(self.text_store.transaction_ids(), dtype=np.int64)
+        missing = np.setdiff1d(stored, indexed, assume_unique=True)
+        if not len(missing):
+            return
+        logger.info("Indexing %d stored documents missing from the text index", len(missing))
+        wanted = set(missing.tolist())
+        # An upload storing its text while this runs may be indexed here and by its own add()
+        self._recovered = set(missing[-1000:].tolist())
+        for transaction_id, invoice_payload, po_payload in self.text_store.iter_compressed(int(missing[0]) - 1):
+            if transaction_id in wanted:
+                self._index(transaction_id, (decompress_text(invoice_payload), decompress_text(po_payload)))
+
+    def add(self, transaction_id: int, texts: Iterable[Optional[str]]) -> None:
+        """
+        Index the texts of one transaction
+
+        Args:
+            transaction_id: Id assigned by storage
+            texts: Invoice and PO text (None where missing)
+        """
+        self._ensure_loaded()
+        if transaction_id in self._recovered:
+            return
+        self._index(transaction_id, texts)
+
+    def _index(self, transaction_id: int, texts: Iterable[Optional[str]]) -> None:
+        terms = []
+        for text in texts:
+            if text:
+                terms.extend(tokenize(text))
+        if not terms:
+            return
+        with self._lock:
+            self._delta.add(transaction_id, terms)
+            if len(self._delta) >= self.flush_docs:
+                self._frozen.append(self._delta)
+                self._delta = _MemorySegment()
+                self._schedule()
+
+    def _schedule(self) -> None:
+        """Start the background writer unless it is running (lock held)"""
+        if not self._maintaining:
+            self._maintaining = True
+            threading.Thread(target=self._maintain, name="text-index", daemon=True).start()
+
+    def _merge_candidates(self) -> List[_DiskSegment]:
+        """merge_factor segments of the smallest size tier that has that many (lock held)"""
+        tiers: Dict[int, List[_DiskSegment]] = {}
+        for segment in self._segments:
+            tier = int(math.log(max(1, len(segment)) / self.flush_docs, self.merge_factor)) \
+                if len(segment) > self.flush_docs else 0
+            tiers.setdefault(tier, []).append(segment)
+        for tier in sorted(tiers):
+            group = tiers[tier][:self.merge_factor]
+            if len(group) == self.merge_factor and sum(len(segment) for segment in group) <= self.max_merge_docs:
+                return group
+        return []
+
+    def _maintain(self) -> None:
+        """Write frozen segments out and merge, until there is nothing left to do"""
+        while True:
+            with self._lock:
+                frozen = self._frozen[0] if self._frozen else None
+                merging = [] if frozen is not None else self._merge_candidates()
+                if frozen is None and not merging:
+                    self._maintaining = False
+                    self._idle.notify_all()
+                    return
+            try:
+                path = self._path(f"{SEGMENT_PREFIX}{uuid.uuid4().hex}{SEGMENT_SUFFIX}")
+                _write_segment(path, [frozen] if frozen is not None else merging)
+                segment = _DiskSegment(path)
+            except Exception:
+                logger.exception("Text index segment write failed")
+                with self._lock:
+                    self._maintaining = False
+                    self._idle.notify_all()
+                return
+            with self._lock:
+                if frozen is not None:
+                    if frozen not in self._frozen:  # cleared meanwhile
+                        _remove(path)
+                        continue
+                    self._frozen.remove(frozen)
+                    self._segments.append(segment)
+                else:
+                    if any(old not in self._segments for old in merging):
+                        _remove(path)
+                        continue
+                    position = self._segments.index(merging[0])
+                    self._segments = [old for old in self._segments if old not in merging]
+                    self._segments.insert(position, segment)
+                self._write_manifest()
+            # Queries holding the old segments keep their mappings; the files go now
+            for old in merging:
+                _remove(old.path)
+
+    def _write_manifest(self) -> None:
+        temporary = self._path(MANIFEST_FILE + ".tmp")
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"segments": [os.path.basename(segment.path) for segment in self._segments]}, f)
+        os.replace(temporary, self._path(MANIFEST_FILE))
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Write every indexed document to segment files and wait for the writer"""
+        self._ensure_loaded()
+        with self._lock:
+            if len(self._delta):
+                self._frozen.append(self._delta)
+                self._delta = _MemorySegment()
+            if self._frozen:
+                self._schedule()
+            self._idle.wait_for(lambda: not self._maintaining, timeout)
+
+    def search(self, query: str, limit: int = 10, prefix: bool = False) -> Dict[str, Any]:
+        """
+        Documents containing every query term, best first
+
+        Args:
+            query: Words, numbers or ids; a trailing "*" makes a word a prefix
+            limit: Maximum number of results
+            prefix: Treat the last word as a prefix (search-as-you-type)
+
+        Returns:
+            {"terms": parsed terms, "total": matching documents,
+             "results": [{"transaction_id", "score"}]}
+        """
+        import numpy as np
+
+        self._ensure_loaded()
+        terms = parse_query(query, prefix)
+        response: Dict[str, Any] = {"terms": [term + ("*" if is_prefix else "") for term, is_prefix in terms],
+                                    "total": 0, "results": []}
+        if not terms:
+            return response
+        expansions = settings.TEXT_INDEX_MAX_EXPANSIONS
+
+        # Postings per segment and query term. A prefix expands to the terms most
+        # frequent in any segment, ranked by their frequency over all segments.
+        with self._lock:
+            segments = list(self._segments) + list(self._frozen) + [self._delta]
+            names = [self._expand(segments, term, expansions) if is_prefix else [term] for term, is_prefix in terms]
+            found = [[[(name,) + postings for name in term_names if (postings := segment.lookup(name)) is not None]
+                      for term_names in names]
+                     for segment in segments]
+        document_count = sum(len(segment) for segment in segments)
+        if not document_count:
+            return response
+        average_length = max(1.0, sum(segment.total_length for segment in segments) / document_count)
+        frequencies: Dict[str, int] = {}
+        for per_term in found:
+            for matches in per_term:
+                for name, postings, _ in matches:
+                    frequencies[name] = frequencies.get(name, 0) + len(postings)
+        idf = {name: math.log(1 + (document_count - df + 0.5) / (df + 0.5)) for name, df in frequencies.items()}
+
+        scores, ids = [], []
+        for segment, per_term in zip(segments, found):
+            if not all(per_term):
+                continue
+            doc_ids, doc_lengths = segment.documents()
+            candidates = candidate_scores = None
+            # Rarest term first: every later intersection only shrinks the candidates
+            for matches in sorted(per_term, key=lambda matches: sum(len(postings) for _, postings, _ in matches)):
+                if candidates is None:
+                    candidates, candidate_scores = _score(matches, idf, doc_lengths, average_length)
+                    continue
+                if len(matches) == 1:
+                    # One exact term: score only the postings of surviving candidates
+                    name, positions, counts = matches[0]
+                    found_at = np.searchsorted(positions, candidates)
+                    found_at[found_at == len(positions)] = 0
+                    keep = positions[found_at] == candidates
+                    found_at = found_at[keep]
+                    term_scores = _score([(name, positions[found_at], counts[found_at])], idf, doc_lengths,
+                                         average_length)[1]
+                else:
+                    positions, term_scores = _score(matches, idf, doc_lengths, average_length)
+                    found_at = np.searchsorted(positions, candidates)
+                    found_at[found_at == len(positions)] = 0
+                    keep = positions[found_at] == candidates
+                    term_scores = term_scores[found_at[keep]]
+                candidates = candidates[keep]
+                candidate_scores = candidate_scores[keep] + term_scores
+                if not len(candidates):
+                    break
+            if candidates is not None and len(candidates):
+                if len(candidates) > limit:
+                    best = np.argpartition(candidate_scores, -limit)[-limit:]
+                    response["total"] += len(candidates)
+                    candidates, candidate_scores = candidates[best], candidate_scores[best]
+                else:
+                    response["total"] += len(candidates)
+                scores.append(candidate_scores)
+                ids.append(doc_ids[candidates])
+
+        if scores:
+            scores, ids = np.concatenate(scores), np.concatenate(ids)
+            order = np.lexsort((-ids, -scores))[:limit]  # best score first, newest first among equals
+            response["results"] = [{"transaction_id": int(ids[i]), "score": round(float(scores[i]), 3)}
+                                   for i in order]
+        return response
+
+    @staticmethod
+    def _expand(segments: List[Any], prefix: str, limit: int) -> List[str]:
+        names = set()
+        for segment in segments:
+            names.update(segment.expansions(prefix, limit))
+        if len(names) <= limit:
+            return sorted(names)
+        frequency = {name: sum(len(postings[0]) for segment in segments
+                               if (postings := segment.lookup(name)) is not None)
+                     for name in names}
+        return sorted(sorted(names, key=lambda name: (-frequency[name], name))[:limit])
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        with self._lock:
+            return sum(len(segment) for segment in self._segments + self._frozen) + len(self._delta)
+
+    def stats(self) -> Dict[str, int]:
+        """Indexed documents, segment files, documents not yet written and segment bytes"""
+        self._ensure_loaded()
+        with self._lock:
+            return {
+                "documents": sum(len(segment) for segment in self._segments + self._frozen) + len(self._delta),
+                "segments": len(self._segments),
+                "unflushed": sum(len(segment) for segment in self._frozen) + len(self._delta),
+                "bytes": sum(os.path.getsize(segment.path) for segment in self._segments),
+            }
+
+    def clear(self) -> None:
+        """Delete the index (storage was reset)"""
+        with self._lock:
+            self._idle.wait_for(lambda: not self._maintaining)
+            # Every segment file, loaded or not (the index may be cleared before first use)
+            for name in self._segment_files():
+                _remove(self._path(name))
+            _remove(self._path(MANIFEST_FILE))
+            self._segments, self._frozen, self._delta = [], [], _MemorySegment()
+            self._recovered = set()
+            self._loaded = False
+
+    def close(self) -> None:
+        """Write unflushed documents out (so the next start need not re-index them)"""
+        if self._loaded:
+            self.flush()
+
+
+def _score(matches, idf: Dict[str, float], doc_lengths, average_length: float):
+    """BM25 contribution of one query term (summed over its prefix expansions) per doc position"""
+    import numpy as np
+
+    positions, scores = [], []
+    for name, postings, counts in matches:
+        counts = counts.astype(np.float64)
+        norm = K1 * (1 - B + B * doc_lengths[postings] / average_length)
+        positions.append(postings)
+        scores.append(idf[name] * counts * (K1 + 1) / (counts + norm))
+    if len(positions) == 1:
+        return positions[0], scores[0]
+    positions = np.concatenate(positions)
+    unique, inverse = np.unique(positions, return_inverse=True)
+    return unique, np.bincount(inverse, weights=np.concatenate(scores))
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:  # e.g. still mapped on Windows
+        logger.warning("Could not remove %s: %s", path, e)
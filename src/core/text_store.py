@@ -0,0 +1,264 @@
+"""
+Raw Text Store
+Full OCR text of every stored transaction, compressed on disk for offline reprocessing
+"""
+
+import logging
+import os
+import struct
+import threading
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, Optional, Tuple
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Document frame: compressed length (u32) + CRC32 of the compressed bytes (u32), then the bytes
+DOCUMENT_HEADER = struct.Struct("<II")
+# Transaction entry: id, invoice document offset, PO document offset (-1 = no text)
+TRANSACTION_ENTRY = struct.Struct("<qqq")
+# Content-addressed document entry: document id (file digest), document offset
+NAMED_ENTRY = struct.Struct("<32sq")
+
+DOCUMENTS_FILE = "documents.log"
+TRANSACTIONS_FILE = "transactions.idx"
+NAMED_FILE = "documents.idx"
+
+NO_TEXT = -1
+
+
+def decompress_text(payload: Optional[bytes]) -> Optional[str]:
+    """Text of a compressed document payload (None stays None)"""
+    return zlib.decompress(payload).decode("utf-8") if payload is not None else None
+
+
+class RawTextStore:
+    """
+    OCR text of invoice and PO documents, keyed by transaction id
+
+    Texts are zlib-compressed one document at a time (a one-page OCR
+    response roughly halves) and appended as checksummed frames to one
+    document log. Two fixed-size index files point into it:
+
+    - transactions.idx: (transaction id, invoice offset, PO offset)
+    - documents.idx: (document id, offset) for documents stored under their
+      content hash (POs), so a PO shared by many invoices is stored once and
+      its text is found again after a restart, when the PO pool no longer
+      holds it
+
+    Both indexes are read into memory on first use (24 bytes per
+    transaction); reading a text costs one seek and one decompression.
+    Documents are written before the entries pointing at them, so a crash
+    leaves at most unreferenced bytes, and entries past the end of the
+    document log (torn writes) are dropped on load.
+    """
+
+    def __init__(self, directory: Optional[str] = None, compression_level: Optional[int] = None):
+        self.directory = directory or settings.RAW_TEXT_DIR
+        self.compression_level = (settings.RAW_TEXT_COMPRESSION_LEVEL if compression_level is None
+                                  else compression_level)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._documents = None  # append handle of the document log
+        self._size = 0  # document log length
+        self._ids = array("q")  # transaction ids, ascending
+        self._invoice_offsets = array("q")
+        self._po_offsets = array("q")
+        self._named: Dict[str, int] = {}  # document id -> offset
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._documents = open(self._path(DOCUMENTS_FILE), "ab")
+            self._size = self._documents.tell()
+            entries = []
+            for transaction_id, invoice_offset, po_offset in self._read_entries(TRANSACTIONS_FILE, TRANSACTION_ENTRY):
+                if invoice_offset < self._size and po_offset < self._size:
+                    entries.append((transaction_id, invoice_offset, po_offset))
+            entries.sort()  # concurrent uploads may append slightly out of id order
+            for transaction_id, invoice_offset, po_offset in entries:
+                self._ids.append(transaction_id)
+                self._invoice_offsets.append(invoice_offset)
+                self._po_offsets.append(po_offset)
+            for document_id, offset in self._read_entries(NAMED_FILE, NAMED_ENTRY):
+                if offset < self._size:
+                    self._named[document_id.decode("ascii")] = offset
+            self._loaded = True
+            logger.info("Raw text store opened", extra={
+                "transactions": len(self._ids), "documents_bytes": self._size,
+            })
+
+    def _read_entries(self, name: str, entry: struct.Struct) -> Iterator[tuple]:
+        try:
+            with open(self._path(name), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        usable = len(data) - len(data) % entry.size  # drop a torn final entry
+        yield from entry.iter_unpack(data[:usable])
+
+    def _append_entry(self, name: str, data: bytes) -> None:
+        with open(self._path(name), "ab") as f:
+            f.write(data)
+
+    def _append_document(self, text: str) -> int:
+        """Compress and append one text (lock held); returns its offset"""
+        payload = zlib.compress(text.encode("utf-8"), self.compression_level)
+        offset = self._size
+        self._documents.write(DOCUMENT_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._documents.flush()
+        self._size += DOCUMENT_HEADER.size + len(payload)
+        return offset
+
+    def _document_offset(self, text: Optional[str], document_id: Optional[str]) -> int:
+        """Offset of a (possibly content-addressed) document, appending it if new (lock held)"""
+        if document_id and document_id in self._named:
+            return self._named[document_id]
+        if not text:
+            return NO_TEXT
+        offset = self._append_document(text)
+        if document_id:
+            self._named[document_id] = offset
+            self._append_entry(NAMED_FILE, NAMED_ENTRY.pack(document_id.encode("ascii"), offset))
+        return offset
+
+    def add_document(self, document_id: str, text: Optional[str]) -> None:
+        """
+        Store a document's text under its content hash (no-op if already stored)
+
+        Args:
+            document_id: Content hash of the source file (see po_pool.file_digest)
+            text: Full OCR text
+        """
+        self._ensure_loaded()
+        with self._lock:
+            self._document_offset(text, document_id)
+
+    def add(self, transaction_id: int, invoice_text: Optional[str], po_text: Optional[str],
+            po_id: Optional[str] = None) -> None:
+        """
+        Store the texts a transaction was extracted from
+
+        Args:
+            transaction_id: Id assigned by storage
+            invoice_text: Full OCR text of the invoice
+            po_text: Full OCR text of the PO (may be None for a pooled PO
+                whose text was stored under po_id when it was first OCR'd)
+            po_id: Content hash of the PO document
+        """
+        self._ensure_loaded()
+        with self._lock:
+            invoice_offset = self._document_offset(invoice_text, None)
+            po_offset = self._document_offset(po_text, po_id)
+            if invoice_offset == NO_TEXT and po_offset == NO_TEXT:
+                return
+            self._append_entry(TRANSACTIONS_FILE, TRANSACTION_ENTRY.pack(transaction_id, invoice_offset, po_offset))
+            position = bisect_right(self._ids, transaction_id)
+            self._ids.insert(position, transaction_id)
+            self._invoice_offsets.insert(position, invoice_offset)
+            self._po_offsets.insert(position, po_offset)
+
+    def _read_payload(self, f, offset: int) -> Optional[bytes]:
+        if offset == NO_TEXT:
+            return None
+        f.seek(offset)
+        length, checksum = DOCUMENT_HEADER.unpack(f.read(DOCUMENT_HEADER.size))
+        payload = f.read(length)
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            logger.error("Corrupt raw text document at offset %d", offset)
+            return None
+        return payload
+
+    def texts(self, transaction_id: int) -> Optional[Tuple[Optional[str], Optional[str]]]:
+        """
+        Invoice and PO text of one transaction
+
+        Returns:
+            (invoice text, PO text), either None if it was not captured, or
+            None if nothing is stored for the transaction
+        """
+        self._ensure_loaded()
+        with self._lock:
+            position = bisect_left(self._ids, transaction_id)
+            if position == len(self._ids) or self._ids[position] != transaction_id:
+                return None
+            offsets = self._invoice_offsets[position], self._po_offsets[position]
+        with open(self._path(DOCUMENTS_FILE), "rb") as f:
+            return tuple(decompress_text(self._read_payload(f, offset)) for offset in offsets)
+
+    def iter_compressed(self, after_id: int = 0,
+                        until_id: Optional[int] = None) -> Iterator[Tuple[int, Optional[bytes], Optional[bytes]]]:
+        """
+        Compressed texts of stored transactions, in id order
+
+        Payloads are left compressed so they can be handed to worker
+        processes cheaply; decompress_text() restores them.
+
+        Args:
+            after_id: Only transactions with a larger id
+            until_id: Only transactions up to this id
+
+        Yields:
+            (transaction id, invoice payload, PO payload)
+        """
+        self._ensure_loaded()
+        with self._lock:
+            start = bisect_right(self._ids, after_id)
+            stop = len(self._ids) if until_id is None else bisect_right(self._ids, until_id)
+            ids = self._ids[start:stop]
+            invoice_offsets = self._invoice_offsets[start:stop]
+            po_offsets = self._po_offsets[start:stop]
+        with open(self._path(DOCUMENTS_FILE), "rb") as f:
+            for transaction_id, invoice_offset, po_offset in zip(ids, invoice_offsets, po_offsets):
+                yield transaction_id, self._read_payload(f, invoice_offset), self._read_payload(f, po_offset)
+
+    def transaction_ids(self) -> array:
+        """Ids of the transactions with stored text, ascending (a copy)"""
+        self._ensure_loaded()
+        with self._lock:
+            return array("q", self._ids)
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._ids)
+
+    def stats(self) -> Dict[str, int]:
+        """Stored transactions, content-addressed documents and document log size"""
+        self._ensure_loaded()
+        with self._lock:
+            return {"transactions": len(self._ids), "named_documents": len(self._named), "bytes": self._size}
+
+    def clear(self) -> None:
+        """Delete all stored text (storage was reset)"""
+        with self._lock:
+            if self._documents is not None:
+                self._documents.close()
+                self._documents = None
+            for name in (DOCUMENTS_FILE, TRANSACTIONS_FILE, NAMED_FILE):
+                try:
+                    os.remove(self._path(name))
+                except FileNotFoundError:
+                    pass
+            self._ids, self._invoice_offsets, self._po_offsets = array("q"), array("q"), array("q")
+            self._named = {}
+            self._size = 0
+            self._loaded = False
+
+    def close(self) -> None:
+        with self._lock:
+            if self._documents is not None:
+                self._documents.close()
+                self._documents = None
+            self._loaded = False
+            self._ids, self._invoice_offsets, self._po_offsets = array("q"), array("q"), array("q")
+            self._named = {}
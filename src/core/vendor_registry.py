@@ -0,0 +1,214 @@
+"""
+Vendor Registry
+Canonical supplier list with an n-gram index for fast fuzzy name lookup
+"""
+
+import csv
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from src.core.config import settings
+from src.core.query import normalize_vendor
+from src.core.similarity import ratio
+
+logger = logging.getLogger(__name__)
+
+# Legal-form words dropped from the end of names ("ABC Pvt. Ltd." -> "abc")
+LEGAL_SUFFIXES = frozenset({
+    "pvt", "private", "ltd", "limited", "inc", "incorporated", "llp", "llc",
+    "corp", "corporation", "co", "company", "plc", "gmbh", "pte", "pty",
+})
+
+# Candidates kept from the n-gram ranking for exact rescoring
+_RESCORE_CANDIDATES = 64
+
+
+def canonical_vendor_key(name: Optional[str]) -> str:
+    """
+    Normalize a vendor name for registry matching
+
+    Lowercases, strips punctuation and trailing legal-form words (Pvt, Ltd,
+    Inc, ...); a name made only of such words is kept as is.
+    """
+    words = normalize_vendor(name).split()
+    end = len(words)
+    while end > 1 and words[end - 1] in LEGAL_SUFFIXES:
+        end -= 1
+    return " ".join(words[:end])
+
+
+def _trigrams(key: str) -> List[str]:
+    padded = f" {key} "
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+class VendorMatch(NamedTuple):
+    """One registry candidate for a vendor name"""
+
+    vendor_id: str
+    name: str
+    score: int  # fuzz.ratio of the normalized names (0-100)
+
+
+class VendorRegistry:
+    """
+    Canonical vendors loaded from a CSV file (vendor_id, name, aliases)
+
+    Each name and alias is normalized with canonical_vendor_key() and split
+    into character trigrams. A trigram -> entries inverted index finds the
+    entries sharing the most trigrams with a query (candidate blocking), and
+    only those few are rescored with fuzz.ratio, so a lookup never scans the
+    whole list. Aliases are separated by "|".
+
+    The file is read on first use; reload() swaps in a fresh index atomically.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._index: Optional[_TrigramIndex] = None
+
+    def _load(self) -> "_TrigramIndex":
+        index = _TrigramIndex()
+        if self.path and os.path.exists(self.path):
+            with open(self.path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    vendor_id, name = (row.get("vendor_id") or "").strip(), (row.get("name") or "").strip()
+                    if vendor_id and name:
+                        index.add(vendor_id, name, (row.get("aliases") or "").split("|"))
+            logger.info("Vendor registry loaded", extra={"vendors": len(index.vendor_ids), "path": self.path})
+        elif self.path:
+            logger.info("No vendor registry at %s; canonical vendor ids disabled", self.path)
+        index.freeze()
+        return index
+
+    def _ready(self) -> "_TrigramIndex":
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._load()
+                index = self._index
+        return index
+
+    def reload(self) -> int:
+        """Re-read the registry file; returns the number of vendors"""
+        index = self._load()
+        self._index = index
+        return len(index.vendor_ids)
+
+    def add(self, vendor_id: str, name: str, aliases: Iterable[str] = ()) -> None:
+        """Register one vendor (in addition to the file's contents)"""
+        index = self._ready()
+        with self._lock:
+            index.add(vendor_id, name, aliases)
+            index.freeze()
+
+    def __len__(self) -> int:
+        return len(self._ready().vendor_ids)
+
+    def lookup(self, name: Optional[str], top: int = 5) -> List[VendorMatch]:
+        """
+        Best canonical vendors for a (possibly OCR-garbled) name
+
+        Args:
+            name: Vendor name as extracted from a document
+            top: Maximum number of vendors to return
+
+        Returns:
+            Up to `top` matches, best first (one per vendor)
+        """
+        return self._ready().lookup(canonical_vendor_key(name), top)
+
+    def resolve(self, name: Optional[str], threshold: int = None) -> Optional[VendorMatch]:
+        """
+        The canonical vendor for a name, if one is similar enough
+
+        Args:
+            name: Vendor name as extracted from a document
+            threshold: Minimum score (defaults to settings.VENDOR_FUZZY_THRESHOLD)
+
+        Returns:
+            Best match, or None
+        """
+        if threshold is None:
+            threshold = settings.VENDOR_FUZZY_THRESHOLD
+        matches = self.lookup(name, top=1)
+        return matches[0] if matches and matches[0].score >= threshold else None
+
+
+class _TrigramIndex:
+    """Entries (names and aliases) with trigram postings; see VendorRegistry"""
+
+    def __init__(self):
+        self.vendor_ids: List[str] = []
+        self.vendor_names: List[str] = []
+        self._vendor_positions: Dict[str, int] = {}
+        self.keys: List[str] = []  # normalized name per entry
+        self.entry_vendor: List[int] = []  # vendor position per entry
+        self._grams: Dict[str, List[int]] = {}
+        self._gram_counts: List[int] = []
+        self._exact: Dict[str, int] = {}  # normalized name -> entry
+        self._postings = {}
+        self._sizes = None
+
+    def add(self, vendor_id: str, name: str, aliases: Iterable[str] = ()) -> None:
+        vendor = self._vendor_positions.get(vendor_id)
+        if vendor is None:
+            vendor = self._vendor_positions[vendor_id] = len(self.vendor_ids)
+            self.vendor_ids.append(vendor_id)
+            self.vendor_names.append(name)
+
+        for alias in (name, *aliases):
+            key = canonical_vendor_key(alias)
+            if not key or key in self._exact:
+                continue
+            entry = len(self.keys)
+            self._exact[key] = entry
+            self.keys.append(key)
+            self.entry_vendor.append(vendor)
+            grams = _trigrams(key)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._grams.setdefault(gram, []).append(entry)
+
+    def freeze(self) -> None:
+        """Convert postings to NumPy arrays for lookups"""
+        if not self.keys:
+            return
+        import numpy as np
+
+        # Sizes first: a concurrent lookup must never see postings for entries it has no size for
+        self._sizes = np.array(self._gram_counts, dtype=np.float32)
+        self._postings = {gram: np.array(entries, dtype=np.int32) for gram, entries in self._grams.items()}
+
+    def lookup(self, key: str, top: int) -> List[VendorMatch]:
+        if not key or not self._postings:
+            return []
+        import numpy as np
+
+        grams = _trigrams(key)
+        postings = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not postings:
+            return []
+
+        # Shared-trigram counts per entry; entries sharing under half as many
+        # trigrams as the best one cannot score well, so only the rest are ranked
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.keys))
+        entries = np.flatnonzero(shared >= max(1, shared.max() // 2))
+        dice = shared[entries] / (self._sizes[entries] + len(grams))
+        if len(entries) > _RESCORE_CANDIDATES:
+            best = np.argpartition(-dice, _RESCORE_CANDIDATES)[:_RESCORE_CANDIDATES]
+            entries = entries[best]
+
+        scores: Dict[int, int] = {}
+        for entry in entries.tolist():
+            score = ratio(key, self.keys[entry])
+            vendor = self.entry_vendor[entry]
+            if score > scores.get(vendor, -1):
+                scores[vendor] = score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top]
+        return [VendorMatch(self.vendor_ids[vendor], self.vendor_names[vendor], score) for vendor, score in ranked]
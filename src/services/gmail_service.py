@@ -5,17 +5,21 @@ Automatically fetch invoices from Gmail and process them
 
 import os
 import base64
+import logging
 import pickle
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 
 from src.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+
+def _http_error():
+    """Google API error class, imported on first use (the client stack is slow to import)"""
+    from googleapiclient.errors import HttpError
+    return HttpError
+
 
 class GmailService:
     """Gmail integration for invoice fetching"""
@@ -28,6 +32,10 @@ class GmailService:
 
     def authenticate(self) -> None:
         """Authenticate with Gmail API"""
+        from google.auth.transport.requests import Request
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build
+
         creds = None
 
         if os.path.exists('token.pickle'):
@@ -39,7 +47,7 @@ class GmailService:
                 creds.refresh(Request())
             else:
                 if not os.path.exists(self.credentials_path):
-                    print(f"❌ Gmail credentials not found: {self.credentials_path}")
+                    logger.error("Gmail credentials not found: %s", self.credentials_path)
                     return
 
                 flow = InstalledAppFlow.from_client_secrets_file(
@@ -51,7 +59,7 @@ class GmailService:
                 pickle.dump(creds, token)
 
         self.service = build('gmail', 'v1', credentials=creds)
-        print("✅ Gmail API authenticated")
+        logger.info("Gmail API authenticated")
 
     def search_emails(self, query: str = None, max_results: int = None) -> List[Dict[str, Any]]:
         """Search for emails matching query"""
@@ -71,12 +79,12 @@ class GmailService:
             ).execute()
 
             messages = results.get('messages', [])
-            print(f"📧 Found {len(messages)} emails matching query")
+            logger.info("Found %d emails matching query", len(messages))
 
             return messages
 
-        except HttpError as error:
-            print(f"❌ Gmail API error: {error}")
+        except _http_error() as error:
+            logger.error("Gmail API error: %s", error)
             return []
 
     def get_email_details(self, message_id: str) -> Optional[Dict[str, Any]]:
@@ -90,8 +98,8 @@ class GmailService:
 
             return message
 
-        except HttpError as error:
-            print(f"❌ Error fetching email {message_id}: {error}")
+        except _http_error() as error:
+            logger.error("Error fetching email %s: %s", message_id, error)
             return None
 
     def download_attachment(self, message_id: str, attachment_id: str,
@@ -115,12 +123,12 @@ class GmailService:
             with open(filepath, 'wb') as f:
                 f.write(file_data)
 
-            print(f"📎 Downloaded: {filename}")
+            logger.info("Downloaded attachment: %s", filename)
 
             return filepath
 
-        except HttpError as error:
-            print(f"❌ Error downloading attachment: {error}")
+        except _http_error() as error:
+            logger.error("Error downloading attachment: %s", error)
             return None
 
     def fetch_invoice_attachments(self, query: str = None, max_emails: int = None,
@@ -134,7 +142,7 @@ class GmailService:
         messages = self.search_emails(query, max_emails)
 
         if not messages:
-            print("📭 No emails found")
+            logger.info("No emails found")
             return downloaded_files
 
         for msg in messages:
@@ -147,7 +155,7 @@ class GmailService:
             headers = email.get('payload', {}).get('headers', [])
             subject = next((h['value'] for h in headers if h['name'] == 'Subject'), 'Unknown')
 
-            print(f"\n📧 Email: {subject[:50]}...")
+            logger.debug("Email: %s", subject[:50])
 
             parts = email.get('payload', {}).get('parts', [])
 
@@ -168,7 +176,7 @@ class GmailService:
                         if filepath:
                             downloaded_files.append(filepath)
 
-        print(f"\n✅ Downloaded {len(downloaded_files)} attachments")
+        logger.info("Downloaded %d attachments", len(downloaded_files))
 
         return downloaded_files
 
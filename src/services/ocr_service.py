@@ -5,15 +5,17 @@ OCR-based data extraction using Shivaay AI Vision API
 
 import os
 import re
+import logging
 import base64
-import requests
-from typing import Dict, Any, Optional
+from typing import List, Optional
 from datetime import datetime
-from pdf2image import convert_from_path
-from PIL import Image
 from pathlib import Path
 
 from src.core.config import settings
+from src.core.records import ExtractionResult, LineItem
+from src.utils.metrics import track_stage, STAGE_LATENCY, STAGE_ERRORS, OCR_PAYLOAD_BYTES
+
+logger = logging.getLogger(__name__)
 
 
 def get_shivaay_api_key() -> str:
@@ -45,19 +47,23 @@ def convert_pdf_to_image(pdf_path: str) -> str:
     Returns:
         Path to converted image
     """
+    # pdf2image (and PIL underneath it) are only needed for PDF uploads
+    from pdf2image import convert_from_path
+
     try:
-        print(f"📄 Converting PDF to image: {pdf_path}")
-        images = convert_from_path(pdf_path, first_page=1, last_page=1, dpi=settings.OCR_DPI)
+        logger.debug("Converting PDF to image: %s", pdf_path)
+        with track_stage("pdf_conversion"):
+            images = convert_from_path(pdf_path, first_page=1, last_page=1, dpi=settings.OCR_DPI)
 
-        # Save first page as image
-        image_path = pdf_path.replace('.pdf', '_converted.png')
-        images[0].save(image_path, 'PNG')
+            # Save first page as image
+            image_path = pdf_path.replace('.pdf', '_converted.png')
+            images[0].save(image_path, 'PNG')
 
-        print(f"✅ Converted to: {image_path}")
+        logger.debug("Converted to: %s", image_path)
         return image_path
 
     except Exception as e:
-        print(f"❌ PDF conversion error: {str(e)}")
+        logger.error("PDF conversion error: %s", e)
         raise Exception(f"Failed to convert PDF: {str(e)}")
 
 
@@ -71,8 +77,10 @@ def perform_ocr_with_shivaay(image_path: str) -> tuple:
     Returns:
         Tuple of (raw_text, confidence_score, structured_data)
     """
+    import requests
+
     try:
-        print(f"🔍 Running Shivaay AI OCR on: {image_path}")
+        logger.debug("Running Shivaay AI OCR on: %s", image_path)
 
         api_key = get_shivaay_api_key()
         if not api_key:
@@ -102,7 +110,8 @@ def perform_ocr_with_shivaay(image_path: str) -> tuple:
                             2. Invoice or PO number
                             3. Date
                             4. Total amount
-                            5. All other visible text
+                            5. Every line item of the items table
+                            6. All other visible text
 
                             Format the response as:
                             VENDOR: [company name]
@@ -111,6 +120,10 @@ def perform_ocr_with_shivaay(image_path: str) -> tuple:
                             DATE: [date]
                             TOTAL: [total amount]
 
+                            LINE_ITEMS:
+                            [description] | [quantity] | [unit price] | [line amount]
+                            (one line per item in table order; leave a field empty if it is not shown)
+
                             RAW_TEXT:
                             [all extracted text]
                             """
@@ -124,16 +137,19 @@ def perform_ocr_with_shivaay(image_path: str) -> tuple:
                     ]
                 }
             ],
-            "max_tokens": 1000
+            "max_tokens": settings.OCR_MAX_TOKENS
         }
 
         # Make request to Shivaay AI
-        response = requests.post(
-            f"{settings.SHIVAAY_API_BASE}/v1/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
+        OCR_PAYLOAD_BYTES.observe(len(base64_image), direction="request")
+        with STAGE_LATENCY.time(stage="ocr"):
+            response = requests.post(
+                f"{settings.SHIVAAY_API_BASE}/v1/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=30
+            )
+        OCR_PAYLOAD_BYTES.observe(len(response.content), direction="response")
 
         if response.status_code != 200:
             raise Exception(f"Shivaay AI API error: {response.status_code} - {response.text}")
@@ -147,14 +163,15 @@ def perform_ocr_with_shivaay(image_path: str) -> tuple:
             # Estimate confidence (Shivaay AI doesn't provide explicit confidence)
             confidence = 0.90  # Default high confidence for AI-based extraction
 
-            print(f"✅ Shivaay AI OCR complete. Confidence: {confidence:.2f}")
+            logger.info("Shivaay AI OCR complete", extra={"confidence": confidence, "image": image_path})
 
             return extracted_text, confidence, result
         else:
             raise Exception("No valid response from Shivaay AI")
 
     except Exception as e:
-        print(f"❌ Shivaay AI OCR error: {str(e)}")
+        STAGE_ERRORS.inc(stage="ocr")
+        logger.error("Shivaay AI OCR error: %s", e)
         return "", 0.0, {}
 
 
@@ -305,7 +322,95 @@ def extract_po_number(text: str) -> Optional[str]:
     return None
 
 
-def extract_data_from_file(file_path: str) -> Dict[str, Any]:
+# Labels of the structured OCR response; any of them ends the LINE_ITEMS block
+_RESPONSE_LABEL = re.compile(r'^(?:VENDOR|INVOICE_NO|PO_NO|DATE|TOTAL|LINE_ITEMS|RAW_TEXT):', re.IGNORECASE)
+
+# Unlabelled table row: description, quantity, unit price, amount
+_TABLE_ROW = re.compile(
+    r'^\s*(?:\d+[.)]\s+)?([A-Za-z].*?)\s+(\d+(?:\.\d+)?)\s+[₹$€£]?\s*([0-9,]+(?:\.\d+)?)'
+    r'\s+[₹$€£]?\s*([0-9,]+(?:\.\d+)?)\s*$',
+    re.MULTILINE,
+)
+
+
+def _parse_number(cell: str) -> Optional[float]:
+    """First number in a table cell ("₹1,250.00", "10 pcs"), or None"""
+    match = re.search(r'-?[0-9][0-9,]*(?:\.\d+)?', cell)
+    if not match:
+        return None
+    try:
+        return float(match.group(0).replace(',', ''))
+    except ValueError:
+        return None
+
+
+def extract_line_items(text: str) -> List[LineItem]:
+    """
+    Extract line items (description, quantity, unit price, amount) from text
+
+    Reads the LINE_ITEMS block of the Shivaay AI response, one "|"-separated
+    row per item. Without that block, falls back to table rows in the raw
+    text whose quantity x unit price equals the amount.
+    """
+    lines = text.split('\n')
+    start = next((number for number, line in enumerate(lines)
+                  if line.strip().upper().startswith('LINE_ITEMS:')), None)
+
+    if start is not None:
+        items = []
+        for line in lines[start + 1:]:
+            line = line.strip()
+            if not line:
+                if items:
+                    break
+                continue
+            if _RESPONSE_LABEL.match(line):
+                break
+            cells = [cell.strip() for cell in line.strip('|').split('|')]
+            if len(cells) < 2:
+                continue
+            numbers = [_parse_number(cell) for cell in cells[1:4]]
+            # Header and separator rows carry no numbers
+            if not cells[0] or all(number is None for number in numbers):
+                continue
+            items.append(LineItem(cells[0], *numbers))
+        return items
+
+    items = []
+    for match in _TABLE_ROW.finditer(text):
+        description, quantity, unit_price, amount = match.groups()
+        quantity, unit_price, amount = (float(value.replace(',', '')) for value in (quantity, unit_price, amount))
+        if abs(quantity * unit_price - amount) <= max(0.01, amount * 0.005):
+            items.append(LineItem(description.strip(), quantity, unit_price, amount))
+    return items
+
+
+def extract_fields(raw_text: str, confidence: float = 0) -> ExtractionResult:
+    """
+    Run the field extractors over OCR text (no network calls)
+
+    Used for fresh OCR output and to reprocess stored text offline.
+
+    Args:
+        raw_text: Full OCR response text
+        confidence: OCR confidence score
+
+    Returns:
+        ExtractionResult keeping the full raw text
+    """
+    return ExtractionResult(
+        vendor=extract_vendor(raw_text),
+        invoice_no=extract_invoice_number(raw_text),
+        po_no=extract_po_number(raw_text),
+        date=extract_date(raw_text),
+        total=extract_total_amount(raw_text),
+        line_items=extract_line_items(raw_text),
+        raw_text=raw_text,
+        confidence=round(confidence, 2),
+    )
+
+
+def extract_data_from_file(file_path: str) -> ExtractionResult:
     """
     Extract structured data from invoice or PO file using Shivaay AI
 
@@ -313,7 +418,7 @@ def extract_data_from_file(file_path: str) -> Dict[str, Any]:
         file_path: Path to file (PDF or image)
 
     Returns:
-        Dictionary with extracted fields
+        ExtractionResult with typed fields (error set on failure)
     """
     try:
         # Convert PDF to image if needed
@@ -326,59 +431,18 @@ def extract_data_from_file(file_path: str) -> Dict[str, Any]:
         raw_text, confidence, ocr_results = perform_ocr_with_shivaay(image_path)
 
         if not raw_text:
-            print("⚠️  No text extracted from file")
-            return {
-                "vendor": None,
-                "invoice_no": None,
-                "po_no": None,
-                "date": None,
-                "total": None,
-                "raw_text": "",
-                "confidence": 0,
-                "error": "No text could be extracted",
-                "ocr_engine": "Shivaay AI"
-            }
+            logger.warning("No text extracted from file", extra={"file": file_path})
+            return ExtractionResult(error="No text could be extracted")
 
         # Extract fields
-        vendor = extract_vendor(raw_text)
-        total = extract_total_amount(raw_text)
-        date = extract_date(raw_text)
-        invoice_no = extract_invoice_number(raw_text)
-        po_no = extract_po_number(raw_text)
-
-        # Build result
-        result = {
-            "vendor": vendor,
-            "invoice_no": invoice_no,
-            "po_no": po_no,
-            "date": date,
-            "total": total,
-            "raw_text": raw_text[:500] + "..." if len(raw_text) > 500 else raw_text,
-            "confidence": round(confidence, 2),
-            "extracted_fields": {
-                "vendor": vendor is not None,
-                "total": total is not None,
-                "date": date is not None,
-                "number": invoice_no is not None or po_no is not None
-            },
-            "ocr_engine": "Shivaay AI"
-        }
+        with track_stage("extraction"):
+            result = extract_fields(raw_text, confidence)
 
-        print(f"📊 Extracted: Vendor={vendor}, Total={total}, Date={date}")
+        logger.debug("Extracted vendor=%s total=%s date=%s", result.vendor, result.total, result.date)
 
         return result
 
     except Exception as e:
-        print(f"❌ Extraction error: {str(e)}")
-        return {
-            "vendor": None,
-            "invoice_no": None,
-            "po_no": None,
-            "date": None,
-            "total": None,
-            "raw_text": "",
-            "confidence": 0,
-            "error": str(e),
-            "ocr_engine": "Shivaay AI"
-        }
+        logger.exception("Extraction error")
+        return ExtractionResult(error=str(e))
 
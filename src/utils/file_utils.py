@@ -4,9 +4,12 @@ File Handling Utilities
 
 import os
 import shutil
+import logging
 from typing import Optional
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 
 def ensure_directory(path: str) -> None:
     """Ensure directory exists, create if not"""
@@ -78,7 +81,7 @@ def cleanup_old_files(directory: str, days: int = 7) -> int:
                     os.remove(filepath)
                     deleted_count += 1
                 except Exception as e:
-                    print(f"Error deleting {filepath}: {e}")
+                    logger.warning("Error deleting %s: %s", filepath, e)
 
     return deleted_count
 
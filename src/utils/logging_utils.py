@@ -0,0 +1,117 @@
+"""
+Logging Utilities
+Structured, queue-backed logging with request-id correlation
+"""
+
+import atexit
+import json
+import logging
+import queue
+import sys
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from src.core.config import settings
+
+
+# Request id of the request being served (propagates into thread-pool work)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributes present on every LogRecord; anything else was passed via `extra`
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[QueueListener] = None
+
+
+def new_request_id() -> str:
+    """Generate a short random request id"""
+    return uuid.uuid4().hex[:16]
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp every record with the current request id"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ExtraFormatter(logging.Formatter):
+    """Text formatter that appends `extra` fields as key=value pairs"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = " ".join(
+            f"{key}={value}" for key, value in record.__dict__.items()
+            if key not in _RESERVED_ATTRS and not key.startswith("_")
+        )
+        return f"{line} {extras}" if extras else line
+
+
+def setup_logging(level: str = None, json_format: bool = None) -> None:
+    """
+    Configure the `src` logger hierarchy (idempotent)
+
+    Records are formatted and written to stdout on a background thread by a
+    QueueListener, so logging from request handlers never blocks on I/O.
+    Levels are enforced by the logger before a record is created, so
+    disabled debug calls cost a single level check.
+
+    Args:
+        level: Log level name (defaults to settings.LOG_LEVEL)
+        json_format: Emit JSON lines instead of text (defaults to settings.LOG_JSON)
+    """
+    global _listener
+
+    level = (level or settings.LOG_LEVEL).upper()
+    json_format = settings.LOG_JSON if json_format is None else json_format
+
+    if _listener is not None:
+        _listener.stop()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if json_format else ExtraFormatter(settings.LOG_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    logger = logging.getLogger("src")
+    logger.handlers[:] = [queue_handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the background writer"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
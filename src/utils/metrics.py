@@ -0,0 +1,328 @@
+"""
+Metrics Utilities
+Lightweight Prometheus-style counters, gauges and histograms
+"""
+
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+
+# Default latency buckets (seconds) - covers fast regex work up to slow OCR calls
+DEFAULT_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+# Payload size buckets (bytes) - 1 KB to 32 MB
+DEFAULT_SIZE_BUCKETS = tuple(1024 * (4 ** i) for i in range(8))
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value the way the Prometheus text format expects"""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Render a label set as {name="value",...}"""
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric:
+    """Base class for a metric family with optional labels"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """Drop all recorded samples (used by tests)"""
+        with self._lock:
+            self._children.clear()
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._children.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = sorted(self._children.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed at scrape time"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = self._children.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._children[key] = value
+
+    def set_function(self, function: Callable[[], float], **labels) -> None:
+        """Compute the gauge value lazily when metrics are scraped"""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        if key in self._functions:
+            return self._functions[key]()
+        return self._children.get(key, 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = dict(self._children)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            items[key] = function()
+        for key, value in sorted(items.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class _HistogramChild:
+    """Bucket counts for a single label set"""
+
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.total = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram; observe() is a bisect plus three increments"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = _HistogramChild(len(self.buckets))
+            child.counts[index] += 1
+            child.total += value
+            child.count += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall-clock duration of the wrapped block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        child = self._children.get(self._key(labels))
+        return child.count if child else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = sorted(
+                (key, list(child.counts), child.total, child.count)
+                for key, child in self._children.items()
+            )
+        bucket_labels = self.labelnames + ("le",)
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                label_str = _format_labels(bucket_labels, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+            label_str = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metric families rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format (0.0.4)"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for metric in self._metrics:
+            metric.reset()
+
+
+# Content type for the Prometheus text exposition format
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Global registry and application metrics
+registry = MetricsRegistry()
+
+REQUEST_COUNT = registry.counter(
+    "futurix_http_requests_total",
+    "Total HTTP requests by method, route and status code",
+    ("method", "path", "status"),
+)
+REQUEST_LATENCY = registry.histogram(
+    "futurix_http_request_duration_seconds",
+    "HTTP request latency by method and route",
+    ("method", "path"),
+)
+IN_FLIGHT = registry.gauge(
+    "futurix_http_requests_in_flight",
+    "HTTP requests currently being served",
+    ("path",),
+)
+STAGE_LATENCY = registry.histogram(
+    "futurix_stage_duration_seconds",
+    "Latency of individual processing stages (save, pdf_conversion, ocr, extraction, comparison, storage)",
+    ("stage",),
+)
+STAGE_ERRORS = registry.counter(
+    "futurix_stage_errors_total",
+    "Errors raised or swallowed inside a processing stage",
+    ("stage",),
+)
+OCR_PAYLOAD_BYTES = registry.histogram(
+    "futurix_ocr_payload_bytes",
+    "Size of OCR API request and response bodies",
+    ("direction",),
+    buckets=DEFAULT_SIZE_BUCKETS,
+)
+CACHE_REQUESTS = registry.counter(
+    "futurix_cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss)",
+    ("cache", "result"),
+)
+CACHE_HIT_RATIO = registry.gauge(
+    "futurix_cache_hit_ratio",
+    "Fraction of cache lookups served from cache",
+    ("cache",),
+)
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """
+    Time a processing stage and count it as an error if it raises
+
+    Args:
+        stage: Stage name used as the metric label
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage=stage)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """
+    Record a cache hit or miss and keep the derived hit-ratio gauge registered
+
+    Args:
+        cache: Cache name used as the metric label
+        hit: Whether the lookup was served from cache
+    """
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+    if (cache,) not in CACHE_HIT_RATIO._functions:
+        CACHE_HIT_RATIO.set_function(lambda: _hit_ratio(cache), cache=cache)
+
+
+def _hit_ratio(cache: str) -> float:
+    hits = CACHE_REQUESTS.value(cache=cache, result="hit")
+    misses = CACHE_REQUESTS.value(cache=cache, result="miss")
+    total = hits + misses
+    return hits / total if total else 0.0
+
+
+def render_metrics() -> str:
+    """Render the global registry"""
+    return registry.render()
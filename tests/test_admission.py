@@ -0,0 +1,115 @@
+"""
+Admission Control Test for Futurix AI
+Load shedding with Retry-After, the interactive reserve, and queue timeouts giving back their place
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.core.admission import (ADMISSION_REJECTED, BATCH, INTERACTIVE, AdmissionController,
+                                AdmissionRejected)
+
+
+def test_full_queue_is_rejected_immediately():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=30, reserved_share=0)
+        await controller.acquire()
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.queued() == 1
+
+        rejected = ADMISSION_REJECTED.value(priority=INTERACTIVE, reason="queue_full")
+        started = time.perf_counter()
+        with pytest.raises(AdmissionRejected) as error:
+            await controller.acquire()
+        assert time.perf_counter() - started < 1  # shed at once, not after the 30 s queue timeout
+        assert error.value.reason == "queue_full"
+        assert error.value.retry_after >= 1
+        assert ADMISSION_REJECTED.value(priority=INTERACTIVE, reason="queue_full") == rejected + 1
+
+        controller.release(service_time=0.1)
+        await waiting
+        assert (controller.active, controller.queued()) == (1, 0)
+        controller.release()
+
+    asyncio.run(scenario())
+
+
+def test_interactive_admitted_while_batch_slots_are_exhausted():
+    async def scenario():
+        # 4 slots, 2 reserved for interactive requests; 2 queue places, 1 reserved
+        controller = AdmissionController(max_concurrent=4, max_queue=2, queue_timeout=30, reserved_share=0.5)
+        await controller.acquire(BATCH)
+        await controller.acquire(BATCH)
+        batch_waiter = asyncio.ensure_future(controller.acquire(BATCH))
+        await asyncio.sleep(0)
+        assert (controller.active, controller.queued()) == (2, 1)
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire(BATCH)  # the only batch queue place is taken
+
+        # Interactive requests still get the reserved slots without queueing
+        await controller.acquire(INTERACTIVE)
+        await controller.acquire(INTERACTIVE)
+        assert controller.active == 4
+        assert not batch_waiter.done()
+
+        # Freed slots are not handed to batch work beyond its share
+        controller.release()
+        controller.release()
+        await asyncio.sleep(0)
+        assert not batch_waiter.done()
+        controller.release()  # now below the batch limit
+        await batch_waiter
+        assert (controller.active, controller.queued()) == (2, 0)
+
+    asyncio.run(scenario())
+
+
+def test_wait_timeout_releases_its_place():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05, reserved_share=0)
+        await controller.acquire()
+
+        with pytest.raises(AdmissionRejected) as error:
+            await controller.acquire()
+        assert error.value.reason == "queue_timeout"
+        assert controller.queued() == 0
+
+        # The timed-out request holds nothing: the next one can queue, and gets the slot
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.queued() == 1
+        controller.release()
+        await waiting
+        assert controller.active == 1
+        controller.release()
+        assert controller.active == 0
+
+        async with controller.admit():
+            assert controller.active == 1
+        assert controller.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_reserve_leaves_batch_a_slot():
+    assert AdmissionController(max_concurrent=2, reserved_share=0.9).reserved_slots == 1
+    assert AdmissionController(max_concurrent=4, reserved_share=0.25).reserved_slots == 1
+
+    async def scenario():
+        # One slot, reserved for interactive requests: batch is refused at once, not after the queue timeout
+        controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=30, reserved_share=0.25)
+        started = time.perf_counter()
+        with pytest.raises(AdmissionRejected) as error:
+            await controller.acquire(BATCH)
+        assert time.perf_counter() - started < 1
+        assert error.value.reason == "no_batch_slots"
+        assert "batch" in str(error.value)
+        assert controller.queued() == 0
+
+        async with controller.admit(INTERACTIVE):
+            assert controller.active == 1
+
+    asyncio.run(scenario())
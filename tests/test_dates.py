@@ -0,0 +1,53 @@
+"""
+Document Date Test for Futurix AI
+Dates are compared as parsed values but shown and stored as written, including formats no parser knows
+"""
+
+import pytest
+
+from src.core.comparison import compare_batch, compare_dates, compare_invoice_po
+from src.core.records import ExtractionResult, TransactionRecord, normalize_transaction
+from src.core.spill_tier import _decode, _encode
+
+
+def extraction(date, **fields):
+    return ExtractionResult(vendor="ABC Pvt Ltd", total=1000.0, date=date, **fields)
+
+
+@pytest.mark.parametrize("compare", [
+    lambda invoice, po: compare_invoice_po(invoice, po),
+    lambda invoice, po: compare_batch([invoice], [po])[0],
+])
+def test_unparsed_dates_compare_as_written(compare):
+    same = compare(extraction("Jan 5th 2024", invoice_no="INV-1"), extraction("Jan 5th 2024", po_no="PO-1"))
+    assert same["matched"] and same["summary"]["date"] == "✅ Matched"
+
+    different = compare(extraction("Jan 5th 2024", invoice_no="INV-1"), extraction("Jan 6th 2024", po_no="PO-1"))
+    assert not different["matched"]
+    assert different["details"]["date"]["invoice"] == "Jan 5th 2024"
+    assert different["details"]["date"]["po"] == "Jan 6th 2024"
+
+
+def test_parsed_dates_keep_their_text():
+    assert compare_dates("January 5, 2024", "07/01/2024", 2) == (True, 2)
+
+    result = compare_invoice_po(extraction("January 5, 2024"), extraction("20/01/2024"))
+    assert result["details"]["date"]["invoice"] == "January 5, 2024"
+    assert result["details"]["date"]["po"] == "20/01/2024"
+
+    rendered = extraction("January 5, 2024").to_dict()
+    assert rendered["date"] == "January 5, 2024"
+    assert rendered["extracted_fields"]["date"]
+    assert extraction("Jan 5th 2024").to_dict()["extracted_fields"]["date"]
+
+
+def test_transactions_store_dates_as_written():
+    transaction = {"id": 7, "invoice_date": "January 5, 2024", "po_date": "Jan 5th 2024", "status": "MATCHED ✅",
+                   "timestamp": "2024-01-15 10:30:00"}
+    normalized = normalize_transaction(transaction)
+    assert (normalized["invoice_date"], normalized["po_date"]) == ("January 5, 2024", "Jan 5th 2024")
+
+    # Spilled records come back with the same dates
+    spilled = _decode(_encode(TransactionRecord.from_dict(transaction)))
+    assert (spilled["invoice_date"], spilled["po_date"]) == ("January 5, 2024", "Jan 5th 2024")
+    assert spilled.invoice_date.toordinal() == TransactionRecord.from_dict(transaction).invoice_date.toordinal()
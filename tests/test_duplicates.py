@@ -0,0 +1,76 @@
+"""
+Duplicate Detection Test for Futurix AI
+Exact and fuzzy duplicate hits, the Bloom-filter fast path, and vendors with long histories
+"""
+
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from src.core.duplicates import DUPLICATE_CHECKS, DuplicateDetector
+from src.core.records import ExtractionResult
+from src.core.storage import TransactionStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = TransactionStorage(id_file=os.path.join(str(tmp_path), "ids"))
+    yield storage
+    storage.close()
+
+
+def store(storage, detector, number, total, day, vendor="ABC Pvt Ltd"):
+    transaction = {
+        "invoice_vendor": vendor, "po_vendor": vendor, "invoice_total": total, "po_total": total,
+        "invoice_date": day, "po_date": day, "invoice_number": number, "po_number": f"PO-{number}",
+        "status": "MATCHED ✅", "timestamp": "2024-01-15 10:30:00", "details": {},
+    }
+    transaction_id = storage.add_transaction(transaction)
+    detector.add(transaction_id, transaction)
+    return transaction_id
+
+
+def invoice(number, total, day, vendor="ABC Pvt Ltd"):
+    return ExtractionResult(vendor=vendor, invoice_no=number, total=total, date=day)
+
+
+def test_exact_and_fuzzy_hits(storage):
+    detector = DuplicateDetector(storage)
+    first = store(storage, detector, "INV-1", 1000.0, date(2024, 1, 5))
+    second = store(storage, detector, "INV-2", 2500.0, date(2024, 3, 1))
+
+    exact = detector.check(invoice("inv-1", 400.0, date(2024, 6, 1)))
+    assert [(hit["transaction_id"], hit["match"]) for hit in exact] == [(first, "exact")]
+
+    # Same vendor, amount within tolerance and date within the window, new number
+    fuzzy = detector.check(invoice("INV-99", 2501.0, date(2024, 3, 3), vendor="ABC Pvt. Ltd."))
+    assert [(hit["transaction_id"], hit["match"]) for hit in fuzzy] == [(second, "fuzzy")]
+
+    assert detector.check(invoice("INV-99", 2501.0, date(2024, 3, 20))) == []
+    assert detector.check(invoice("INV-1", 1000.0, date(2024, 1, 5), vendor="Other Traders")) == []
+
+
+def test_filter_negative_skips_storage(storage, monkeypatch):
+    detector = DuplicateDetector(storage)
+    store(storage, detector, "INV-1", 1000.0, date(2024, 1, 5))
+    detector.check(invoice("INV-1", 1000.0, date(2024, 1, 5)))  # builds the filter
+
+    def query(_):
+        raise AssertionError("a Bloom-filter miss must not query storage")
+
+    monkeypatch.setattr(storage, "query", query)
+    clear = DUPLICATE_CHECKS.value(outcome="clear")
+    assert detector.check(invoice("INV-2", 7300.0, date(2024, 8, 9))) == []
+    assert DUPLICATE_CHECKS.value(outcome="clear") == clear + 1
+
+
+def test_recent_duplicate_among_many_same_amount_invoices(storage):
+    """Older invoices of the same amount must not use up the confirming query's limit"""
+    detector = DuplicateDetector(storage)
+    start = date(2020, 1, 1)
+    for number in range(600):
+        latest = store(storage, detector, f"INV-{number}", 500.0, start + timedelta(weeks=number))
+
+    hits = detector.check(invoice("INV-NEW", 500.0, start + timedelta(weeks=599)))
+    assert [(hit["transaction_id"], hit["match"]) for hit in hits] == [(latest, "fuzzy")]
@@ -0,0 +1,47 @@
+"""
+CSV Export Test for Futurix AI
+Partial transactions export "N/A" for missing fields on every storage backend
+"""
+
+import csv
+import io
+import os
+
+import pytest
+
+from src.core.log_storage import LogTransactionStorage
+from src.core.sqlite_storage import SQLiteTransactionStorage
+from src.core.storage import EXPORT_COLUMNS, TransactionStorage, iter_csv
+
+
+def rows(transactions):
+    return list(csv.DictReader(io.StringIO(b"".join(iter_csv(transactions)).decode("utf-8"))))
+
+
+@pytest.fixture(params=["memory", "sqlite", "log"])
+def storage(request, tmp_path):
+    if request.param == "memory":
+        storage = TransactionStorage(id_file=os.path.join(str(tmp_path), "ids"))
+    elif request.param == "sqlite":
+        storage = SQLiteTransactionStorage(str(tmp_path / "transactions.db"))
+    else:
+        storage = LogTransactionStorage(str(tmp_path / "txlog"), fsync_every=0)
+    yield storage
+    storage.close()
+
+
+def test_partial_transaction_exports_missing_fields(storage):
+    storage.add_transaction({"invoice_total": 1.0, "status": "MATCHED ✅"})
+
+    [row] = rows(storage.iter_transactions())
+    assert list(row) == EXPORT_COLUMNS
+    for column in ("Invoice Vendor", "PO Vendor", "Invoice Date", "PO Date", "Invoice Number", "PO Number"):
+        assert row[column] == "N/A", column
+    assert (row["Invoice Total"], row["Status"], row["Mismatched Fields"]) == ("1.0", "MATCHED ✅", "None")
+    assert row["Timestamp"]
+
+
+def test_plain_dicts_keep_defaults():
+    [row] = rows([{"invoice_vendor": "ABC Pvt Ltd", "invoice_total": 1.0}])
+    assert (row["Invoice Vendor"], row["PO Vendor"], row["PO Total"], row["Status"], row["Timestamp"]) == \
+        ("ABC Pvt Ltd", "N/A", "0", "Unknown", "N/A")
@@ -0,0 +1,90 @@
+"""
+Import-Time Budget Test for Futurix AI
+Guards API cold start against heavy dependencies creeping back into import time
+"""
+
+import os
+import re
+import subprocess
+import sys
+
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Total cumulative import time allowed for `import src.api.main` (milliseconds)
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+# Heavy dependencies that must only be loaded on first use
+LAZY_MODULES = [
+    "pandas",
+    "numpy",
+    "pdf2image",
+    "PIL",
+    "fuzzywuzzy",
+    "requests",
+    "googleapiclient",
+    "google_auth_oauthlib",
+    "pyarrow",
+]
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\S+)$")
+
+
+def measure_import(module: str = "src.api.main"):
+    """
+    Import a module in a fresh interpreter with -X importtime
+
+    Args:
+        module: Module to import
+
+    Returns:
+        Tuple of (self time per root package {package: self_us}, loaded module names)
+    """
+    code = f"import sys, {module}; print(' '.join(sorted(sys.modules)))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    breakdown = {}
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            package = match.group(3).split(".")[0]
+            breakdown[package] = breakdown.get(package, 0) + int(match.group(1))
+
+    return breakdown, set(proc.stdout.split())
+
+
+def print_breakdown(breakdown, top: int = 15):
+    """Print the packages that contribute most to import time"""
+    total_ms = sum(breakdown.values()) / 1000
+    print(f"\nImport time: {total_ms:.1f} ms (budget: {IMPORT_BUDGET_MS:.0f} ms)")
+    for name, self_us in sorted(breakdown.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+
+def test_heavy_dependencies_are_lazy():
+    """Importing the API must not load OCR, export or Gmail dependencies"""
+    _, loaded = measure_import()
+    eager = [name for name in LAZY_MODULES if name in loaded]
+    assert not eager, f"Loaded eagerly by src.api.main: {eager}"
+
+
+def test_import_time_budget():
+    """Cold import of the API stays within the configured budget"""
+    breakdown, _ = measure_import()
+    print_breakdown(breakdown)
+
+    total_ms = sum(breakdown.values()) / 1000
+    assert total_ms <= IMPORT_BUDGET_MS, f"Import took {total_ms:.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)"
+
+
+if __name__ == "__main__":
+    breakdown, loaded = measure_import()
+    print_breakdown(breakdown)
+    eager = [name for name in LAZY_MODULES if name in loaded]
+    print(f"\nEagerly loaded heavy modules: {eager or 'none'}")
@@ -0,0 +1,114 @@
+"""
+Log Storage Recovery Test for Futurix AI
+Crash recovery of the append-only transaction log: torn tails, snapshot replay, compaction and fsync timing
+"""
+
+import os
+import time
+
+from src.core import log_storage
+from src.core.log_storage import LogTransactionStorage
+from src.core.query import TransactionQuery
+
+
+def transaction(sequence: int):
+    return {
+        "invoice_vendor": "ABC Pvt Ltd", "po_vendor": "ABC Pvt Ltd",
+        "invoice_total": 100.0 + sequence, "po_total": 100.0 + sequence,
+        "invoice_date": "15/01/2024", "po_date": "15/01/2024",
+        "invoice_number": f"INV-{sequence}", "po_number": f"PO-{sequence}",
+        "status": "MATCHED ✅" if sequence % 2 else "MISMATCH ⚠️",
+        "timestamp": "2024-01-15 10:30:00", "details": {},
+    }
+
+
+def segment_files(directory: str):
+    return sorted(name for name in os.listdir(directory) if name.endswith(log_storage.SEGMENT_SUFFIX))
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    directory = str(tmp_path / "txlog")
+    storage = LogTransactionStorage(directory, fsync_every=0)
+    for sequence in range(5):
+        storage.add_transaction(transaction(sequence))
+    storage.close()
+
+    # A crash mid-append leaves a partial frame behind the last good record
+    path = os.path.join(directory, segment_files(directory)[-1])
+    good_size = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(log_storage.FRAME_HEADER.pack(200, 0) + b'{"id": 6, "invoice_ven')
+
+    storage = LogTransactionStorage(directory, fsync_every=0)
+    try:
+        assert os.path.getsize(path) == good_size
+        assert storage.count() == 5
+        assert storage.add_transaction(transaction(5)) == 6
+        assert [t["id"] for t in storage.iter_transactions()] == [1, 2, 3, 4, 5, 6]
+    finally:
+        storage.close()
+
+
+def test_recovery_replays_tail_after_snapshot(tmp_path):
+    directory = str(tmp_path / "txlog")
+    storage = LogTransactionStorage(directory, snapshot_interval=10, index_interval=4, fsync_every=0)
+    for sequence in range(25):
+        storage.add_transaction(transaction(sequence))
+    storage.sync()
+    # No close(): the process dies with 5 records written after the last snapshot
+
+    recovered = LogTransactionStorage(directory, snapshot_interval=10, index_interval=4, fsync_every=0)
+    try:
+        assert recovered._since_snapshot == 5  # replayed from the snapshot position, not from the start
+        assert recovered.count() == 25
+        assert recovered.last_id() == 25
+        assert recovered.get_statistics()["matched"] == 12
+        assert [t["id"] for t in recovered.iter_transactions()] == list(range(1, 26))
+        assert [t["id"] for t in recovered.query(TransactionQuery(invoice_number="INV-23"))] == [24]
+        assert recovered.add_transaction(transaction(25)) == 26
+    finally:
+        recovered.close()
+        storage._file.close()
+
+
+def test_clear_compacts_segments(tmp_path):
+    directory = str(tmp_path / "txlog")
+    storage = LogTransactionStorage(directory, segment_bytes=1024, fsync_every=0)
+    for sequence in range(40):
+        storage.add_transaction(transaction(sequence))
+    assert len(segment_files(directory)) > 1
+
+    storage.clear()
+    assert len(segment_files(directory)) == 1
+    assert storage.count() == 0
+    storage.close()
+
+    storage = LogTransactionStorage(directory, segment_bytes=1024, fsync_every=0)
+    try:
+        assert storage.count() == 0
+        assert list(storage.iter_transactions()) == []
+        assert storage.add_transaction(transaction(0)) > 40  # ids are never reused
+    finally:
+        storage.close()
+
+
+def test_quiet_period_is_synced_within_interval(tmp_path, monkeypatch):
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(log_storage.os, "fsync", lambda fd: synced.append(fd) or real_fsync(fd))
+
+    storage = LogTransactionStorage(str(tmp_path / "txlog"), fsync_every=100, fsync_interval_ms=50)
+    try:
+        storage.sync()
+        synced.clear()
+        for sequence in range(3):  # a burst far below fsync_every, then nothing
+            storage.add_transaction(transaction(sequence))
+        assert storage._unsynced == 3
+
+        deadline = time.monotonic() + 2
+        while storage._unsynced and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert storage._unsynced == 0
+        assert synced
+    finally:
+        storage.close()
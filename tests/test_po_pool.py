@@ -0,0 +1,68 @@
+"""
+PO Pool Test for Futurix AI
+Candidate selection for an invoice (PO number, vendor and amount, amount, vendor) and closing matched POs
+"""
+
+import pytest
+
+from src.core.po_pool import POPool
+from src.core.records import ExtractionResult
+
+
+def po(number, vendor, total):
+    return ExtractionResult(vendor=vendor, po_no=number, total=total, date="15/01/2024")
+
+
+def invoice(vendor=None, total=None, po_no=None):
+    return ExtractionResult(vendor=vendor, invoice_no="INV-1", po_no=po_no, total=total, date="16/01/2024")
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = POPool(str(tmp_path / "po_pool.jsonl"))
+    pool.add("acme-1000", po("PO-1", "ACME Industries", 1000.0))
+    pool.add("acme-5000", po("PO-2", "ACME Industries", 5000.0))
+    pool.add("zen-1020", po("PO-3", "Zenith Traders", 1020.0))
+    pool.add("zen-990", po("PO-4", "Zenith Traders", 990.0))
+    return pool
+
+
+def test_po_number_comes_first(pool):
+    # The printed PO number wins over a vendor and amount that point elsewhere
+    assert pool.candidates(invoice("Zenith Traders", 1000.0, po_no=" po-2 ")) == (["acme-5000"], "po_number")
+
+
+def test_vendor_and_amount_before_amount_only(pool):
+    assert pool.candidates(invoice("ACME Industries", 1010.0)) == (["acme-1000"], "vendor_amount")
+    # Unknown PO number falls through to the next index
+    assert pool.candidates(invoice("Zenith Traders", 1000.0, po_no="PO-404")) == (["zen-990", "zen-1020"],
+                                                                                   "vendor_amount")
+
+
+def test_amount_only_is_nearest_first(pool):
+    ids, matched_by = pool.candidates(invoice("Unknown Supplier", 1012.0))
+    assert matched_by == "amount"
+    assert ids == ["zen-1020", "acme-1000", "zen-990"]
+    assert pool.candidates(invoice(None, 993.0))[0][0] == "zen-990"
+
+
+def test_vendor_only_when_no_amount_matches(pool):
+    # The vendor's POs are all outside the amount window, or the invoice has no total
+    assert pool.candidates(invoice("ACME Industries", 3000.0)) == (["acme-1000", "acme-5000"], "vendor")
+    assert pool.candidates(invoice("Zenith Traders")) == (["zen-1020", "zen-990"], "vendor")
+    assert pool.candidates(invoice("Unknown Supplier", 3000.0)) == ([], "vendor")
+
+
+def test_find_picks_best_candidate_and_close_persists(pool, tmp_path):
+    match = pool.find(invoice("Zenith Traders", 1020.0))
+    assert (match.po.po_id, match.matched_by, match.candidates) == ("zen-1020", "vendor_amount", 2)
+    assert match.comparison["matched"]
+
+    assert pool.close("zen-1020")
+    assert not pool.close("zen-1020")
+    assert pool.find(invoice("Zenith Traders", 1020.0)).po.po_id == "zen-990"
+
+    reopened = POPool(str(tmp_path / "po_pool.jsonl"))
+    assert len(reopened) == 3
+    assert reopened.get("zen-1020") is None
+    assert reopened.candidates(invoice("Zenith Traders", 1020.0)) == (["zen-990"], "vendor_amount")
@@ -0,0 +1,148 @@
+"""
+Transaction Query Index Test for Futurix AI
+Indexed queries return exactly what a full scan does, on every backend and across the spill tier
+"""
+
+import gc
+import os
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.core.log_storage import LogTransactionStorage
+from src.core.query import TransactionIndex, TransactionQuery
+from src.core.sqlite_storage import SQLiteTransactionStorage
+from src.core.storage import TransactionStorage
+
+VENDORS = ["ABC Pvt Ltd", "ABC Pvt. Ltd.", "ABC Private Limited", "Zenith Traders", "Zenith Trader",
+           "Mahindra Logistics", "Acme Industries", None]
+START = datetime(2024, 1, 1, 9, 0, 0)
+COUNT = 1200
+
+
+def history(seed: int = 11):
+    rng = random.Random(seed)
+    moment = START
+    transactions = []
+    for number in range(COUNT):
+        moment += timedelta(minutes=rng.randint(0, 90))  # timestamps never go backwards
+        vendor = rng.choice(VENDORS)
+        total = None if rng.random() < 0.05 else round(rng.choice([rng.uniform(1, 50), rng.uniform(50, 50000)]), 2)
+        transactions.append({
+            "invoice_vendor": vendor, "po_vendor": rng.choice([vendor, rng.choice(VENDORS)]),
+            "invoice_total": total, "po_total": total,
+            "invoice_date": "15/01/2024", "po_date": "15/01/2024",
+            "invoice_number": f"inv-{rng.randint(1, 400)}", "po_number": f"PO-{rng.randint(1, 400)}",
+            "status": "MATCHED ✅" if rng.random() < 0.6 else "MISMATCH ⚠️",
+            "timestamp": moment.strftime("%Y-%m-%d %H:%M:%S"), "details": {},
+        })
+    return transactions, moment
+
+
+def random_query(rng: random.Random, last: datetime) -> dict:
+    """Keyword arguments for a TransactionQuery combining a few random filters"""
+    filters = {"limit": rng.choice([1, 7, 50, 1000])}
+    if rng.random() < 0.5:
+        filters["vendor"] = rng.choice(VENDORS[:-1] + ["abc pvt ltd", "Zenith"])
+        filters["fuzzy"] = rng.random() < 0.5
+    if rng.random() < 0.3:
+        filters["matched"] = rng.random() < 0.5
+    if rng.random() < 0.2:
+        filters["invoice_number"] = f"INV-{rng.randint(1, 400)}"
+    if rng.random() < 0.2:
+        filters["po_number"] = f"po-{rng.randint(1, 400)}"
+    if rng.random() < 0.4:
+        low = rng.uniform(0, 30000)
+        filters["min_amount"] = low
+        filters["max_amount"] = low + rng.choice([5, 500, 20000])
+    elif rng.random() < 0.2:
+        filters["max_amount"] = rng.uniform(0, 100)
+    if rng.random() < 0.4:
+        span = (last - START).total_seconds()
+        start = START + timedelta(seconds=rng.uniform(0, span))
+        filters["start"] = start.strftime("%Y-%m-%d %H:%M:%S")
+        if rng.random() < 0.6:
+            filters["end"] = (start + timedelta(days=rng.uniform(0, 20))).strftime("%Y-%m-%d %H:%M:%S")
+    if rng.random() < 0.4:
+        filters["after_id"] = rng.randint(0, COUNT)
+    return filters
+
+
+@pytest.fixture(params=["memory", "sqlite", "log"])
+def storage(request, tmp_path):
+    if request.param == "memory":
+        # Most of the history is spilled to disk
+        storage = TransactionStorage(resident_limit=150, spill_batch=100, spill_dir=str(tmp_path / "spill"),
+                                     id_file=os.path.join(str(tmp_path), "ids"))
+    elif request.param == "sqlite":
+        storage = SQLiteTransactionStorage(str(tmp_path / "transactions.db"))
+    else:
+        storage = LogTransactionStorage(str(tmp_path / "txlog"), fsync_every=0)
+    yield storage
+    storage.close()
+
+
+def test_index_matches_full_scan(storage):
+    transactions, last = history()
+    for transaction in transactions:
+        storage.add_transaction(transaction)
+    if isinstance(storage, TransactionStorage):
+        assert storage._spilled > COUNT // 2
+
+    stored = list(storage.iter_transactions())
+    assert len(stored) == COUNT
+
+    rng = random.Random(3)
+    for _ in range(150):
+        filters = random_query(rng, last)
+        query = TransactionQuery(**filters)
+        scan = TransactionQuery(**filters)
+        expected = [transaction["id"] for transaction in stored
+                    if (scan.after_id is None or transaction["id"] > scan.after_id) and scan.matches(transaction)]
+        assert [transaction["id"] for transaction in storage.query(query)] == expected[:scan.limit], filters
+
+
+def postings(index: TransactionIndex) -> int:
+    numbers = [ids for table in (index._invoice_numbers, index._po_numbers) for ids in table.values()]
+    return (sum(len(ids) for table in (index._vendors, index._amounts, index._status) for ids in table.values())
+            + sum(1 if isinstance(ids, int) else len(ids) for ids in numbers))
+
+
+def test_index_memory_stays_within_resident_budget(tmp_path):
+    storage = TransactionStorage(resident_limit=300, spill_batch=100, spill_dir=str(tmp_path / "spill"),
+                                 id_file=os.path.join(str(tmp_path), "ids"))
+    transactions, _ = history()
+
+    def ingest(batch: int) -> None:
+        for number, transaction in enumerate(transactions):
+            # Unique invoice/PO numbers, as in production: one posting per transaction
+            storage.add_transaction(dict(transaction, invoice_number=f"INV-{batch}-{number}",
+                                         po_number=f"PO-{batch}-{number}"))
+
+    tracemalloc.start()
+    try:
+        ingest(0)
+        assert storage.query(TransactionQuery(vendor="Zenith Trader", fuzzy=True, limit=1))  # the index is in use
+        gc.collect()
+        before = tracemalloc.get_traced_memory()[0]
+        for batch in range(1, 3):
+            ingest(batch)
+        gc.collect()
+        growth = (tracemalloc.get_traced_memory()[0] - before) / (2 * COUNT)
+    finally:
+        tracemalloc.stop()
+
+    # Only resident ids are indexed; spilled ones cost their segment's filter (a few bytes each)
+    assert len(storage.index) <= 400
+    assert postings(storage.index) <= 7 * 400
+    assert storage.index.floor == storage._spill.segments[-1].last_id
+    assert growth < 40, f"{growth:.0f} bytes per transaction"
+
+    # Spilled transactions are still found, by number and by vendor
+    assert [t["invoice_number"] for t in storage.query(TransactionQuery(invoice_number="inv-0-17"))] == ["INV-0-17"]
+    spilled = storage.query(TransactionQuery(vendor="Mahindra Logistics", limit=1000))
+    assert len(spilled) == 3 * sum(t["invoice_vendor"] == "Mahindra Logistics" or t["po_vendor"] == "Mahindra Logistics"
+                                   for t in transactions)
+    storage.close()
@@ -0,0 +1,109 @@
+"""
+Comparison Rules Test for Futurix AI
+Rule precedence, validation, and hot reload of the rules file
+"""
+
+import json
+import os
+
+import pytest
+
+from src.core.config import settings
+from src.core.rules import ComparisonRules, compile_rules
+
+
+RULES = {
+    "groups": {"logistics": ["V-00042", "Mahindra Logistics"]},
+    "rules": [
+        {"vendor": "V-00042", "field": "date", "tolerance": 1},
+        {"group": "logistics", "field": "date", "tolerance": 10},
+        {"group": "logistics", "field": "amount", "comparator": "absolute", "tolerance": 500},
+        {"field": "date", "tolerance": 5},
+        {"field": "vendor", "comparator": "token_set", "tolerance": 80},
+    ],
+}
+
+
+def write_rules(path, document):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f)
+    # Make each write visible even when it lands within the filesystem's mtime granularity
+    stamp = os.stat(path).st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(stamp, stamp))
+
+
+def test_precedence_default_then_group_then_vendor(tmp_path):
+    path = str(tmp_path / "comparison_rules.json")
+    write_rules(path, RULES)
+    rules = ComparisonRules(path)
+    compiled = rules.compiled()
+
+    # Untargeted rules change the default for every vendor
+    assert rules.policy_for(vendor="Zenith Traders") is compiled.default
+    assert compiled.default.date_tolerance_days == 5
+    assert (compiled.default.vendor_scorer, compiled.default.vendor_threshold) == ("token_set", 80)
+    assert compiled.default.amount_tolerance == settings.AMOUNT_TOLERANCE_PERCENT
+
+    # Group rules apply on top of the default, whatever their order in the file
+    group_member = rules.policy_for(vendor="Mahindra Logistics Pvt. Ltd.")
+    assert (group_member.date_tolerance_days, group_member.amount_tolerance) == (10, 500)
+    assert group_member.vendor_threshold == 80
+    assert group_member.source == "all vendors, group:logistics"
+
+    # The vendor's own rule wins over its group, even though it comes first
+    vendor = rules.policy_for(vendor_id="V-00042", vendor="Mahindra Logistics")
+    assert (vendor.date_tolerance_days, vendor.amount_comparator) == (1, "absolute")
+    assert vendor.source == "all vendors, group:logistics, vendor:V-00042"
+
+
+@pytest.mark.parametrize("document, error", [
+    ({"rules": [{"vendors": "ACME", "field": "date", "tolerance": 3}]}, "vendors must be a list"),
+    ({"rules": [{"vendors": ["ACME", 7], "field": "date", "tolerance": 3}]}, "vendors must be a list"),
+    ({"rules": [{"vendor": ["ACME"], "field": "date", "tolerance": 3}]}, "vendor must be a string"),
+    ({"groups": {"logistics": "ACME"}, "rules": []}, "group 'logistics' must be a list"),
+    ({"groups": {"logistics": {"ACME": 1}}, "rules": []}, "group 'logistics' must be a list"),
+])
+def test_vendor_lists_are_validated(document, error):
+    with pytest.raises(ValueError, match=error):
+        compile_rules(document)
+
+
+def test_file_changes_are_reloaded(tmp_path):
+    path = str(tmp_path / "comparison_rules.json")
+    rules = ComparisonRules(path, check_interval=0)
+    assert rules.policy_for(vendor="ACME Industries").source == "default"
+
+    write_rules(path, {"rules": [{"vendor": "ACME Industries", "field": "date", "tolerance": 7}]})
+    assert rules.policy_for(vendor="ACME Industries").date_tolerance_days == 7
+
+    write_rules(path, {"rules": [{"vendors": ["ACME Industries"], "field": "date", "tolerance": 12}]})
+    assert rules.policy_for(vendor="acme industries").date_tolerance_days == 12
+    assert rules.compiled().loaded_at == os.stat(path).st_mtime_ns / 1e9
+
+    os.remove(path)
+    assert rules.policy_for(vendor="ACME Industries").source == "default"
+
+
+@pytest.mark.parametrize("content", [
+    '{"rules": [{"vendor": "ACME Industries", "field": "date", ',
+    '{"rules": [{"vendors": "ACME Industries", "field": "date", "tolerance": 30}]}',
+])
+def test_invalid_file_keeps_previous_rules(tmp_path, content):
+    path = str(tmp_path / "comparison_rules.json")
+    write_rules(path, {"rules": [{"vendor": "ACME Industries", "field": "date", "tolerance": 7}]})
+    rules = ComparisonRules(path, check_interval=0)
+    assert rules.policy_for(vendor="ACME Industries").date_tolerance_days == 7
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    stamp = os.stat(path).st_mtime_ns + 2_000_000_000
+    os.utime(path, ns=(stamp, stamp))
+
+    assert rules.policy_for(vendor="ACME Industries").date_tolerance_days == 7
+    assert rules.last_error
+    # No rule was created per character of the string
+    assert "name:A" not in rules.compiled().table
+
+    write_rules(path, {"rules": [{"vendor": "ACME Industries", "field": "date", "tolerance": 9}]})
+    assert rules.policy_for(vendor="ACME Industries").date_tolerance_days == 9
+    assert rules.last_error is None
@@ -0,0 +1,75 @@
+"""
+Tolerance Simulation Test for Futurix AI
+What-if re-decisions over stored transactions, leaving out vendors with their own comparison rules
+"""
+
+import json
+import os
+
+import pytest
+
+from src.core.rules import ComparisonRules
+from src.core.storage import TransactionStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = TransactionStorage(id_file=os.path.join(str(tmp_path), "ids"))
+    yield storage
+    storage.close()
+
+
+@pytest.fixture
+def rules(tmp_path):
+    path = str(tmp_path / "comparison_rules.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"rules": [{"vendor": "Mahindra Logistics", "field": "amount",
+                              "comparator": "absolute", "tolerance": 500}]}, f)
+    return ComparisonRules(path)
+
+
+def store(storage, vendor, invoice_total, po_total, matched, count):
+    for _ in range(count):
+        storage.add_transaction({
+            "invoice_vendor": vendor, "po_vendor": vendor, "invoice_total": invoice_total, "po_total": po_total,
+            "invoice_date": "15/01/2024", "po_date": "15/01/2024", "invoice_number": "INV-1", "po_number": "PO-1",
+            "status": "MATCHED ✅" if matched else "MISMATCH ⚠️", "timestamp": "2024-01-15 10:30:00",
+            "details": {} if matched else {"amount": {"reason": "Amount difference exceeds tolerance"}},
+        })
+
+
+def test_custom_policy_vendors_are_reported_separately(storage, rules):
+    store(storage, "ABC Pvt Ltd", 10200.0, 10000.0, matched=False, count=3)  # 2% apart: fails the global 0.5%
+    store(storage, "Mahindra Logistics", 10200.0, 10000.0, matched=True, count=2)  # within its 500 absolute
+
+    # Under the global settings alone, the custom vendor's stored matches look wrong
+    unaware = storage.simulate(amount_tolerance=3)
+    assert unaware["inconsistent_with_current"] == 2
+
+    result = storage.simulate(amount_tolerance=3, policy_for=rules.policy_for)
+    assert (result["total_transactions"], result["simulated_transactions"]) == (5, 3)
+    assert result["inconsistent_with_current"] == 0
+    assert result["flip_matrix"]["mismatch"] == {"matched": 3, "mismatch": 0}
+    assert result["flipped"] == 3
+    assert result["match_rate"] == {"stored": "0.00%", "proposed": "100.00%"}
+    assert result["fields"]["total"] == {"failing_now": 3, "failing_proposed": 0}
+    assert result["vendors"] == [{"vendor": "ABC Pvt Ltd", "flipped": 3}]
+    assert result["custom_policy"] == {
+        "transactions": 2,
+        "vendors": [{"vendor": "Mahindra Logistics", "transactions": 2, "policy": "vendor:Mahindra Logistics"}],
+    }
+
+
+def test_vendor_id_rules_apply(storage, tmp_path):
+    path = str(tmp_path / "id_rules.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"rules": [{"vendor": "V-00042", "field": "date", "tolerance": 10}]}, f)
+    storage.add_transaction({"invoice_vendor": "ABC Pvt Ltd", "po_vendor": "ABC Pvt Ltd", "invoice_total": 1.0,
+                             "po_total": 1.0, "status": "MATCHED ✅", "vendor_id": "V-00042"})
+    storage.add_transaction({"invoice_vendor": "ABC Pvt Ltd", "po_vendor": "ABC Pvt Ltd", "invoice_total": 1.0,
+                             "po_total": 1.0, "status": "MISMATCH ⚠️"})
+
+    result = storage.simulate(policy_for=ComparisonRules(path).policy_for)
+    assert result["simulated_transactions"] == 1
+    assert result["custom_policy"]["vendors"] == [{"vendor": "ABC Pvt Ltd", "transactions": 1,
+                                                   "policy": "vendor:V-00042"}]
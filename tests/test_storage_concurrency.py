@@ -0,0 +1,144 @@
+"""
+Storage Concurrency Stress Test for Futurix AI
+Many writer threads against every backend: ids must be unique, monotonic and never reused
+"""
+
+import os
+import threading
+
+import pytest
+
+from src.core.log_storage import LogTransactionStorage
+from src.core.query import TransactionQuery
+from src.core.sequence import IdSequence
+from src.core.sqlite_storage import SQLiteTransactionStorage
+from src.core.storage import TransactionStorage
+
+WRITERS = int(os.getenv("STRESS_WRITERS", "32"))
+INSERTS_PER_WRITER = int(os.getenv("STRESS_INSERTS", "100"))
+
+
+def open_storage(backend: str, directory: str):
+    """Open (or reopen) a backend rooted in `directory`"""
+    if backend == "memory":
+        # Small resident budget so spills race with inserts too
+        return TransactionStorage(resident_limit=500, spill_batch=200,
+                                  spill_dir=os.path.join(directory, "spill"),
+                                  id_file=os.path.join(directory, "ids"))
+    if backend == "sqlite":
+        return SQLiteTransactionStorage(os.path.join(directory, "futurix.db"))
+    return LogTransactionStorage(os.path.join(directory, "txlog"), fsync_every=0)
+
+
+def transaction(writer: int, sequence: int):
+    return {
+        "invoice_vendor": f"Vendor {writer % 5}",
+        "po_vendor": f"Vendor {writer % 5}",
+        "invoice_total": 100.0 + sequence,
+        "po_total": 100.0 + sequence,
+        "invoice_date": "15/01/2024",
+        "po_date": "15/01/2024",
+        "invoice_number": f"INV-{writer}-{sequence}",
+        "po_number": f"PO-{writer}-{sequence}",
+        "status": "MATCHED ✅" if sequence % 2 else "MISMATCH ⚠️",
+        "timestamp": "2024-01-15 10:30:00",
+        "details": {},
+    }
+
+
+def hammer(storage, writers: int = WRITERS, inserts: int = INSERTS_PER_WRITER):
+    """
+    Insert from many threads at once
+
+    Returns:
+        Ids returned to each writer, in the order that writer received them
+    """
+    barrier = threading.Barrier(writers)
+    returned = [[] for _ in range(writers)]
+    errors = []
+
+    def writer(number: int):
+        try:
+            barrier.wait()
+            for sequence in range(inserts):
+                returned[number].append(storage.add_transaction(transaction(number, sequence), latency=0.01))
+        except Exception as e:  # surfaced by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(number,)) for number in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors, errors
+    return returned
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "log"])
+def test_concurrent_writers(backend, tmp_path):
+    storage = open_storage(backend, str(tmp_path))
+    try:
+        returned = hammer(storage)
+        total = WRITERS * INSERTS_PER_WRITER
+        ids = [transaction_id for ids in returned for transaction_id in ids]
+
+        # Unique, and increasing as seen by each writer
+        assert len(set(ids)) == total
+        assert all(ids == sorted(ids) for ids in returned)
+
+        # Every insert stored exactly once, in id order
+        stored = [t["id"] for t in storage.iter_transactions()]
+        assert stored == sorted(ids)
+        assert storage.count() == total
+        assert storage.last_id() == max(ids)
+        assert storage.get_statistics()["matched"] == total // 2
+        assert storage.throughput("hour", 1)  # rollups were updated without error
+
+        # Secondary indexes saw every insert
+        query = TransactionQuery(invoice_number=f"INV-{WRITERS - 1}-{INSERTS_PER_WRITER - 1}")
+        assert [t["id"] for t in storage.query(query)] == [returned[WRITERS - 1][-1]]
+        assert sum(vendor["transactions"] for vendor in storage.aggregate()["vendors"]) == total
+    finally:
+        storage.close()
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "log"])
+def test_ids_survive_clear_and_restart(backend, tmp_path):
+    storage = open_storage(backend, str(tmp_path))
+    try:
+        first = storage.add_transaction(transaction(0, 0))
+        storage.clear()
+        after_clear = storage.add_transaction(transaction(0, 1))
+        assert after_clear > first
+    finally:
+        storage.close()
+
+    storage = open_storage(backend, str(tmp_path))
+    try:
+        after_restart = storage.add_transaction(transaction(0, 2))
+        assert after_restart > after_clear
+    finally:
+        storage.close()
+
+
+def test_id_sequences_sharing_a_file(tmp_path):
+    """Sequences reserving blocks from one state file never issue the same id"""
+    path = str(tmp_path / "ids")
+    sequences = [IdSequence(path, block=7) for _ in range(4)]
+    issued = [[] for _ in sequences]
+
+    def draw(number: int):
+        for _ in range(500):
+            issued[number].append(sequences[number].next())
+
+    threads = [threading.Thread(target=draw, args=(number,)) for number in range(len(sequences))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = [value for values in issued for value in values]
+    assert len(set(ids)) == len(ids)
+    assert all(values == sorted(values) for values in issued)
+    assert IdSequence(path).next() > max(ids)
@@ -0,0 +1,92 @@
+"""
+Text Index Test for Futurix AI
+Full-text search across flushed, merged and reopened segments agrees with a brute-force scan
+"""
+
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from src.core.text_index import B, K1, TextIndex, parse_query, tokenize
+from src.core.text_store import RawTextStore
+
+WORDS = ["bolt", "nut", "washer", "bearing", "gasket", "valve", "pune", "mumbai", "grand", "total", "plot"]
+
+
+def documents(count: int, seed: int = 5):
+    rng = random.Random(seed)
+    texts = {}
+    for number in range(1, count + 1):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(2, 12))]
+        words += [f"INV-2024-{rng.randint(1, 60):03d}", f"AX-{rng.randint(100, 140)}", f"{rng.randint(1, 9)},250.00"]
+        rng.shuffle(words)
+        texts[number * 3] = " ".join(words)  # sparse ids, like a history with gaps
+    return texts
+
+
+def brute_force(texts, query: str, prefix: bool = False):
+    """Ids and BM25 scores of the documents containing every query term, best first"""
+    counts = {doc_id: Counter(tokenize(text)) for doc_id, text in texts.items()}
+    average = sum(sum(terms.values()) for terms in counts.values()) / len(counts)
+    scores = {doc_id: 0.0 for doc_id in counts}
+    for term, is_prefix in parse_query(query, prefix):
+        names = {name for terms in counts.values() for name in terms
+                 if (name.startswith(term) if is_prefix else name == term)}
+        for name in names:
+            df = sum(1 for terms in counts.values() if name in terms)
+            idf = math.log(1 + (len(counts) - df + 0.5) / (df + 0.5))
+            for doc_id, terms in counts.items():
+                if name in terms and doc_id in scores:
+                    tf, length = terms[name], sum(terms.values())
+                    scores[doc_id] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average))
+        scores = {doc_id: score for doc_id, score in scores.items()
+                  if any((name.startswith(term) if is_prefix else name == term) for name in counts[doc_id])}
+    return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+
+QUERIES = [("bolt", False), ("bolt pune", False), ("INV-2024-007", False), ("2024-007", False),
+           ("ax-12", True), ("wash*", False), ("1250", False), ("grand total", False), ("missing", False)]
+
+
+@pytest.mark.parametrize("query, prefix", QUERIES)
+def test_search_matches_brute_force_after_reopen(tmp_path, query, prefix):
+    texts = documents(400)
+    store = RawTextStore(str(tmp_path / "raw_text"))
+    index = TextIndex(str(tmp_path / "index"), store, flush_docs=37, merge_factor=2)
+    for doc_id, text in texts.items():
+        store.add(doc_id, text, None)
+        index.add(doc_id, (text,))
+    index.flush()
+    assert index.stats()["segments"] > 1
+
+    reopened = TextIndex(str(tmp_path / "index"), store)
+    assert reopened.stats() == {**index.stats(), "unflushed": 0}
+
+    expected = brute_force(texts, query, prefix)
+    result = reopened.search(query, limit=1000, prefix=prefix)
+    assert result["total"] == len(expected)
+    assert [hit["transaction_id"] for hit in result["results"]] == [doc_id for doc_id, _ in expected]
+    assert [hit["score"] for hit in result["results"]] == pytest.approx([score for _, score in expected], abs=1e-3)
+    store.close()
+
+
+def test_unflushed_documents_are_recovered_from_the_text_store(tmp_path):
+    texts = documents(50)
+    store = RawTextStore(str(tmp_path / "raw_text"))
+    index = TextIndex(str(tmp_path / "index"), store, flush_docs=1000)
+    for doc_id, text in texts.items():
+        store.add(doc_id, text, None)
+        index.add(doc_id, (text,))
+    # No flush or close: the process dies with every document still in memory
+
+    reopened = TextIndex(str(tmp_path / "index"), store)
+    assert len(reopened) == len(texts)
+    expected = brute_force(texts, "gasket")
+    assert [hit["transaction_id"] for hit in reopened.search("gasket", limit=1000)["results"]] == \
+        [doc_id for doc_id, _ in expected]
+
+    reopened.clear()
+    store.clear()
+    assert TextIndex(str(tmp_path / "index"), store).search("gasket")["total"] == 0